@@ -8,7 +8,15 @@ Descrição: Inicializa a aplicação Flask com todas as configurações necess
 from flask import Flask
 from flask_cors import CORS
 from app.config import Config
-from app.utils.logger import setup_logger
+from app.utils.logger import setup_logger, get_logging_stats
+from app.utils.request_context import init_request_context
+from app.utils.metrics import init_metrics
+from app.utils.json_provider import TimedJSONProvider
+from app.utils.profiling import init_profiling
+from app.utils.compression import init_compression
+from app.utils.response_cache import get_response_cache
+from app.nfs_handler import get_mount_monitor
+from app.utils.nfs_guard import get_nfs_guard, NFSUnavailableError
 
 # Configurar logger
 logger = setup_logger(__name__)
@@ -29,6 +37,9 @@ def create_app(config_class=Config):
     # Carregar configurações
     app.config.from_object(config_class)
     
+    # Serialização JSON com medição de tempo (Server-Timing "ser")
+    app.json = TimedJSONProvider(app)
+    
     # Configurar CORS para aceitar requisições do frontend
     CORS(app, resources={
         r"/api/*": {
@@ -39,16 +50,38 @@ def create_app(config_class=Config):
         }
     })
     
+    # Métricas por requisição e access log estruturado
+    init_request_context(app)
+    
+    # Métricas Prometheus e endpoint /api/metrics
+    init_metrics(app)
+    
+    # Profiling sob demanda (header X-Profile-Token, ?profile= ou amostragem)
+    init_profiling(app)
+    
+    # ETag, 304 e compressão das respostas JSON (hook executado antes dos demais)
+    init_compression(app)
+    
     logger.info("Aplicação Flask criada com sucesso")
     
     # Registrar blueprints
     from app.auth.routes import auth_bp
     from app.connections.routes import connections_bp
     from app.recordings.routes import recordings_bp
+    from app.admin.routes import admin_bp
+    from app.sessions.routes import sessions_bp
+    from app.batch.routes import batch_bp
+    from app.history.routes import history_bp
+    from app.analytics.routes import analytics_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(connections_bp, url_prefix='/api/connections')
     app.register_blueprint(recordings_bp, url_prefix='/api/recordings')
+    app.register_blueprint(admin_bp, url_prefix='/api/admin')
+    app.register_blueprint(sessions_bp, url_prefix='/api/sessions')
+    app.register_blueprint(batch_bp, url_prefix='/api/batch')
+    app.register_blueprint(history_bp, url_prefix='/api/history')
+    app.register_blueprint(analytics_bp, url_prefix='/api/analytics')
     
     logger.info("Blueprints registrados com sucesso")
     
@@ -59,8 +92,31 @@ def create_app(config_class=Config):
         return {
             'status': 'healthy',
             'service': 'GuacPlayer Backend',
-            'version': '1.0.0'
+            'version': '1.0.0',
+            'logging': get_logging_stats(),
+            'response_cache': get_response_cache().stats()
         }, 200
     
+    # NFS indisponível fora dos blueprints protegidos por handle_errors
+    @app.errorhandler(NFSUnavailableError)
+    def nfs_unavailable(e):
+        return {'error': 'Armazenamento de gravações indisponível'}, 503, {'Retry-After': str(e.retry_after)}
+    
+    # Readiness: pronto somente quando as dependências respondem
+    @app.route('/api/ready', methods=['GET'])
+    def readiness_check():
+        """Endpoint de prontidão (503 enquanto o NFS não responder)"""
+        nfs = get_mount_monitor().to_dict()
+        breaker = get_nfs_guard().to_dict()
+        ready = nfs['status'] == 'ready' and breaker['state'] == 'closed'
+        
+        return {
+            'status': 'ready' if ready else 'degraded',
+            'checks': {'nfs': nfs, 'nfs_breaker': breaker}
+        }, 200 if ready else 503
+    
+    # Validação do NFS em segundo plano: não bloqueia a inicialização
+    get_mount_monitor().ensure_started()
+    
     logger.info("Aplicação Flask inicializada com sucesso")
     return app
@@ -0,0 +1,151 @@
+"""
+Rotas administrativas
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Endpoints para listar e baixar perfis de requisições e verificar
+os índices recomendados do banco e atualizar os rollups de sessões
+"""
+
+from flask import Blueprint, request, jsonify, send_file
+from app.analytics.services import get_analytics_service
+from app.history.services import HistoryService
+from app.utils.decorators import handle_errors, admin_token_required
+from app.utils.profiling import profile_store
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Criar blueprint administrativo
+admin_bp = Blueprint('admin', __name__)
+
+# Instanciar serviço
+history_service = HistoryService()
+
+
+@admin_bp.route('/profiles', methods=['GET'])
+@handle_errors
+@admin_token_required
+def list_profiles():
+    """
+    Endpoint para listar os perfis gravados
+    
+    Returns:
+        dict: Lista de perfis (mais recentes primeiro)
+    """
+    profiles = profile_store.list()
+    
+    return jsonify({
+        'success': True,
+        'data': profiles
+    }), 200
+
+
+@admin_bp.route('/profiles/<profile_name>', methods=['GET'])
+@handle_errors
+@admin_token_required
+def get_profile(profile_name):
+    """
+    Endpoint para baixar um perfil (formato speedscope)
+    
+    Args:
+        profile_name: Nome do arquivo de perfil
+    
+    Returns:
+        file: Perfil em JSON
+    """
+    path = profile_store.get_path(profile_name)
+    
+    if not path:
+        logger.warning("Perfil %s não encontrado", profile_name)
+        return jsonify({'error': 'Perfil não encontrado'}), 404
+    
+    return send_file(
+        str(path),
+        mimetype='application/json',
+        as_attachment=True,
+        download_name=profile_name
+    )
+
+
+@admin_bp.route('/indexes', methods=['GET'])
+@handle_errors
+@admin_token_required
+def check_indexes():
+    """
+    Endpoint para verificar os índices recomendados para a busca no
+    histórico de sessões e a contagem de sessões ativas das listagens
+    
+    Returns:
+        dict: Índices existentes e recomendações (com o CREATE INDEX das pendentes)
+    """
+    try:
+        result = history_service.index_recommendations()
+        
+        return jsonify({
+            'success': True,
+            'data': result
+        }), 200
+    
+    except Exception as e:
+        logger.error("Erro ao verificar índices: %s", e)
+        return jsonify({'error': 'Erro ao verificar índices'}), 500
+
+
+@admin_bp.route('/analytics/setup', methods=['POST'])
+@handle_errors
+@admin_token_required
+def setup_analytics():
+    """
+    Endpoint para criar as tabelas de rollup de sessões no banco do
+    Guacamole (passo único de instalação; requer o privilégio CREATE)
+    
+    Returns:
+        dict: Confirmação
+    """
+    try:
+        get_analytics_service().setup()
+        
+        return jsonify({
+            'success': True,
+            'message': 'Tabelas de rollup de sessões criadas'
+        }), 200
+    
+    except Exception as e:
+        logger.error("Erro ao criar tabelas de rollup de sessões: %s", e)
+        return jsonify({'error': 'Erro ao criar tabelas de rollup de sessões'}), 500
+
+
+@admin_bp.route('/analytics/refresh', methods=['POST'])
+@handle_errors
+@admin_token_required
+def refresh_analytics():
+    """
+    Endpoint para atualizar os rollups de sessões imediatamente (carga
+    inicial de um histórico grande ou após desabilitar a atualização automática)
+    
+    Query Parameters:
+        max_batches: Máximo de lotes de ANALYTICS_REFRESH_BATCH sessões (padrão: 10)
+    
+    Returns:
+        dict: Sessões processadas, último history_id e se o histórico foi
+        alcançado; 409 se as tabelas ainda não foram criadas (/analytics/setup)
+    """
+    max_batches = request.args.get('max_batches', 10, type=int)
+    if max_batches < 1 or max_batches > 1000:
+        max_batches = 10
+    
+    try:
+        result = get_analytics_service().refresh(max_batches)
+        if not result['ready']:
+            return jsonify({
+                'error': 'Tabelas de rollup não criadas; execute POST /api/admin/analytics/setup'
+            }), 409
+        
+        return jsonify({
+            'success': True,
+            'data': result
+        }), 200
+    
+    except Exception as e:
+        logger.error("Erro ao atualizar rollups de sessões: %s", e)
+        return jsonify({'error': 'Erro ao atualizar rollups de sessões'}), 500
@@ -0,0 +1 @@
+"""Módulo de análise de sessões"""
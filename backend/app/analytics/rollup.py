@@ -0,0 +1,544 @@
+"""
+Tabelas de rollup das sessões
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Agregados diários por conexão e por usuário (sessões, duração
+total, histograma de durações e pico de concorrência), materializados de
+forma incremental a partir do último history_id processado (sem saltar ids
+que ainda podem ser confirmados). Sessões ainda ativas ficam pendentes e
+entram no rollup quando terminam. As tabelas são
+criadas somente pelo passo administrativo explícito (create_schema).
+"""
+
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+import psycopg2
+from psycopg2.extras import execute_values
+from app.database import DatabaseConnection
+from app.utils.logger import setup_logger
+from app.utils.request_context import timed
+
+logger = setup_logger(__name__)
+
+ROLLUP_NAME = 'sessions'
+
+# Histograma de durações: faixa i = [2^(i/4) - 1, 2^((i+1)/4) - 1) segundos
+# (cada faixa ~19% mais larga que a anterior); a última acumula tudo acima de
+# 2^24 s. Faixas somam entre lotes, a mediana não.
+BUCKETS_PER_OCTAVE = 4
+DURATION_BUCKETS = 24 * BUCKETS_PER_OCTAVE + 1
+
+# history_id vem de uma sequência: um id ausente entre os visíveis é uma
+# inserção ainda não confirmada ou desfeita. O watermark para antes do
+# primeiro id ausente enquanto a sessão seguinte começou há menos que este
+# prazo (a inserção do Guacamole é curta; depois disso o id é tratado como
+# desfeito), assim uma sessão confirmada com atraso não fica de fora. Reler
+# uma janela abaixo do watermark exigiria registrar os ids já somados.
+LATE_COMMIT_GRACE = timedelta(minutes=5)
+
+# Chave do pg_try_advisory_xact_lock: um único refresh por vez entre processos
+REFRESH_LOCK_KEY = 0x6775616370
+
+SQL_CREATE_ROLLUP = """
+    CREATE TABLE IF NOT EXISTS guacplayer_rollup_state (
+        name text PRIMARY KEY,
+        last_history_id bigint NOT NULL DEFAULT 0,
+        refreshed_at timestamptz
+    );
+    CREATE TABLE IF NOT EXISTS guacplayer_rollup_pending (
+        history_id bigint PRIMARY KEY
+    );
+    CREATE TABLE IF NOT EXISTS guacplayer_session_rollup (
+        dimension text NOT NULL,
+        key text NOT NULL,
+        day date NOT NULL,
+        label text,
+        sessions integer NOT NULL DEFAULT 0,
+        total_seconds double precision NOT NULL DEFAULT 0,
+        duration_buckets integer[] NOT NULL,
+        peak_concurrency integer NOT NULL DEFAULT 0,
+        PRIMARY KEY (dimension, key, day)
+    );
+    CREATE INDEX IF NOT EXISTS guacplayer_session_rollup_day
+        ON guacplayer_session_rollup (dimension, day);
+"""
+
+SQL_ROLLUP_TABLES_EXIST = """
+    SELECT
+        to_regclass('guacplayer_rollup_state') IS NOT NULL
+        AND to_regclass('guacplayer_rollup_pending') IS NOT NULL
+        AND to_regclass('guacplayer_session_rollup') IS NOT NULL
+"""
+
+SQL_LOCK_REFRESH = "SELECT pg_try_advisory_xact_lock(%s)"
+
+SQL_GET_WATERMARK = """
+    INSERT INTO guacplayer_rollup_state (name) VALUES (%s)
+    ON CONFLICT (name) DO UPDATE SET name = EXCLUDED.name
+    RETURNING last_history_id, refreshed_at
+"""
+
+SQL_SET_WATERMARK = """
+    UPDATE guacplayer_rollup_state
+    SET last_history_id = %s, refreshed_at = now()
+    WHERE name = %s
+"""
+
+SQL_GET_STATE = "SELECT last_history_id, refreshed_at FROM guacplayer_rollup_state WHERE name = %s"
+
+SQL_NEW_SESSIONS = """
+    SELECT
+        history_id,
+        connection_id,
+        connection_name,
+        username,
+        start_date,
+        end_date
+    FROM guacamole_connection_history
+    WHERE history_id > %s
+    ORDER BY history_id
+    LIMIT %s
+"""
+
+SQL_ENDED_PENDING_SESSIONS = """
+    SELECT
+        h.history_id,
+        h.connection_id,
+        h.connection_name,
+        h.username,
+        h.start_date,
+        h.end_date
+    FROM guacplayer_rollup_pending p
+    JOIN guacamole_connection_history h ON h.history_id = p.history_id
+    WHERE h.end_date IS NOT NULL
+"""
+
+SQL_ADD_PENDING = "INSERT INTO guacplayer_rollup_pending (history_id) VALUES %s ON CONFLICT DO NOTHING"
+
+SQL_REMOVE_PENDING = "DELETE FROM guacplayer_rollup_pending WHERE history_id = ANY(%s)"
+
+# Pico de concorrência por (chave, dia), recalculado só para os pares tocados
+# pelo lote: varredura de eventos +1/-1 das sessões que se sobrepõem ao dia
+# (fins antes de inícios no mesmo instante). Sessões iniciadas mais de
+# max_session_hours antes do dia não são consideradas.
+SQL_PEAK_TEMPLATE = """
+    WITH touched AS (
+        SELECT DISTINCT key, day FROM unnest(%s::text[], %s::date[]) AS t(key, day)
+    ),
+    bounds AS (
+        SELECT
+            key,
+            day,
+            day::timestamp AT TIME ZONE 'UTC' AS day_start,
+            (day + 1)::timestamp AT TIME ZONE 'UTC' AS day_end
+        FROM touched
+    ),
+    sessions AS (
+        SELECT
+            b.key,
+            b.day,
+            GREATEST(h.start_date, b.day_start) AS started,
+            LEAST(COALESCE(h.end_date, now()), b.day_end) AS ended
+        FROM bounds b
+        JOIN guacamole_connection_history h
+          ON {match}
+         AND h.start_date < b.day_end
+         AND h.start_date >= b.day_start - make_interval(hours => %s)
+         AND COALESCE(h.end_date, now()) > b.day_start
+    ),
+    events AS (
+        SELECT key, day, started AS at, 1 AS delta FROM sessions
+        UNION ALL
+        SELECT key, day, ended AS at, -1 AS delta FROM sessions
+    )
+    SELECT key, day, MAX(concurrent)
+    FROM (
+        SELECT
+            key,
+            day,
+            SUM(delta) OVER (PARTITION BY key, day ORDER BY at, delta ROWS UNBOUNDED PRECEDING) AS concurrent
+        FROM events
+    ) running
+    GROUP BY key, day
+"""
+
+# Fragmentos fixos de junção por dimensão
+PEAK_MATCH = {
+    'connection': 'h.connection_id = b.key::integer',
+    'user': 'h.username = b.key'
+}
+
+SQL_UPSERT_ROLLUP = """
+    INSERT INTO guacplayer_session_rollup AS r
+        (dimension, key, day, label, sessions, total_seconds, duration_buckets, peak_concurrency)
+    VALUES %s
+    ON CONFLICT (dimension, key, day) DO UPDATE SET
+        label = COALESCE(EXCLUDED.label, r.label),
+        sessions = r.sessions + EXCLUDED.sessions,
+        total_seconds = r.total_seconds + EXCLUDED.total_seconds,
+        duration_buckets = ARRAY(
+            SELECT a + b
+            FROM unnest(r.duration_buckets, EXCLUDED.duration_buckets) AS u(a, b)
+        ),
+        peak_concurrency = EXCLUDED.peak_concurrency
+"""
+
+# Leitura: totais por chave no período e histograma somado das chaves do
+# topo; {key_filter} restringe às chaves legíveis pelo usuário (ROLLUP_KEY_FILTER)
+SQL_ROLLUP_BY_KEY = """
+    SELECT
+        key,
+        MAX(label) AS label,
+        SUM(sessions) AS sessions,
+        SUM(total_seconds) AS total_seconds,
+        MAX(peak_concurrency) AS peak_concurrency
+    FROM guacplayer_session_rollup r
+    WHERE r.dimension = %s AND r.day >= %s AND r.day < %s{key_filter}
+    GROUP BY key
+    ORDER BY SUM(sessions) DESC, key
+    LIMIT %s
+"""
+
+SQL_ROLLUP_BUCKETS_BY_KEY = """
+    SELECT r.key, u.bucket, SUM(u.count)
+    FROM guacplayer_session_rollup r,
+         unnest(r.duration_buckets) WITH ORDINALITY AS u(count, bucket)
+    WHERE r.dimension = %s AND r.day >= %s AND r.day < %s AND r.key = ANY(%s)
+    GROUP BY r.key, u.bucket
+"""
+
+# Série diária: o pico é o maior pico de uma única chave no dia, não a
+# concorrência somada de todas (que não é derivável dos picos por chave e,
+# com {key_filter}, dependeria das chaves legíveis pelo usuário)
+SQL_ROLLUP_DAILY = """
+    SELECT
+        r.day,
+        SUM(r.sessions) AS sessions,
+        SUM(r.total_seconds) AS total_seconds,
+        MAX(r.peak_concurrency) AS max_key_peak_concurrency
+    FROM guacplayer_session_rollup r
+    WHERE r.dimension = %s AND r.day >= %s AND r.day < %s{key_filter}
+    GROUP BY r.day
+    ORDER BY r.day
+"""
+
+ROLLUP_KEY_FILTER = " AND r.key = ANY(%s)"
+
+SQL_ROLLUP_BUCKETS_DAILY = """
+    SELECT r.day, u.bucket, SUM(u.count)
+    FROM guacplayer_session_rollup r,
+         unnest(r.duration_buckets) WITH ORDINALITY AS u(count, bucket)
+    WHERE r.dimension = %s AND r.day >= %s AND r.day < %s{key_filter}
+    GROUP BY r.day, u.bucket
+"""
+
+
+def _utc(value):
+    """Converte um timestamp do histórico para UTC (sem fuso = já em UTC)"""
+    return value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def visible_prefix(rows, last_history_id, now):
+    """
+    Sessões novas que podem avançar o watermark: as anteriores ao primeiro
+    history_id ausente que ainda pode ser uma inserção não confirmada
+    
+    Args:
+        rows: Sessões com history_id > last_history_id, em ordem de history_id
+        last_history_id: Watermark atual
+        now: Instante atual (UTC)
+    
+    Returns:
+        list: Prefixo de rows
+    """
+    expected = last_history_id + 1
+    for index, row in enumerate(rows):
+        if row[0] != expected and _utc(row[4]) > now - LATE_COMMIT_GRACE:
+            return rows[:index]
+        expected = row[0] + 1
+    return rows
+
+
+def duration_bucket(seconds):
+    """
+    Faixa do histograma de uma duração
+    
+    Args:
+        seconds: Duração em segundos
+    
+    Returns:
+        int: Índice da faixa (0 a DURATION_BUCKETS - 1)
+    """
+    return min(DURATION_BUCKETS - 1, int(BUCKETS_PER_OCTAVE * math.log2(max(0.0, seconds) + 1)))
+
+
+def histogram_median(buckets):
+    """
+    Mediana aproximada de um histograma de durações (interpolação linear
+    dentro da faixa da mediana)
+    
+    Args:
+        buckets: Contagem por faixa
+    
+    Returns:
+        float: Mediana em segundos, ou None sem sessões
+    """
+    total = sum(buckets)
+    if not total:
+        return None
+    
+    half = total / 2
+    seen = 0
+    for index, count in enumerate(buckets):
+        if count and seen + count >= half:
+            low = 2 ** (index / BUCKETS_PER_OCTAVE) - 1
+            high = 2 ** ((index + 1) / BUCKETS_PER_OCTAVE) - 1
+            return round(low + (high - low) * (half - seen) / count, 1)
+        seen += count
+    return None
+
+
+class SessionRollup:
+    """Materialização incremental e leitura dos rollups de sessões"""
+    
+    def __init__(self):
+        """Inicializa o acesso (as tabelas vêm de create_schema)"""
+        self.db = DatabaseConnection()
+        self._schema_ready = False
+    
+    @timed('db')
+    def is_ready(self):
+        """
+        Verifica se as tabelas de rollup existem (positivo fica em cache no processo)
+        
+        Returns:
+            bool: True se as tabelas foram criadas
+        """
+        if self._schema_ready:
+            return True
+        
+        try:
+            with self.db.get_cursor(cursor_factory=None) as cursor:
+                cursor.execute(SQL_ROLLUP_TABLES_EXIST)
+                self._schema_ready = bool(cursor.fetchone()[0])
+                return self._schema_ready
+        
+        except psycopg2.Error as e:
+            logger.error("Erro ao verificar tabelas de rollup: %s", e)
+            raise
+    
+    @timed('db')
+    def create_schema(self):
+        """
+        Cria as tabelas de rollup (passo administrativo; requer o privilégio
+        CREATE no banco do Guacamole)
+        """
+        try:
+            with self.db.get_cursor(cursor_factory=None) as cursor:
+                cursor.execute(SQL_CREATE_ROLLUP)
+            self._schema_ready = True
+            logger.info("Tabelas de rollup de sessões criadas")
+        
+        except psycopg2.Error as e:
+            logger.error("Erro ao criar tabelas de rollup: %s", e)
+            raise
+    
+    @timed('db')
+    def refresh(self, batch_size, max_session_hours):
+        """
+        Processa as sessões novas desde o último history_id e as pendentes
+        que terminaram, em uma transação
+        
+        Args:
+            batch_size: Máximo de sessões novas por execução
+            max_session_hours: Janela anterior ao dia considerada no pico
+        
+        Returns:
+            dict: {processed, pending, last_history_id, caught_up}, ou None
+            se outro processo já está atualizando
+        """
+        try:
+            with self.db.get_cursor(cursor_factory=None) as cursor:
+                cursor.execute(SQL_LOCK_REFRESH, (REFRESH_LOCK_KEY,))
+                if not cursor.fetchone()[0]:
+                    return None
+                
+                cursor.execute(SQL_GET_WATERMARK, (ROLLUP_NAME,))
+                last_history_id = cursor.fetchone()[0]
+                
+                cursor.execute(SQL_NEW_SESSIONS, (last_history_id, batch_size))
+                fetched = cursor.fetchall()
+                new_rows = visible_prefix(fetched, last_history_id, datetime.now(timezone.utc))
+                cursor.execute(SQL_ENDED_PENDING_SESSIONS)
+                ended_pending = cursor.fetchall()
+                
+                active = [row[0] for row in new_rows if row[5] is None]
+                ended = [row for row in new_rows if row[5] is not None] + ended_pending
+                
+                if active:
+                    execute_values(cursor, SQL_ADD_PENDING, [(history_id,) for history_id in active])
+                if ended_pending:
+                    cursor.execute(SQL_REMOVE_PENDING, ([row[0] for row in ended_pending],))
+                
+                aggregates = self._aggregate(ended, new_rows, max_session_hours)
+                self._apply_peaks(cursor, aggregates, max_session_hours)
+                if aggregates:
+                    execute_values(cursor, SQL_UPSERT_ROLLUP, [
+                        (dimension, key, day, item['label'], item['sessions'], item['total_seconds'],
+                         item['buckets'], item['peak'])
+                        for (dimension, key, day), item in aggregates.items()
+                    ])
+                
+                if new_rows:
+                    last_history_id = new_rows[-1][0]
+                cursor.execute(SQL_SET_WATERMARK, (last_history_id, ROLLUP_NAME))
+                
+                logger.debug(
+                    "Rollup de sessões: %s encerradas, %s ativas pendentes, último history_id %s",
+                    len(ended), len(active), last_history_id
+                )
+                return {
+                    'processed': len(ended),
+                    'pending': len(active),
+                    'last_history_id': last_history_id,
+                    'caught_up': len(fetched) < batch_size or len(new_rows) < len(fetched)
+                }
+        
+        except psycopg2.Error as e:
+            logger.error("Erro ao atualizar rollup de sessões: %s", e)
+            raise
+    
+    def _aggregate(self, ended, new_rows, max_session_hours):
+        """
+        Soma as sessões encerradas por (dimensão, chave, dia de início) e
+        marca os dias cobertos por sessões encerradas ou ativas (para o pico)
+        
+        Returns:
+            dict: {(dimensão, chave, dia): {label, sessions, total_seconds, buckets, peak}}
+        """
+        aggregates = defaultdict(lambda: {
+            'label': None, 'sessions': 0, 'total_seconds': 0.0,
+            'buckets': [0] * DURATION_BUCKETS, 'peak': 0
+        })
+        now = datetime.now(timezone.utc)
+        
+        def keys(row):
+            _, connection_id, connection_name, username, _, _ = row
+            result = []
+            if connection_id is not None:
+                result.append(('connection', str(connection_id), connection_name))
+            if username:
+                result.append(('user', username, None))
+            return result
+        
+        def days(row):
+            # Dias (UTC) em que a sessão esteve ativa, até o limite do pico
+            start_date, end_date = _utc(row[4]), _utc(row[5]) if row[5] else now
+            end_date = min(end_date, start_date + timedelta(hours=max_session_hours))
+            day = start_date.date()
+            while day <= end_date.date():
+                yield day
+                day += timedelta(days=1)
+        
+        for row in ended:
+            seconds = max(0.0, (row[5] - row[4]).total_seconds())
+            start_day = _utc(row[4]).date()
+            for dimension, key, label in keys(row):
+                item = aggregates[(dimension, key, start_day)]
+                item['sessions'] += 1
+                item['total_seconds'] += seconds
+                item['buckets'][duration_bucket(seconds)] += 1
+        
+        for row in ended + [row for row in new_rows if row[5] is None]:
+            for dimension, key, label in keys(row):
+                for day in days(row):
+                    item = aggregates[(dimension, key, day)]
+                    item['label'] = label or item['label']
+        
+        return aggregates
+    
+    def _apply_peaks(self, cursor, aggregates, max_session_hours):
+        """Recalcula o pico de concorrência dos pares (chave, dia) tocados"""
+        for dimension, match in PEAK_MATCH.items():
+            touched = [(key, day) for (dim, key, day) in aggregates if dim == dimension]
+            if not touched:
+                continue
+            cursor.execute(
+                SQL_PEAK_TEMPLATE.format(match=match),
+                ([key for key, _ in touched], [day for _, day in touched], max_session_hours)
+            )
+            for key, day, peak in cursor.fetchall():
+                aggregates[(dimension, key, day)]['peak'] = peak or 0
+    
+    @timed('db')
+    def get_state(self):
+        """
+        Estado da materialização
+        
+        Returns:
+            tuple: (último history_id, data do último refresh) ou (None, None)
+        """
+        try:
+            with self.db.get_cursor(cursor_factory=None) as cursor:
+                cursor.execute(SQL_GET_STATE, (ROLLUP_NAME,))
+                row = cursor.fetchone()
+                return tuple(row) if row else (None, None)
+        
+        except psycopg2.Error as e:
+            logger.error("Erro ao obter estado do rollup: %s", e)
+            raise
+    
+    @timed('db')
+    def summarize(self, dimension, start_day, end_day, limit, keys=None):
+        """
+        Lê os agregados do período
+        
+        Args:
+            dimension: 'connection' ou 'user'
+            start_day: Primeiro dia (inclusivo)
+            end_day: Último dia (exclusivo)
+            limit: Máximo de chaves (as com mais sessões)
+            keys: Chaves permitidas (None = todas), também na série diária
+        
+        Returns:
+            tuple: (itens por chave, itens por dia), cada um com o histograma somado
+        """
+        if keys is not None and not keys:
+            return [], []
+        
+        key_filter = ROLLUP_KEY_FILTER if keys is not None else ''
+        try:
+            with self.db.get_cursor(cursor_factory=None) as cursor:
+                period = (dimension, start_day, end_day) + ((list(keys),) if keys is not None else ())
+                
+                cursor.execute(SQL_ROLLUP_BY_KEY.format(key_filter=key_filter), period + (limit,))
+                by_key = [
+                    {'key': key, 'label': label, 'sessions': int(sessions),
+                     'total_seconds': float(total_seconds), 'peak_concurrency': int(peak),
+                     'buckets': [0] * DURATION_BUCKETS}
+                    for key, label, sessions, total_seconds, peak in cursor.fetchall()
+                ]
+                if by_key:
+                    index = {item['key']: item for item in by_key}
+                    cursor.execute(SQL_ROLLUP_BUCKETS_BY_KEY, (dimension, start_day, end_day, list(index)))
+                    for key, bucket, count in cursor.fetchall():
+                        index[key]['buckets'][bucket - 1] = int(count)
+                
+                cursor.execute(SQL_ROLLUP_DAILY.format(key_filter=key_filter), period)
+                daily = [
+                    {'day': day, 'sessions': int(sessions), 'total_seconds': float(total_seconds),
+                     'max_key_peak_concurrency': int(peak), 'buckets': [0] * DURATION_BUCKETS}
+                    for day, sessions, total_seconds, peak in cursor.fetchall()
+                ]
+                if daily:
+                    index = {item['day']: item for item in daily}
+                    cursor.execute(SQL_ROLLUP_BUCKETS_DAILY.format(key_filter=key_filter), period)
+                    for day, bucket, count in cursor.fetchall():
+                        index[day]['buckets'][bucket - 1] = int(count)
+                
+                return by_key, daily
+        
+        except psycopg2.Error as e:
+            logger.error("Erro ao ler rollup de sessões: %s", e)
+            raise
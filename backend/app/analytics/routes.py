@@ -0,0 +1,78 @@
+"""
+Rotas de análise de sessões
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Estatísticas de sessões por conexão e por usuário, servidas a
+partir dos rollups materializados
+"""
+
+from flask import Blueprint, request, jsonify
+from app.analytics.services import ANALYTICS_DIMENSIONS, default_period, get_analytics_service, parse_day
+from app.auth.acl import get_user_acl
+from app.utils.decorators import handle_errors, token_required
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Criar blueprint de análise
+analytics_bp = Blueprint('analytics', __name__)
+
+# Período máximo de uma consulta, em dias
+MAX_RANGE_DAYS = 366
+
+
+@analytics_bp.route('/sessions', methods=['GET'])
+@handle_errors
+@token_required
+def session_analytics(current_user):
+    """
+    Endpoint para obter sessões por dia, duração total e mediana e pico de
+    concorrência por conexão ou por usuário
+    
+    Sem ADMINISTER, by=connection considera só as conexões legíveis e
+    by=user é negado (os totais por usuário cobrem todas as conexões).
+    
+    Cada item traz peak_concurrency, o pico da conexão/usuário no período;
+    cada dia da série diária traz max_key_peak_concurrency, o maior pico de
+    uma única conexão/usuário no dia (não a concorrência total).
+    
+    Query Parameters:
+        by: connection ou user (padrão: connection)
+        from: Primeiro dia, AAAA-MM-DD, UTC (padrão: 29 dias antes de to)
+        to: Último dia, AAAA-MM-DD, UTC (padrão: hoje)
+        limit: Máximo de conexões/usuários (padrão: 20)
+    
+    Returns:
+        dict: Itens, série diária e estado da materialização
+    """
+    # Parâmetro inválido: ValueError vira 400 em handle_errors
+    dimension = request.args.get('by', 'connection')
+    if dimension not in ANALYTICS_DIMENSIONS:
+        raise ValueError(f"by deve ser um de: {', '.join(ANALYTICS_DIMENSIONS)}")
+    
+    # Validação após os padrões: só from ou só to também respeitam os limites
+    start_day, end_day = default_period(
+        parse_day(request.args.get('from'), 'from'), parse_day(request.args.get('to'), 'to')
+    )
+    if start_day > end_day:
+        raise ValueError("from deve ser anterior ou igual a to")
+    if (end_day - start_day).days >= MAX_RANGE_DAYS:
+        raise ValueError(f"Período máximo de {MAX_RANGE_DAYS} dias")
+    
+    limit = request.args.get('limit', 20, type=int)
+    if limit < 1 or limit > 100:
+        limit = 20
+    
+    acl = get_user_acl(current_user)
+    if dimension == 'user' and not acl.administer:
+        return jsonify({'error': 'Estatísticas por usuário exigem permissão de administração'}), 403
+    
+    logger.debug("Estatísticas de sessões por %s: %s a %s", dimension, start_day, end_day)
+    
+    try:
+        result = get_analytics_service().sessions(dimension, start_day, end_day, limit, acl)
+        return jsonify(result), 200
+    
+    except Exception as e:
+        logger.error("Erro ao obter estatísticas de sessões: %s", e)
+        return jsonify({'error': 'Erro ao obter estatísticas de sessões'}), 500
@@ -0,0 +1,245 @@
+"""
+Serviços de análise de sessões
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Consulta dos rollups de sessões (por conexão ou por usuário) e
+atualização incremental em segundo plano, sem bloquear as leituras. Sem as
+tabelas de rollup (POST /api/admin/analytics/setup), as leituras retornam
+vazio com rollup.ready=false e nada é atualizado.
+"""
+
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from app.analytics.rollup import SessionRollup, histogram_median
+from app.config import Config
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Dimensões disponíveis em ?by=
+ANALYTICS_DIMENSIONS = ('connection', 'user')
+
+
+def parse_day(value, name):
+    """
+    Interpreta um dia (AAAA-MM-DD) da query string
+    
+    Args:
+        value: Texto do dia
+        name: Nome do parâmetro (para a mensagem de erro)
+    
+    Returns:
+        date: Dia ou None se ausente
+    
+    Raises:
+        ValueError: Dia inválido
+    """
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError as e:
+        raise ValueError(f"{name} deve ser um dia no formato AAAA-MM-DD") from e
+
+
+def default_period(start_day=None, end_day=None):
+    """
+    Completa o período com os padrões (até hoje, UTC; 30 dias)
+    
+    Args:
+        start_day: Primeiro dia, inclusivo (padrão: 29 dias antes de end_day)
+        end_day: Último dia, inclusivo (padrão: hoje, UTC)
+    
+    Returns:
+        tuple: (start_day, end_day)
+    """
+    end_day = end_day or datetime.now(timezone.utc).date()
+    return start_day or end_day - timedelta(days=29), end_day
+
+
+def _summary(item):
+    """Converte o histograma em médias/mediana e remove os campos internos"""
+    buckets = item.pop('buckets')
+    sessions = item['sessions']
+    item['total_seconds'] = round(item['total_seconds'], 1)
+    item['avg_seconds'] = round(item['total_seconds'] / sessions, 1) if sessions else None
+    item['median_seconds'] = histogram_median(buckets)
+    return item
+
+
+class AnalyticsService:
+    """Serviço de análise de sessões"""
+    
+    def __init__(self):
+        """Inicializa o serviço (a atualização roda em uma thread por processo)"""
+        self.rollup = SessionRollup()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._running = False
+        self._last_started = 0.0
+    
+    def schedule_refresh(self):
+        """
+        Dispara a atualização dos rollups em segundo plano quando a última
+        tem mais de ANALYTICS_REFRESH_INTERVAL segundos
+        
+        Returns:
+            bool: True se uma atualização está em andamento
+        """
+        if not Config.ANALYTICS_AUTO_REFRESH:
+            return self._running and self._pid == os.getpid()
+        
+        with self._lock:
+            # Estado herdado do processo pai não vale após o fork
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._running = False
+                self._last_started = 0.0
+            
+            if self._running:
+                return True
+            if time.monotonic() - self._last_started < Config.ANALYTICS_REFRESH_INTERVAL:
+                return False
+            
+            self._running = True
+            self._last_started = time.monotonic()
+        
+        threading.Thread(target=self._refresh_in_background, name='analytics-refresh', daemon=True).start()
+        return True
+    
+    def _refresh_in_background(self):
+        """Executa a atualização e libera a próxima"""
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.error("Erro na atualização dos rollups de sessões: %s", e)
+        finally:
+            self._running = False
+    
+    def refresh(self, max_batches=None):
+        """
+        Atualiza os rollups em lotes de ANALYTICS_REFRESH_BATCH sessões, cada
+        um em sua transação, até alcançar o histórico
+        
+        Args:
+            max_batches: Limite de lotes nesta chamada (None = até alcançar)
+        
+        Returns:
+            dict: {ready, processed, batches, last_history_id, caught_up, skipped}
+        """
+        result = {
+            'ready': True, 'processed': 0, 'batches': 0, 'last_history_id': None,
+            'caught_up': False, 'skipped': False
+        }
+        if not self.rollup.is_ready():
+            logger.warning("Tabelas de rollup de sessões não criadas; atualização ignorada")
+            result['ready'] = False
+            return result
+        
+        while max_batches is None or result['batches'] < max_batches:
+            batch = self.rollup.refresh(Config.ANALYTICS_REFRESH_BATCH, Config.ANALYTICS_MAX_SESSION_HOURS)
+            if batch is None:
+                # Outro processo detém o advisory lock
+                result['skipped'] = True
+                break
+            
+            result['batches'] += 1
+            result['processed'] += batch['processed']
+            result['last_history_id'] = batch['last_history_id']
+            if batch['caught_up']:
+                result['caught_up'] = True
+                break
+        
+        logger.info(
+            "Rollups de sessões atualizados: %s sessões em %s lotes (último history_id %s)",
+            result['processed'], result['batches'], result['last_history_id']
+        )
+        return result
+    
+    def setup(self):
+        """Cria as tabelas de rollup (passo administrativo explícito)"""
+        self.rollup.create_schema()
+    
+    def sessions(self, dimension='connection', start_day=None, end_day=None, limit=20, acl=None):
+        """
+        Estatísticas de sessões por conexão ou usuário no período
+        
+        Args:
+            dimension: 'connection' ou 'user'
+            start_day: Primeiro dia, inclusivo (padrão: 30 dias antes de end_day)
+            end_day: Último dia, inclusivo (padrão: hoje, UTC)
+            limit: Máximo de conexões/usuários (os com mais sessões)
+            acl: ConnectionAcl do usuário (por conexão, só as legíveis)
+        
+        Returns:
+            dict: Itens, série diária e estado da materialização
+        """
+        try:
+            start_day, end_day = default_period(start_day, end_day)
+            
+            if not self.rollup.is_ready():
+                return {
+                    'success': True,
+                    'data': {
+                        'by': dimension,
+                        'from': start_day.isoformat(),
+                        'to': end_day.isoformat(),
+                        'items': [],
+                        'daily': []
+                    },
+                    'rollup': {'ready': False, 'last_history_id': None, 'refreshed_at': None, 'refreshing': False}
+                }
+            
+            refreshing = self.schedule_refresh()
+            
+            readable = acl.readable_ids() if acl is not None else None
+            keys = [str(connection_id) for connection_id in readable] if readable is not None else None
+            by_key, daily = self.rollup.summarize(
+                dimension, start_day, end_day + timedelta(days=1), limit, keys
+            )
+            last_history_id, refreshed_at = self.rollup.get_state()
+            
+            return {
+                'success': True,
+                'data': {
+                    'by': dimension,
+                    'from': start_day.isoformat(),
+                    'to': end_day.isoformat(),
+                    'items': [_summary(item) for item in by_key],
+                    'daily': [
+                        dict(_summary(item), day=item['day'].isoformat()) for item in daily
+                    ]
+                },
+                'rollup': {
+                    'ready': True,
+                    'last_history_id': last_history_id,
+                    'refreshed_at': refreshed_at.isoformat() if refreshed_at else None,
+                    'refreshing': refreshing
+                }
+            }
+        
+        except Exception as e:
+            logger.error("Erro ao obter estatísticas de sessões: %s", e)
+            raise
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_analytics_service():
+    """
+    Obtém o serviço de análise do processo (compartilhado entre as rotas
+    públicas e administrativas, que disputam a mesma atualização)
+    
+    Returns:
+        AnalyticsService: Serviço compartilhado
+    """
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = AnalyticsService()
+    return _service
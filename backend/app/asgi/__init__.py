@@ -0,0 +1,26 @@
+"""
+Modo ASGI do GuacPlayer Backend
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Expõe as rotas de conexões e gravações com handlers assíncronos
+nativos; as demais rotas são atendidas pela aplicação Flask
+"""
+
+from app import create_app
+from app.config import Config
+
+
+def create_asgi_app(config_class=Config):
+    """
+    Factory da aplicação ASGI
+    
+    Args:
+        config_class: Classe de configuração (padrão: Config)
+    
+    Returns:
+        AsyncApp: Aplicação ASGI
+    """
+    from app.asgi.server import AsyncApp
+    from app.asgi.routes import ROUTES
+    
+    return AsyncApp(create_app(config_class), ROUTES)
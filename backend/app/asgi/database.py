@@ -0,0 +1,185 @@
+"""
+Acesso assíncrono ao banco de dados PostgreSQL do Guacamole
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Consultas do modo ASGI com psycopg 3 e pool assíncrono, usando o
+mesmo SQL de app.database
+"""
+
+from app.config import Config
+from app.database import (
+    SQL_GET_CONNECTION, SQL_GET_CONNECTION_PARAMETERS, SQL_COUNT_CONNECTION_HISTORY,
+    SQL_LIST_CONNECTION_HISTORY, SQL_LIST_CONNECTION_HISTORY_IDS, SQL_GET_CONNECTION_HISTORY_BY_IDS,
+    ConnectionRow, HistoryRow, RecordedHistoryPager, connection_list_sql, recorded_history_counts,
+    recorded_history_total
+)
+from app.utils.logger import setup_logger
+from app.utils.request_context import timed
+
+try:
+    import psycopg
+    from psycopg.conninfo import make_conninfo
+    from psycopg_pool import AsyncConnectionPool
+    ASYNC_DB_AVAILABLE = True
+except ImportError:  # psycopg 3 é opcional (somente modo ASGI)
+    ASYNC_DB_AVAILABLE = False
+
+logger = setup_logger(__name__)
+
+
+class AsyncGuacamoleQueries:
+    """Consultas assíncronas do Guacamole (mesmo contrato de GuacamoleQueries)"""
+    
+    def __init__(self):
+        """Inicializa o gerenciador de queries (o pool é aberto em open())"""
+        self.pool = None
+    
+    async def open(self):
+        """Abre o pool de conexões do processo atual"""
+        conninfo = make_conninfo(
+            host=Config.DB_HOST,
+            port=Config.DB_PORT,
+            dbname=Config.DB_NAME,
+            user=Config.DB_USER,
+            password=Config.DB_PASSWORD
+        )
+        self.pool = AsyncConnectionPool(
+            conninfo,
+            min_size=Config.ASGI_DB_POOL_MIN_CONN,
+            max_size=Config.ASGI_DB_POOL_MAX_CONN,
+            timeout=Config.DB_POOL_TIMEOUT,
+            open=False
+        )
+        await self.pool.open()
+        logger.info("Pool PostgreSQL assíncrono aberto (máx. %s conexões)", Config.ASGI_DB_POOL_MAX_CONN)
+    
+    async def close(self):
+        """Fecha o pool de conexões"""
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+    
+    @timed('db')
+    async def get_connections(self, offset=0, limit=20, filters=None):
+        """
+        Obtém lista paginada de conexões
+        
+        Args:
+            offset: Número de registros a pular
+            limit: Número máximo de registros a retornar
+            filters: Dicionário {filtro: valor} com chaves de CONNECTION_LIST_FILTERS
+        
+        Returns:
+            tuple: (lista de ConnectionRow, total de registros)
+        """
+        count_sql, list_sql, args = connection_list_sql(filters)
+        
+        try:
+            async with self.pool.connection() as conn:
+                cursor = await conn.execute(count_sql, args)
+                total = (await cursor.fetchone())[0]
+                
+                cursor = await conn.execute(list_sql, args + (limit, offset))
+                connections = [ConnectionRow(*row) for row in await cursor.fetchall()]
+            
+            logger.debug("Recuperadas %s conexões (offset: %s, limit: %s)", len(connections), offset, limit)
+            return connections, total
+        
+        except psycopg.Error as e:
+            logger.error("Erro ao buscar conexões: %s", e)
+            raise
+    
+    @timed('db')
+    async def get_connection_by_id(self, connection_id):
+        """
+        Obtém detalhes de uma conexão específica
+        
+        Args:
+            connection_id: ID da conexão
+        
+        Returns:
+            ConnectionRow: Detalhes da conexão ou None
+        """
+        try:
+            async with self.pool.connection() as conn:
+                cursor = await conn.execute(SQL_GET_CONNECTION, (connection_id,))
+                row = await cursor.fetchone()
+            
+            if not row:
+                logger.warning("Conexão %s não encontrada", connection_id)
+                return None
+            return ConnectionRow(*row)
+        
+        except psycopg.Error as e:
+            logger.error("Erro ao buscar conexão %s: %s", connection_id, e)
+            raise
+    
+    @timed('db')
+    async def get_connection_parameters(self, connection_id):
+        """
+        Obtém parâmetros de uma conexão
+        
+        Args:
+            connection_id: ID da conexão
+        
+        Returns:
+            dict: Parâmetros da conexão
+        """
+        try:
+            async with self.pool.connection() as conn:
+                cursor = await conn.execute(SQL_GET_CONNECTION_PARAMETERS, (connection_id,))
+                return dict(await cursor.fetchall())
+        
+        except psycopg.Error as e:
+            logger.error("Erro ao buscar parâmetros da conexão %s: %s", connection_id, e)
+            raise
+    
+    @timed('db')
+    async def get_connection_history(self, connection_id, offset=0, limit=20, recorded_ids=None,
+                                     has_recording=None):
+        """
+        Obtém histórico de sessões de uma conexão
+        
+        Args:
+            connection_id: ID da conexão
+            offset: Número de registros a pular
+            limit: Número máximo de registros a retornar
+            recorded_ids: history_id com gravação (usado com has_recording)
+            has_recording: Filtrar sessões com (True) ou sem (False) gravação
+        
+        Returns:
+            tuple: (lista de HistoryRow, total de registros)
+        """
+        try:
+            async with self.pool.connection() as conn:
+                cursor = await conn.execute(SQL_COUNT_CONNECTION_HISTORY, (connection_id,))
+                total = (await cursor.fetchone())[0]
+                
+                if has_recording is None:
+                    cursor = await conn.execute(SQL_LIST_CONNECTION_HISTORY, (connection_id, limit, offset))
+                    history = [HistoryRow(*row) for row in await cursor.fetchall()]
+                else:
+                    # Mesmo percurso em blocos e total em cache do modo síncrono
+                    pager = RecordedHistoryPager(recorded_ids, has_recording, offset, limit)
+                    while not pager.done:
+                        cursor = await conn.execute(*pager.chunk_sql(connection_id))
+                        pager.feed(await cursor.fetchall())
+                    history = []
+                    if pager.page_ids:
+                        cursor = await conn.execute(SQL_GET_CONNECTION_HISTORY_BY_IDS, (pager.page_ids,))
+                        history = [HistoryRow(*row) for row in await cursor.fetchall()]
+                    
+                    recorded = recorded_history_counts.get(connection_id, recorded_ids, total)
+                    if recorded is None:
+                        cursor = await conn.execute(SQL_LIST_CONNECTION_HISTORY_IDS, (connection_id,))
+                        recorded = recorded_history_counts.put(
+                            connection_id, recorded_ids, total, [row[0] for row in await cursor.fetchall()]
+                        )
+                    total = recorded_history_total(recorded, total, has_recording)
+            
+            logger.debug("Histórico da conexão %s recuperado (%s registros)", connection_id, len(history))
+            return history, total
+        
+        except psycopg.Error as e:
+            logger.error("Erro ao buscar histórico da conexão %s: %s", connection_id, e)
+            raise
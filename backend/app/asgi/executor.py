@@ -0,0 +1,48 @@
+"""
+Executor limitado para operações bloqueantes no modo ASGI
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Executa chamadas síncronas (NFS, leitura de arquivos) em um pool de
+threads de tamanho fixo, limitando também a fila de chamadas pendentes
+"""
+
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BoundedExecutor:
+    """Pool de threads com limite de chamadas pendentes"""
+    
+    def __init__(self, max_workers, max_pending, name='nfs'):
+        """
+        Inicializa o executor
+        
+        Args:
+            max_workers: Threads do pool
+            max_pending: Chamadas em execução ou aguardando, no máximo
+            name: Prefixo do nome das threads
+        """
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = asyncio.Semaphore(max_pending)
+    
+    async def run(self, func, *args):
+        """
+        Executa func(*args) no pool, preservando o contexto da requisição
+        (métricas e timers dependem de ContextVars)
+        
+        Args:
+            func: Função síncrona
+            *args: Argumentos
+        
+        Returns:
+            Resultado da função
+        """
+        async with self._slots:
+            context = contextvars.copy_context()
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, context.run, func, *args)
+    
+    def shutdown(self):
+        """Encerra o pool aguardando as chamadas em andamento"""
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,46 @@
+"""
+Fallback WSGI do modo ASGI
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Adaptador WsgiToAsgi que executa cada requisição da aplicação Flask
+em um pool de threads dimensionado, em vez da thread única compartilhada que
+o asgiref usa por padrão (thread_sensitive=True)
+"""
+
+import inspect
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+# Função síncrona original, sem o decorador @sync_to_async do asgiref
+_run_wsgi_app = inspect.getattr_static(WsgiToAsgiInstance, 'run_wsgi_app').func
+
+
+class ThreadedWsgiToAsgiInstance(WsgiToAsgiInstance):
+    """Requisição WSGI executada no pool de threads do adaptador"""
+    
+    def __init__(self, wsgi_application, executor):
+        super().__init__(wsgi_application)
+        self.executor = executor
+    
+    async def run_wsgi_app(self, body):
+        """Executa a aplicação WSGI em uma thread do pool"""
+        await sync_to_async(_run_wsgi_app, thread_sensitive=False, executor=self.executor)(self, body)
+
+
+class ThreadedWsgiToAsgi(WsgiToAsgi):
+    """WsgiToAsgi com requisições concorrentes em um pool de threads"""
+    
+    def __init__(self, wsgi_application, executor=None):
+        """
+        Inicializa o adaptador
+        
+        Args:
+            wsgi_application: Aplicação WSGI (Flask)
+            executor: ThreadPoolExecutor das requisições (None = executor
+                padrão do loop); pode ser definido depois, na inicialização
+        """
+        super().__init__(wsgi_application)
+        self.executor = executor
+    
+    async def __call__(self, scope, receive, send):
+        await ThreadedWsgiToAsgiInstance(self.wsgi_application, self.executor)(scope, receive, send)
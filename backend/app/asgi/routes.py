@@ -0,0 +1,244 @@
+"""
+Rotas assíncronas nativas do modo ASGI
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Handlers assíncronos de conexões (banco via psycopg 3), gravações
+(NFS no executor limitado, vídeo em streaming) e feed SSE de sessões (sem
+ocupar threads), com as mesmas respostas dos blueprints Flask. As rotas de
+conexões não passam pelo cache de respostas (cached_response depende do
+request do Flask); o pool assíncrono atende essas leituras diretamente
+"""
+
+import asyncio
+from app.asgi.server import Route, JSONResponse, FileResponse, StreamResponse
+from app.auth.acl import get_user_acl
+from app.config import Config
+from app.connections.groups import group_filter, parse_group_id
+from app.connections.services import CONNECTION_FIELDS, HISTORY_FIELDS, parse_has_recording
+from app.recordings.services import RECORDING_FIELDS, RECORDING_FILE_FIELDS
+from app.sessions.services import get_session_broker
+from app.utils.fields import parse_fields
+from app.utils.logger import setup_logger
+from app.utils.nfs_guard import NFSUnavailableError
+
+logger = setup_logger(__name__)
+
+
+def _pagination_args(request):
+    """Obtém e valida page/per_page como nos blueprints Flask"""
+    page = request.arg('page', 1, type=int)
+    per_page = request.arg('per_page', 20, type=int)
+    
+    if page < 1:
+        page = 1
+    if per_page < 1 or per_page > 100:
+        per_page = 20
+    return page, per_page
+
+
+async def _user_acl(app, current_user):
+    """Permissões do usuário (em cache; a releitura usa o banco síncrono, no executor de banco)"""
+    return await app.db_executor.run(get_user_acl, current_user)
+
+
+async def list_connections(app, request, current_user):
+    """Lista conexões com paginação e busca opcional"""
+    # Campo ou grupo inválido: ValueError vira 400 no servidor
+    fields = parse_fields(request.arg('fields'), CONNECTION_FIELDS)
+    group_id = parse_group_id(request.arg('group_id'))
+    recursive = request.arg('recursive', 'true', type=str).strip().lower() not in ('false', '0', 'no')
+    acl = await _user_acl(app, current_user)
+    group_filters = (
+        await app.db_executor.run(group_filter, group_id, recursive, acl) if group_id is not None else None
+    )
+    
+    try:
+        page, per_page = _pagination_args(request)
+        search = request.arg('search', '', type=str).strip()
+        
+        if search:
+            result = await app.connections.search_connections(search, page, per_page, fields, acl, group_filters)
+        else:
+            result = await app.connections.get_connections_paginated(page, per_page, fields, acl, group_filters)
+        
+        return JSONResponse(result)
+    
+    except Exception as e:
+        logger.error("Erro ao listar conexões: %s", e)
+        return JSONResponse({'error': 'Erro ao listar conexões'}, 500)
+
+
+async def get_connection(app, request, connection_id, current_user):
+    """Detalhes de uma conexão"""
+    fields = parse_fields(request.arg('fields'), CONNECTION_FIELDS)
+    
+    try:
+        connection = await app.connections.get_connection_detail(
+            connection_id, fields, await _user_acl(app, current_user)
+        )
+        
+        if not connection:
+            return JSONResponse({'error': 'Conexão não encontrada'}, 404)
+        
+        return JSONResponse({'success': True, 'data': connection})
+    
+    except Exception as e:
+        logger.error("Erro ao obter conexão %s: %s", connection_id, e)
+        return JSONResponse({'error': 'Erro ao obter conexão'}, 500)
+
+
+async def get_connection_history(app, request, connection_id, current_user):
+    """Histórico paginado de sessões de uma conexão"""
+    fields = parse_fields(request.arg('fields'), HISTORY_FIELDS)
+    has_recording = parse_has_recording(request.arg('has_recording'))
+    
+    try:
+        page, per_page = _pagination_args(request)
+        result = await app.connections.get_connection_history_paginated(
+            connection_id, page, per_page, fields, has_recording, await _user_acl(app, current_user)
+        )
+        
+        if not result:
+            return JSONResponse({'error': 'Conexão não encontrada'}, 404)
+        
+        return JSONResponse(result)
+    
+    except NFSUnavailableError:
+        raise
+    except Exception as e:
+        logger.error("Erro ao obter histórico da conexão %s: %s", connection_id, e)
+        return JSONResponse({'error': 'Erro ao obter histórico'}, 500)
+
+
+async def get_recording_info(app, request, history_uuid, current_user):
+    """Informações de uma gravação"""
+    fields = parse_fields(request.arg('fields'), RECORDING_FIELDS)
+    
+    try:
+        acl = await _user_acl(app, current_user)
+        if not await app.executor.run(app.recordings.validate_recording_access, history_uuid, acl):
+            return JSONResponse({'error': 'Gravação não encontrada'}, 404)
+        
+        info = await app.executor.run(app.recordings.get_recording_info, history_uuid, fields)
+        if not info:
+            return JSONResponse({'error': 'Gravação não encontrada'}, 404)
+        
+        return JSONResponse({'success': True, 'data': info})
+    
+    except NFSUnavailableError:
+        raise
+    except Exception as e:
+        logger.error("Erro ao obter informações da gravação %s: %s", history_uuid, e)
+        return JSONResponse({'error': 'Erro ao obter informações da gravação'}, 500)
+
+
+async def _video_response(app, request, history_uuid, current_user, download):
+    """Valida a gravação e monta a resposta de vídeo (stream ou download)"""
+    acl = await _user_acl(app, current_user)
+    if not await app.executor.run(app.recordings.validate_recording_access, history_uuid, acl):
+        return JSONResponse({'error': 'Gravação não encontrada'}, 404)
+    
+    video_file = await app.executor.run(app.recordings.get_recording_video, history_uuid)
+    if not video_file:
+        return JSONResponse({'error': 'Arquivo de vídeo não encontrado'}, 404)
+    
+    return FileResponse(
+        video_file,
+        'video/mp4',
+        download_name=f'{history_uuid}.mp4' if download else None,
+        range_header=request.headers.get('range')
+    )
+
+
+async def stream_recording(app, request, history_uuid, current_user):
+    """Stream do vídeo de uma gravação (com suporte a Range)"""
+    try:
+        return await _video_response(app, request, history_uuid, current_user, download=False)
+    except NFSUnavailableError:
+        raise
+    except Exception as e:
+        logger.error("Erro ao fazer stream da gravação %s: %s", history_uuid, e)
+        return JSONResponse({'error': 'Erro ao fazer stream da gravação'}, 500)
+
+
+async def download_recording(app, request, history_uuid, current_user):
+    """Download do vídeo de uma gravação"""
+    try:
+        return await _video_response(app, request, history_uuid, current_user, download=True)
+    except NFSUnavailableError:
+        raise
+    except Exception as e:
+        logger.error("Erro ao baixar gravação %s: %s", history_uuid, e)
+        return JSONResponse({'error': 'Erro ao baixar gravação'}, 500)
+
+
+async def list_recording_files(app, request, history_uuid, current_user):
+    """Lista os arquivos de uma gravação"""
+    fields = parse_fields(request.arg('fields'), RECORDING_FILE_FIELDS)
+    
+    try:
+        acl = await _user_acl(app, current_user)
+        if not await app.executor.run(app.recordings.validate_recording_access, history_uuid, acl):
+            return JSONResponse({'error': 'Gravação não encontrada'}, 404)
+        
+        files = await app.executor.run(app.recordings.get_recording_files, history_uuid, fields)
+        
+        return JSONResponse({'success': True, 'uuid': history_uuid, 'files': files})
+    
+    except NFSUnavailableError:
+        raise
+    except Exception as e:
+        logger.error("Erro ao listar arquivos da gravação %s: %s", history_uuid, e)
+        return JSONResponse({'error': 'Erro ao listar arquivos'}, 500)
+
+
+async def session_events(app, request, current_user):
+    """Feed SSE de início e fim de sessões, aguardando no loop de eventos"""
+    try:
+        broker = get_session_broker(app.flask_app.json.dumps_bytes)
+        acl = await _user_acl(app, current_user)
+        # A primeira assinatura carrega as sessões ativas do banco síncrono
+        subscription, snapshot = await app.executor.run(broker.subscribe, acl, asyncio.get_running_loop())
+        
+        if subscription is None:
+            return JSONResponse(
+                {'error': 'Limite de conexões do feed atingido'}, 503,
+                headers=[('Retry-After', int(Config.SESSION_EVENTS_HEARTBEAT))]
+            )
+    
+    except Exception as e:
+        logger.error("Erro ao iniciar feed de sessões: %s", e)
+        return JSONResponse({'error': 'Erro ao iniciar feed de sessões'}, 500)
+    
+    logger.debug("Feed de sessões iniciado para o usuário %s", current_user)
+    
+    async def stream():
+        yield b'retry: %d\n\n' % Config.SESSION_EVENTS_RETRY_MS
+        yield snapshot
+        while True:
+            frame = await subscription.next_frame_async(Config.SESSION_EVENTS_HEARTBEAT)
+            if frame is None:
+                break
+            # Comentário periódico mantém a conexão viva em proxies
+            yield frame or b': keep-alive\n\n'
+    
+    return StreamResponse(
+        stream(),
+        'text/event-stream',
+        headers=[('Cache-Control', 'no-cache'), ('X-Accel-Buffering', 'no')],
+        on_close=lambda: broker.unsubscribe(subscription)
+    )
+
+
+# Mesmas regras e nomes de endpoint dos blueprints (métricas e access log)
+ROUTES = [
+    Route('/api/connections', 'connections.list_connections', list_connections, requires_db=True),
+    Route('/api/connections/<int:connection_id>', 'connections.get_connection', get_connection, requires_db=True),
+    Route('/api/connections/<int:connection_id>/history', 'connections.get_connection_history',
+          get_connection_history, requires_db=True),
+    Route('/api/recordings/<history_uuid>', 'recordings.get_recording_info', get_recording_info),
+    Route('/api/recordings/<history_uuid>/stream', 'recordings.stream_recording', stream_recording),
+    Route('/api/recordings/<history_uuid>/download', 'recordings.download_recording', download_recording),
+    Route('/api/recordings/<history_uuid>/files', 'recordings.list_recording_files', list_recording_files),
+    Route('/api/sessions/events', 'sessions.session_events', session_events, query_token=True),
+]
@@ -0,0 +1,567 @@
+"""
+Aplicação ASGI do GuacPlayer Backend
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Roteador ASGI com handlers assíncronos nativos para as rotas de
+E/S intensiva (conexões e gravações) e fallback para a aplicação Flask
+(via asgiref) nas demais rotas. Mantém métricas, Server-Timing, CORS e
+access log equivalentes aos da aplicação Flask.
+"""
+
+import asyncio
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from urllib.parse import parse_qsl, quote
+from app.asgi.database import ASYNC_DB_AVAILABLE, AsyncGuacamoleQueries
+from app.asgi.executor import BoundedExecutor
+from app.asgi.services import AsyncConnectionService
+from app.config import Config
+from app.recordings.services import RecordingService
+from app.utils.decorators import authenticate_token
+from app.utils.compression import is_eligible, conditional_json
+from app.utils.logger import setup_logger
+from app.utils.nfs_guard import NFSUnavailableError
+from app.utils.metrics import STREAMING_ENDPOINTS, request_started, observe_request, request_finished
+from app.utils.request_context import (
+    RequestMetrics, sanitize_query, bind_metrics, reset_metrics,
+    emit_access_log, timing_headers
+)
+
+try:
+    from app.asgi.fallback import ThreadedWsgiToAsgi
+except ImportError:  # asgiref é necessário apenas no modo ASGI
+    ThreadedWsgiToAsgi = None
+
+logger = setup_logger(__name__)
+
+RULE_PARAM_PATTERN = re.compile(r'<(?:(int):)?(\w+)>')
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _encode_headers(headers):
+    """Converte pares (nome, valor) para o formato ASGI"""
+    return [(name.lower().encode('latin-1'), str(value).encode('latin-1')) for name, value in headers]
+
+
+def parse_range(header, size):
+    """
+    Interpreta um header Range de intervalo único
+    
+    Args:
+        header: Valor do header (ex.: "bytes=0-1023")
+        size: Tamanho do arquivo
+    
+    Returns:
+        tuple: (início, fim) inclusivos; None se o intervalo não puder ser
+        satisfeito; False se o header deve ser ignorado (sintaxe inválida
+        ou múltiplos intervalos)
+    """
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or match.group(1) == match.group(2) == '':
+        return False
+    
+    first, last = match.groups()
+    if first == '':
+        # Sufixo: últimos N bytes
+        length = int(last)
+        if length == 0:
+            return None
+        return max(size - length, 0), size - 1
+    
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return None
+    return start, end
+
+
+class AsyncRequest:
+    """Dados de uma requisição HTTP recebida via ASGI"""
+    
+    def __init__(self, scope, receive=None):
+        """
+        Inicializa a requisição
+        
+        Args:
+            scope: Scope ASGI da requisição
+            receive: Callable receive do ASGI (detecção de desconexão)
+        """
+        self.receive = receive
+        self.method = scope['method']
+        self.path = scope['path']
+        self.query_string = scope.get('query_string', b'')
+        self.headers = {
+            name.decode('latin-1').lower(): value.decode('latin-1')
+            for name, value in scope.get('headers', [])
+        }
+        # Parâmetro repetido: vale o primeiro, como em request.args.get
+        self.args = {}
+        for name, value in parse_qsl(self.query_string.decode('utf-8', 'replace'), keep_blank_values=True):
+            self.args.setdefault(name, value)
+        client = scope.get('client')
+        self.remote_addr = client[0] if client else None
+    
+    def arg(self, name, default=None, type=None):
+        """
+        Obtém um parâmetro da query string (mesma semântica de request.args.get)
+        
+        Args:
+            name: Nome do parâmetro
+            default: Valor padrão
+            type: Conversor (valor inválido retorna o padrão)
+        
+        Returns:
+            Valor do parâmetro
+        """
+        if name not in self.args:
+            return default
+        value = self.args[name]
+        if type is None:
+            return value
+        try:
+            return type(value)
+        except (TypeError, ValueError):
+            return default
+    
+    def watch_disconnect(self):
+        """
+        Acompanha as mensagens do cliente até o http.disconnect
+        
+        Returns:
+            tuple: (asyncio.Event sinalizado na desconexão, task a cancelar
+            ao fim da resposta; None sem receive)
+        """
+        disconnected = asyncio.Event()
+        if self.receive is None:
+            return disconnected, None
+        
+        async def watch():
+            while True:
+                message = await self.receive()
+                if message['type'] == 'http.disconnect':
+                    disconnected.set()
+                    return
+        
+        return disconnected, asyncio.ensure_future(watch())
+
+
+class JSONResponse:
+    """Resposta JSON serializada pelo provider JSON da aplicação Flask"""
+    
+    def __init__(self, payload, status=200, headers=None):
+        self.payload = payload
+        self.status = status
+        self.headers = list(headers or [])
+    
+    async def send(self, send, app, extra_headers, request):
+        """
+        Envia a resposta
+        
+        Args:
+            send: Callable send do ASGI
+            app: AsyncApp
+            extra_headers: Função (status) -> headers adicionais
+            request: AsyncRequest (ETag, 304 e compressão)
+        
+        Returns:
+            tuple: (status, bytes do corpo enviados)
+        """
+        # Mesmo formato de jsonify: compacto fora do modo debug
+        options = {'indent': 2} if app.flask_app.debug else {'separators': (',', ':')}
+        body = app.flask_app.json.dumps_bytes(self.payload, **options) + b'\n'
+        status, headers = self.status, list(self.headers)
+        
+        if is_eligible(request.method, request.path, status):
+            status, body, conditional_headers = conditional_json(
+                body, request.headers.get('if-none-match'), request.headers.get('accept-encoding')
+            )
+            headers += conditional_headers
+        
+        if status != 304:
+            headers = [('Content-Type', 'application/json'), ('Content-Length', len(body))] + headers
+        headers += extra_headers(status)
+        
+        await send({'type': 'http.response.start', 'status': status, 'headers': _encode_headers(headers)})
+        await send({'type': 'http.response.body', 'body': body})
+        return status, len(body)
+
+
+class FileResponse:
+    """Resposta de arquivo em streaming, com suporte a Range"""
+    
+    def __init__(self, path, mimetype, download_name=None, range_header=None):
+        """
+        Inicializa a resposta
+        
+        Args:
+            path: Caminho do arquivo
+            mimetype: Content-Type
+            download_name: Nome do anexo (None para exibição inline)
+            range_header: Header Range da requisição, se houver
+        """
+        self.path = str(path)
+        self.mimetype = mimetype
+        self.download_name = download_name
+        self.range_header = range_header
+    
+    async def send(self, send, app, extra_headers, request):
+        """
+        Envia o arquivo em blocos lidos no executor
+        
+        Args:
+            send: Callable send do ASGI
+            app: AsyncApp
+            extra_headers: Função (status) -> headers adicionais
+            request: AsyncRequest (o Range já vem do construtor)
+        
+        Returns:
+            tuple: (status, bytes do corpo enviados)
+        """
+        stat = await app.executor.run(os.stat, self.path)
+        size = stat.st_size
+        start, end, status = 0, size - 1, 200
+        headers = [
+            ('Content-Type', self.mimetype),
+            ('Accept-Ranges', 'bytes'),
+            ('Last-Modified', formatdate(stat.st_mtime, usegmt=True)),
+            ('Cache-Control', 'no-cache')
+        ]
+        if self.download_name:
+            headers.append((
+                'Content-Disposition',
+                "attachment; filename*=UTF-8''%s" % quote(self.download_name)
+            ))
+        
+        if self.range_header:
+            byte_range = parse_range(self.range_header, size)
+            if byte_range is None:
+                headers += [('Content-Range', 'bytes */%d' % size), ('Content-Length', 0)]
+                headers += extra_headers(416)
+                await send({'type': 'http.response.start', 'status': 416, 'headers': _encode_headers(headers)})
+                await send({'type': 'http.response.body', 'body': b''})
+                return 416, 0
+            if byte_range:
+                start, end = byte_range
+                status = 206
+                headers.append(('Content-Range', 'bytes %d-%d/%d' % (start, end, size)))
+        
+        remaining = max(end - start + 1, 0)
+        headers.append(('Content-Length', remaining))
+        headers += extra_headers(status)
+        
+        f = await app.executor.run(open, self.path, 'rb')
+        sent = 0
+        # O uvicorn descarta envios após a desconexão sem erro: sem este sinal,
+        # um seek ou download cancelado continuaria lendo o arquivo do NFS
+        disconnected, watcher = request.watch_disconnect()
+        try:
+            await send({'type': 'http.response.start', 'status': status, 'headers': _encode_headers(headers)})
+            if start:
+                await app.executor.run(f.seek, start)
+            
+            while remaining > 0:
+                if disconnected.is_set():
+                    logger.debug("Envio de %s interrompido: cliente desconectou", self.path)
+                    return status, sent
+                chunk = await app.executor.run(f.read, min(Config.ASGI_STREAM_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': remaining > 0})
+                sent += len(chunk)
+            
+            if remaining > 0:
+                # Arquivo encolheu durante o envio
+                await send({'type': 'http.response.body', 'body': b''})
+        except OSError as e:
+            # Cliente desconectou (ex.: navegação no vídeo cancela a requisição)
+            logger.debug("Envio de %s interrompido: %s", self.path, e)
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+            await app.executor.run(f.close)
+        
+        return status, sent
+
+
+class StreamResponse:
+    """Resposta em streaming de um gerador assíncrono (ex.: feed SSE)"""
+    
+    def __init__(self, body, mimetype, headers=None, on_close=None):
+        """
+        Inicializa a resposta
+        
+        Args:
+            body: Gerador assíncrono de blocos bytes
+            mimetype: Content-Type
+            headers: Headers adicionais
+            on_close: Função chamada ao fim do envio, mesmo após desconexão
+        """
+        self.body = body
+        self.mimetype = mimetype
+        self.headers = list(headers or [])
+        self.on_close = on_close
+    
+    async def send(self, send, app, extra_headers, request):
+        """
+        Envia os blocos à medida que o gerador os produz
+        
+        Args:
+            send: Callable send do ASGI
+            app: AsyncApp
+            extra_headers: Função (status) -> headers adicionais
+            request: AsyncRequest (detecção de desconexão)
+        
+        Returns:
+            tuple: (status, bytes do corpo enviados)
+        """
+        headers = [('Content-Type', self.mimetype)] + self.headers + extra_headers(200)
+        disconnected, watcher = request.watch_disconnect()
+        sent = 0
+        try:
+            await send({'type': 'http.response.start', 'status': 200, 'headers': _encode_headers(headers)})
+            async for chunk in self.body:
+                # Verificado a cada bloco; streams ociosos produzem heartbeats
+                if disconnected.is_set():
+                    break
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                sent += len(chunk)
+            else:
+                await send({'type': 'http.response.body', 'body': b''})
+        except OSError as e:
+            logger.debug("Stream de %s interrompido: %s", request.path, e)
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+            await self.body.aclose()
+            if self.on_close is not None:
+                self.on_close()
+        
+        return 200, sent
+
+
+class Route:
+    """Rota com handler assíncrono nativo"""
+    
+    def __init__(self, rule, endpoint, handler, methods=('GET',), requires_db=False, query_token=False):
+        """
+        Inicializa a rota
+        
+        Args:
+            rule: Regra no formato do Flask (ex.: /api/connections/<int:connection_id>)
+            endpoint: Nome do endpoint equivalente no Flask (blueprint.função)
+            handler: Corrotina handler(app, request, **params, current_user)
+            methods: Métodos atendidos
+            requires_db: Usa o banco assíncrono (sem ele, a rota vai para o Flask)
+            query_token: Aceita o token em ?token= (EventSource, como stream_token_required)
+        """
+        self.rule = rule
+        self.query_token = query_token
+        self.endpoint = endpoint
+        self.blueprint = endpoint.split('.', 1)[0] if '.' in endpoint else 'app'
+        self.handler = handler
+        self.methods = set(methods)
+        self.requires_db = requires_db
+        self.int_params = {name for kind, name in RULE_PARAM_PATTERN.findall(rule) if kind == 'int'}
+        
+        pattern = RULE_PARAM_PATTERN.sub(
+            lambda m: '(?P<%s>%s)' % (m.group(2), r'\d+' if m.group(1) == 'int' else '[^/]+'),
+            rule
+        )
+        self.regex = re.compile('^%s$' % pattern)
+    
+    def match(self, method, path):
+        """
+        Verifica se a requisição corresponde à rota
+        
+        Returns:
+            dict: Parâmetros da URL ou None
+        """
+        if method not in self.methods:
+            return None
+        match = self.regex.match(path)
+        if not match:
+            return None
+        return {
+            name: int(value) if name in self.int_params else value
+            for name, value in match.groupdict().items()
+        }
+
+
+class AsyncApp:
+    """Aplicação ASGI: rotas nativas assíncronas com fallback para o Flask"""
+    
+    def __init__(self, flask_app, routes):
+        """
+        Inicializa a aplicação
+        
+        Args:
+            flask_app: Aplicação Flask (rotas sem handler nativo)
+            routes: Rotas nativas
+        """
+        if ThreadedWsgiToAsgi is None:
+            raise RuntimeError("Modo ASGI requer o pacote asgiref")
+        
+        self.flask_app = flask_app
+        self.routes = routes
+        # O pool de threads do fallback é criado em startup() (após o fork)
+        self.fallback = ThreadedWsgiToAsgi(flask_app)
+        self.db = AsyncGuacamoleQueries() if ASYNC_DB_AVAILABLE else None
+        self.recordings = RecordingService()
+        self.connections = (
+            AsyncConnectionService(self.db, self.recordings, self._run_blocking) if self.db else None
+        )
+        self.executor = None
+        self.db_executor = None
+        self.db_ready = False
+        self._startup_lock = asyncio.Lock()
+        
+        if not ASYNC_DB_AVAILABLE:
+            logger.warning("psycopg 3 não instalado; rotas de conexões usarão o Flask")
+    
+    async def startup(self):
+        """Cria os executores NFS, de banco e WSGI e abre o pool assíncrono (uma vez por processo)"""
+        async with self._startup_lock:
+            if self.executor is not None:
+                return
+            
+            self.fallback.executor = ThreadPoolExecutor(
+                max_workers=Config.ASGI_WSGI_WORKERS, thread_name_prefix='wsgi'
+            )
+            self.db_executor = BoundedExecutor(Config.ASGI_DB_WORKERS, Config.ASGI_DB_MAX_PENDING, name='db')
+            self.executor = BoundedExecutor(Config.ASGI_NFS_WORKERS, Config.ASGI_NFS_MAX_PENDING)
+            if self.db is not None:
+                try:
+                    await self.db.open()
+                    self.db_ready = True
+                except Exception as e:
+                    logger.error("Erro ao abrir pool PostgreSQL assíncrono: %s", e)
+    
+    async def _run_blocking(self, func, *args):
+        """Executa uma chamada NFS no executor limitado"""
+        return await self.executor.run(func, *args)
+    
+    async def shutdown(self):
+        """Fecha o pool e os executores"""
+        if self.db is not None:
+            await self.db.close()
+            self.db_ready = False
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        if self.db_executor is not None:
+            self.db_executor.shutdown()
+            self.db_executor = None
+        if self.fallback.executor is not None:
+            self.fallback.executor.shutdown(wait=False)
+            self.fallback.executor = None
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        
+        if scope['type'] == 'http':
+            if self.executor is None:
+                await self.startup()
+            
+            for route in self.routes:
+                params = route.match(scope['method'], scope['path'])
+                if params is None:
+                    continue
+                if route.requires_db and not self.db_ready:
+                    break
+                await self._dispatch(route, params, scope, receive, send)
+                return
+        
+        await self.fallback(scope, receive, send)
+    
+    async def _lifespan(self, receive, send):
+        """Trata os eventos de inicialização e encerramento do servidor"""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await self.startup()
+                except Exception as e:
+                    logger.error("Falha na inicialização ASGI: %s", e)
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    
+    def _cors_headers(self, request):
+        """Headers CORS equivalentes aos do Flask-CORS"""
+        origin = request.headers.get('origin')
+        if not origin or origin not in self.flask_app.config['CORS_ORIGINS']:
+            return []
+        return [
+            ('Access-Control-Allow-Origin', origin),
+            ('Access-Control-Allow-Credentials', 'true'),
+            ('Vary', 'Origin')
+        ]
+    
+    async def _handle(self, route, request, params):
+        """Autentica e executa o handler da rota"""
+        auth_header = request.headers.get('authorization')
+        if route.query_token and not auth_header and request.args.get('token'):
+            auth_header = 'Bearer ' + request.args['token']
+        
+        current_user, error = authenticate_token(auth_header)
+        if error:
+            return JSONResponse({'error': error}, 401)
+        
+        try:
+            return await route.handler(self, request, current_user=current_user, **params)
+        except NFSUnavailableError as e:
+            logger.warning("NFS indisponível: %s", e)
+            return JSONResponse(
+                {'error': 'Armazenamento de gravações indisponível'}, 503,
+                headers=[('Retry-After', e.retry_after)]
+            )
+        except ValueError as e:
+            logger.error("Erro de validação: %s", e)
+            return JSONResponse({'error': f'Erro de validação: {str(e)}'}, 400)
+        except Exception as e:
+            logger.error("Erro interno do servidor: %s", e, exc_info=True)
+            return JSONResponse({'error': 'Erro interno do servidor'}, 500)
+    
+    async def _dispatch(self, route, params, scope, receive, send):
+        """Executa uma rota nativa com métricas e access log"""
+        request = AsyncRequest(scope, receive)
+        metrics = RequestMetrics(
+            request.method,
+            request.path,
+            query=sanitize_query(request.query_string),
+            remote_addr=request.remote_addr
+        )
+        metrics.endpoint = route.endpoint
+        token = bind_metrics(metrics)
+        request_started()
+        status, sent = 500, 0
+        
+        def extra_headers(response_status):
+            metrics.status = response_status
+            observe_request(
+                route.blueprint, route.rule, request.method, response_status,
+                time.perf_counter() - metrics.start
+            )
+            return self._cors_headers(request) + timing_headers(
+                metrics, request.path, request.headers.get('origin')
+            )
+        
+        try:
+            response = await self._handle(route, request, params)
+            status, sent = await response.send(send, self, extra_headers, request)
+        finally:
+            metrics.status = status
+            metrics.bytes_sent += sent
+            request_finished(STREAMING_ENDPOINTS.get(route.endpoint), status, sent)
+            emit_access_log(metrics)
+            reset_metrics(token)
@@ -0,0 +1,184 @@
+"""
+Serviços assíncronos de conexões
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Versão assíncrona de ConnectionService para o modo ASGI, com as
+mesmas respostas da versão síncrona
+"""
+
+from app.asgi.database import AsyncGuacamoleQueries
+from app.connections.services import annotate_active_sessions, get_active_session_counter, list_filters
+from app.utils.fields import select, wants
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def _pagination(page, per_page, total):
+    """Monta o bloco de paginação das respostas"""
+    return {
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'total_pages': (total + per_page - 1) // per_page
+    }
+
+
+class AsyncConnectionService:
+    """Serviço assíncrono para operações com conexões"""
+    
+    def __init__(self, db=None, recordings=None, run_blocking=None):
+        """
+        Inicializa o serviço
+        
+        Args:
+            db: AsyncGuacamoleQueries (padrão: nova instância)
+            recordings: RecordingService (índice e anotação de gravações)
+            run_blocking: Corrotina run(func, *args) que executa chamadas NFS
+                fora do event loop
+        """
+        self.db = db or AsyncGuacamoleQueries()
+        self.recordings = recordings
+        self.run_blocking = run_blocking
+    
+    async def _with_parameters(self, connections, fields):
+        """Enriquece as conexões com seus parâmetros (somente se pedidos)"""
+        if wants(fields, 'parameters'):
+            for conn in connections:
+                conn.parameters = await self.db.get_connection_parameters(conn.connection_id)
+        return [select(conn, fields) for conn in connections]
+    
+    async def _with_active_sessions(self, connections, fields):
+        """Anota as sessões ativas de uma página (contador síncrono em cache, fora do event loop)"""
+        if wants(fields, 'active_sessions'):
+            await self.run_blocking(annotate_active_sessions, connections, get_active_session_counter())
+        return connections
+    
+    async def get_connections_paginated(self, page=1, per_page=20, fields=None, acl=None, group_filters=None):
+        """
+        Obtém conexões com paginação
+        
+        Args:
+            page: Número da página (começa em 1)
+            per_page: Quantidade de itens por página
+            fields: Campos de cada conexão (None = todos)
+            acl: ConnectionAcl do usuário (None = sem restrição)
+            group_filters: Resultado de group_filter (None = todos os grupos)
+        
+        Returns:
+            dict: Dados paginados
+        """
+        connections, total = await self.db.get_connections(
+            (page - 1) * per_page, per_page, list_filters(acl, group_filters)
+        )
+        
+        logger.debug("Conexões paginadas retornadas: página %s, total %s", page, total)
+        
+        return {
+            'success': True,
+            'data': await self._with_parameters(await self._with_active_sessions(connections, fields), fields),
+            'pagination': _pagination(page, per_page, total)
+        }
+    
+    async def get_connection_detail(self, connection_id, fields=None, acl=None):
+        """
+        Obtém detalhes completos de uma conexão
+        
+        Args:
+            connection_id: ID da conexão
+            fields: Campos da conexão (None = todos)
+            acl: ConnectionAcl do usuário (None = sem restrição)
+        
+        Returns:
+            ConnectionRow: Detalhes da conexão com parâmetros (dict se fields) ou
+            None se inexistente ou não legível
+        """
+        if acl is not None and not acl.allows(connection_id):
+            return None
+        
+        connection = await self.db.get_connection_by_id(connection_id)
+        if not connection:
+            return None
+        
+        return (await self._with_parameters(await self._with_active_sessions([connection], fields), fields))[0]
+    
+    async def get_connection_history_paginated(self, connection_id, page=1, per_page=20, fields=None,
+                                               has_recording=None, acl=None):
+        """
+        Obtém histórico de sessões de uma conexão com paginação, anotado com
+        a gravação de cada sessão
+        
+        Args:
+            connection_id: ID da conexão
+            page: Número da página
+            per_page: Quantidade de itens por página
+            fields: Campos de cada sessão (None = todos)
+            has_recording: Filtrar sessões com (True) ou sem (False) gravação
+            acl: ConnectionAcl do usuário (None = sem restrição)
+        
+        Returns:
+            dict: Dados paginados do histórico ou None
+        """
+        if acl is not None and not acl.allows(connection_id):
+            return None
+        
+        connection = await self.db.get_connection_by_id(connection_id)
+        if not connection:
+            return None
+        
+        recorded_ids = None
+        if has_recording is not None:
+            recorded_ids = await self.run_blocking(self.recordings.recorded_history_ids)
+        
+        history, total = await self.db.get_connection_history(
+            connection_id, (page - 1) * per_page, per_page, recorded_ids, has_recording
+        )
+        
+        if wants(fields, 'recording'):
+            await self.run_blocking(self.recordings.annotate_history, history)
+        
+        return {
+            'success': True,
+            'connection_id': connection_id,
+            'connection_name': connection.connection_name,
+            'data': [select(session, fields) for session in history],
+            'pagination': _pagination(page, per_page, total)
+        }
+    
+    async def search_connections(self, query, page=1, per_page=20, fields=None, acl=None, group_filters=None):
+        """
+        Busca conexões por nome ou protocolo
+        
+        Args:
+            query: Termo de busca
+            page: Número da página
+            per_page: Quantidade de itens por página
+            fields: Campos de cada conexão (None = todos)
+            acl: ConnectionAcl do usuário (None = sem restrição)
+            group_filters: Resultado de group_filter (None = todos os grupos)
+        
+        Returns:
+            dict: Resultados da busca
+        """
+        all_connections, _ = await self.db.get_connections(0, 1000, list_filters(acl, group_filters))
+        
+        query_lower = query.lower()
+        filtered = [
+            conn for conn in all_connections
+            if query_lower in conn.connection_name.lower() or
+               query_lower in conn.protocol.lower()
+        ]
+        
+        offset = (page - 1) * per_page
+        paginated = await self._with_parameters(
+            await self._with_active_sessions(filtered[offset:offset + per_page], fields), fields
+        )
+        
+        logger.debug("Busca por '%s' retornou %s resultados", query, len(filtered))
+        
+        return {
+            'success': True,
+            'query': query,
+            'data': paginated,
+            'pagination': _pagination(page, per_page, len(filtered))
+        }
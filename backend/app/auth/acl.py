@@ -0,0 +1,151 @@
+"""
+Permissões de leitura de conexões
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Conjunto pré-calculado, por usuário, das conexões legíveis
+(array ordenado para as consultas e bitmap para verificações O(1)), em cache
+até a versão dos dados (que inclui as tabelas de permissões) mudar
+"""
+
+import threading
+from array import array
+from collections import OrderedDict
+from app.config import Config
+from app.database import GuacamoleQueries
+from app.utils.logger import setup_logger
+from app.utils.table_version import permissions_version
+
+logger = setup_logger(__name__)
+
+
+class ConnectionAcl:
+    """Conexões legíveis por um usuário"""
+    
+    __slots__ = ('administer', 'connection_ids', '_bitmap', 'version')
+    
+    def __init__(self, administer, connection_ids, version=None):
+        """
+        Inicializa o conjunto
+        
+        Args:
+            administer: Usuário com ADMINISTER (lê todas as conexões)
+            connection_ids: IDs legíveis (ignorados com administer)
+            version: Versão dos dados em que as permissões foram lidas
+        """
+        self.administer = administer
+        self.connection_ids = array('i', sorted(set(connection_ids))) if not administer else array('i')
+        self._bitmap = bytearray((self.connection_ids[-1] >> 3) + 1 if self.connection_ids else 0)
+        for connection_id in self.connection_ids:
+            self._bitmap[connection_id >> 3] |= 1 << (connection_id & 7)
+        self.version = version
+    
+    def allows(self, connection_id):
+        """
+        Verifica se a conexão é legível
+        
+        Args:
+            connection_id: ID da conexão (None para sessões de conexões removidas)
+        
+        Returns:
+            bool: True se o usuário pode ler a conexão
+        """
+        if self.administer:
+            return True
+        if connection_id is None or connection_id < 0:
+            return False
+        index = connection_id >> 3
+        return index < len(self._bitmap) and bool(self._bitmap[index] & (1 << (connection_id & 7)))
+    
+    def readable_ids(self):
+        """
+        IDs para os filtros ANY(%s) das consultas
+        
+        Returns:
+            list: IDs legíveis ordenados, ou None se não há restrição
+        """
+        return None if self.administer else self.connection_ids.tolist()
+
+
+# Sem restrição (ACL_ENABLED=False)
+UNRESTRICTED = ConnectionAcl(True, ())
+
+
+class AclCache:
+    """Cache LRU das permissões por usuário, invalidado pela versão dos dados"""
+    
+    def __init__(self, max_users):
+        """
+        Inicializa o cache
+        
+        Args:
+            max_users: Número máximo de usuários em cache
+        """
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._queries = GuacamoleQueries()
+    
+    def get(self, user_id):
+        """
+        Obtém as permissões do usuário, relendo-as somente quando a versão
+        dos dados mudou
+        
+        Args:
+            user_id: ID do usuário autenticado
+        
+        Returns:
+            ConnectionAcl: Conexões legíveis
+        """
+        if not Config.ACL_ENABLED:
+            return UNRESTRICTED
+        
+        version = permissions_version()
+        with self._lock:
+            acl = self._entries.get(user_id)
+            if acl is not None and acl.version == version:
+                self._entries.move_to_end(user_id)
+                return acl
+        
+        administer, connection_ids = self._queries.get_user_acl(user_id)
+        acl = ConnectionAcl(administer, connection_ids, version)
+        
+        with self._lock:
+            self._entries[user_id] = acl
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        
+        logger.debug("Permissões do usuário %s carregadas (versão %s)", user_id, version)
+        return acl
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_acl_cache():
+    """
+    Obtém o cache de permissões do processo
+    
+    Returns:
+        AclCache: Cache compartilhado
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AclCache(Config.ACL_CACHE_MAX_USERS)
+    return _cache
+
+
+def get_user_acl(user_id):
+    """
+    Atalho para as permissões do usuário autenticado
+    
+    Args:
+        user_id: ID do usuário
+    
+    Returns:
+        ConnectionAcl: Conexões legíveis
+    """
+    return get_acl_cache().get(user_id)
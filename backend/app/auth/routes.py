@@ -45,12 +45,12 @@ def login(data):
         user = db_queries.get_user_by_username(username)
         
         if not user:
-            logger.warning(f"Tentativa de login com usuário inexistente: {username}")
+            logger.warning("Tentativa de login com usuário inexistente: %s", username)
             return jsonify({'error': 'Credenciais inválidas'}), 401
         
         # Verificar se usuário está desabilitado
         if user.get('disabled'):
-            logger.warning(f"Tentativa de login com usuário desabilitado: {username}")
+            logger.warning("Tentativa de login com usuário desabilitado: %s", username)
             return jsonify({'error': 'Usuário desabilitado'}), 401
         
         # Verificar senha
@@ -58,13 +58,13 @@ def login(data):
         password_salt = user.get('password_salt')
         
         if not verify_password_guacamole(password, password_hash, password_salt):
-            logger.warning(f"Tentativa de login com senha incorreta: {username}")
+            logger.warning("Tentativa de login com senha incorreta: %s", username)
             return jsonify({'error': 'Credenciais inválidas'}), 401
         
         # Gerar token JWT
         token = generate_jwt_token(user['user_id'], username)
         
-        logger.info(f"Usuário {username} autenticado com sucesso")
+        logger.info("Usuário %s autenticado com sucesso", username)
         
         return jsonify({
             'success': True,
@@ -76,7 +76,7 @@ def login(data):
         }), 200
     
     except Exception as e:
-        logger.error(f"Erro durante autenticação: {str(e)}")
+        logger.error("Erro durante autenticação: %s", e)
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
 
@@ -98,10 +98,10 @@ def verify(current_user):
         user = db_queries.get_user_by_id(current_user)
         
         if not user:
-            logger.warning(f"Usuário {current_user} não encontrado durante verificação")
+            logger.warning("Usuário %s não encontrado durante verificação", current_user)
             return jsonify({'error': 'Usuário não encontrado'}), 404
         
-        logger.info(f"Token verificado para usuário {user['username']}")
+        logger.debug("Token verificado para usuário %s", user['username'])
         
         return jsonify({
             'valid': True,
@@ -112,7 +112,7 @@ def verify(current_user):
         }), 200
     
     except Exception as e:
-        logger.error(f"Erro durante verificação de token: {str(e)}")
+        logger.error("Erro durante verificação de token: %s", e)
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
 
@@ -131,7 +131,7 @@ def logout(current_user):
     """
     try:
         user = db_queries.get_user_by_id(current_user)
-        logger.info(f"Usuário {user['username']} realizou logout")
+        logger.info("Usuário %s realizou logout", user['username'])
         
         return jsonify({
             'success': True,
@@ -139,5 +139,5 @@ def logout(current_user):
         }), 200
     
     except Exception as e:
-        logger.error(f"Erro durante logout: {str(e)}")
+        logger.error("Erro durante logout: %s", e)
         return jsonify({'error': 'Erro interno do servidor'}), 500
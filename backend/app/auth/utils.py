@@ -40,11 +40,11 @@ def generate_jwt_token(user_id, username):
             algorithm='HS256'
         )
         
-        logger.info(f"Token JWT gerado para usuário {username}")
+        logger.debug("Token JWT gerado para usuário %s", username)
         return token
     
     except Exception as e:
-        logger.error(f"Erro ao gerar token JWT: {str(e)}")
+        logger.error("Erro ao gerar token JWT: %s", e)
         raise
 
 
@@ -68,14 +68,14 @@ def verify_jwt_token(token):
             algorithms=['HS256']
         )
         
-        logger.info(f"Token JWT validado para usuário {payload.get('username')}")
+        logger.debug("Token JWT validado para usuário %s", payload.get('username'))
         return payload
     
     except jwt.ExpiredSignatureError:
         logger.warning("Token JWT expirado")
         raise
     except jwt.InvalidTokenError as e:
-        logger.warning(f"Token JWT inválido: {str(e)}")
+        logger.warning("Token JWT inválido: %s", e)
         raise
 
 
@@ -105,11 +105,11 @@ def hash_password_guacamole(password, salt=None):
         hash_hex = hash_obj.hexdigest()
         salt_hex = binascii.hexlify(salt).decode('utf-8')
         
-        logger.info("Hash de senha gerado com sucesso")
+        logger.debug("Hash de senha gerado com sucesso")
         return hash_hex, salt_hex
     
     except Exception as e:
-        logger.error(f"Erro ao gerar hash de senha: {str(e)}")
+        logger.error("Erro ao gerar hash de senha: %s", e)
         raise
 
 
@@ -133,12 +133,12 @@ def verify_password_guacamole(password, password_hash, password_salt):
         is_valid = new_hash == password_hash
         
         if is_valid:
-            logger.info("Senha validada com sucesso")
+            logger.debug("Senha validada com sucesso")
         else:
             logger.warning("Senha inválida")
         
         return is_valid
     
     except Exception as e:
-        logger.error(f"Erro ao verificar senha: {str(e)}")
+        logger.error("Erro ao verificar senha: %s", e)
         return False
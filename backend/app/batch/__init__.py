@@ -0,0 +1 @@
+"""Módulo de requisições em lote"""
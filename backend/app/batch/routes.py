@@ -0,0 +1,59 @@
+"""
+Rotas de requisições em lote
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Endpoint /api/batch, que executa várias sub-requisições GET em uma
+única chamada HTTP
+"""
+
+from flask import Blueprint, current_app, jsonify
+from app.batch.services import BatchService
+from app.utils.decorators import handle_errors, token_required, validate_json
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Criar blueprint de lotes
+batch_bp = Blueprint('batch', __name__)
+
+# Instanciar serviço
+service = BatchService()
+
+
+@batch_bp.route('', methods=['POST'])
+@handle_errors
+@token_required
+@validate_json('requests')
+def run_batch(current_user, data):
+    """
+    Endpoint para executar sub-requisições em lote
+    
+    Body:
+        requests: Lista de {"id", "path", "depends_on"?}; o caminho pode
+        referenciar respostas anteriores com {id.campo.0.subcampo}
+    
+    Returns:
+        dict: {"success": true, "responses": [{"id", "status", "body"}]} na
+        ordem recebida
+    """
+    # Lote inválido: ValueError vira 400 em handle_errors
+    parsed = service.parse(data['requests'])
+    
+    try:
+        logger.debug("Executando lote com %s sub-requisições", len(parsed))
+        results = service.run(current_app, parsed, current_user)
+    
+    except Exception as e:
+        logger.error("Erro ao executar lote: %s", e)
+        return jsonify({'error': 'Erro ao executar lote'}), 500
+    
+    # Os corpos já estão serializados: montar a resposta sem decodificá-los
+    dumps = current_app.json.dumps_bytes
+    items = b','.join(
+        b'{"id":%s,"status":%d,"body":%s}' % (dumps(request_id), status, body)
+        for request_id, status, body in results
+    )
+    return current_app.response_class(
+        b'{"success":true,"responses":[%s]}\n' % items,
+        mimetype='application/json'
+    )
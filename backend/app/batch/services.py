@@ -0,0 +1,244 @@
+"""
+Serviços de requisições em lote
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Executa várias sub-requisições GET /api/* em uma única chamada,
+com autenticação e conexão de banco compartilhadas. Sub-requisições
+independentes rodam em paralelo; dependências (depends_on ou referências
+{id.campo} no caminho) são respeitadas.
+"""
+
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextvars import copy_context
+from urllib.parse import quote
+from flask import request
+from werkzeug.exceptions import HTTPException
+from werkzeug.test import EnvironBuilder
+from app.config import Config
+from app.database import DatabaseConnection
+from app.utils.decorators import set_authenticated_user
+from app.utils.logger import setup_logger
+from app.utils.metrics import STREAMING_ENDPOINTS
+
+logger = setup_logger(__name__)
+
+# Referência ao corpo de uma sub-requisição anterior: {id.campo.0.subcampo}
+REFERENCE_PATTERN = re.compile(r'\{([\w-]+)((?:\.[\w-]+)+)\}')
+
+# Endpoints que não produzem JSON finito (ou recursivos)
+EXCLUDED_ENDPOINTS = set(STREAMING_ENDPOINTS) | {
+    'batch.run_batch', 'sessions.session_events', 'metrics'
+}
+
+
+class BatchRequest:
+    """Sub-requisição validada"""
+    
+    __slots__ = ('id', 'path', 'depends_on')
+    
+    def __init__(self, request_id, path, depends_on):
+        self.id = request_id
+        self.path = path
+        self.depends_on = depends_on
+
+
+class BatchService:
+    """Serviço de execução de lotes"""
+    
+    def __init__(self):
+        """Inicializa o serviço (o pool de threads é criado por processo)"""
+        self.db = DatabaseConnection()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+    
+    def _get_executor(self):
+        """Pool de threads do processo atual (não sobrevive ao fork)"""
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=Config.BATCH_MAX_WORKERS, thread_name_prefix='batch'
+                    )
+                    self._pid = os.getpid()
+        return self._executor
+    
+    def parse(self, items):
+        """
+        Valida as sub-requisições
+        
+        Args:
+            items: Lista de {"id", "path", "method"?, "depends_on"?}
+        
+        Returns:
+            list: BatchRequest na ordem recebida
+        
+        Raises:
+            ValueError: Lote inválido (tamanho, ids, caminhos ou dependências)
+        """
+        if not isinstance(items, list) or not items:
+            raise ValueError("'requests' deve ser uma lista não vazia")
+        if len(items) > Config.BATCH_MAX_REQUESTS:
+            raise ValueError(f"Máximo de {Config.BATCH_MAX_REQUESTS} sub-requisições por lote")
+        
+        parsed = []
+        seen = set()
+        for item in items:
+            if not isinstance(item, dict):
+                raise ValueError("Cada sub-requisição deve ser um objeto")
+            
+            request_id = str(item.get('id', ''))
+            path = item.get('path')
+            if not request_id or request_id in seen:
+                raise ValueError(f"id ausente ou repetido: '{request_id}'")
+            if not isinstance(path, str) or not path.startswith('/api/'):
+                raise ValueError(f"Caminho inválido em '{request_id}'")
+            if item.get('method', 'GET').upper() != 'GET':
+                raise ValueError(f"Somente GET é suportado em lote ('{request_id}')")
+            
+            depends_on = item.get('depends_on') or []
+            if not isinstance(depends_on, list) or not all(isinstance(dep, str) for dep in depends_on):
+                raise ValueError(f"depends_on deve ser uma lista de ids em '{request_id}'")
+            depends_on = set(depends_on)
+            depends_on.update(match.group(1) for match in REFERENCE_PATTERN.finditer(path))
+            seen.add(request_id)
+            parsed.append(BatchRequest(request_id, path, depends_on))
+        
+        for batch_request in parsed:
+            unknown = batch_request.depends_on - seen
+            if unknown:
+                raise ValueError(f"Dependência desconhecida em '{batch_request.id}': {', '.join(sorted(unknown))}")
+        
+        self._check_cycles(parsed)
+        return parsed
+    
+    def _check_cycles(self, parsed):
+        """Rejeita dependências circulares"""
+        pending = {batch_request.id: set(batch_request.depends_on) for batch_request in parsed}
+        while pending:
+            ready = [request_id for request_id, deps in pending.items() if not deps]
+            if not ready:
+                raise ValueError(f"Dependência circular entre {', '.join(sorted(pending))}")
+            for request_id in ready:
+                del pending[request_id]
+            for deps in pending.values():
+                deps.difference_update(ready)
+    
+    def run(self, app, parsed, current_user):
+        """
+        Executa o lote
+        
+        Args:
+            app: Aplicação Flask
+            parsed: Lista de BatchRequest (parse())
+            current_user: Usuário autenticado na requisição do lote
+        
+        Returns:
+            list: Tuplas (id, status, corpo JSON em bytes) na ordem recebida
+        """
+        results = {}
+        remote_addr = request.remote_addr
+        executor = self._get_executor()
+        
+        with self.db.shared_connection():
+            pending = list(parsed)
+            running = {}
+            
+            while pending or running:
+                for batch_request in [r for r in pending if r.depends_on.issubset(results)]:
+                    pending.remove(batch_request)
+                    failed = [dep for dep in batch_request.depends_on if results[dep][0] >= 400]
+                    if failed:
+                        results[batch_request.id] = self._error(app, 424, f"Dependência falhou: {', '.join(sorted(failed))}")
+                        continue
+                    
+                    # Cada sub-requisição herda o contexto (métricas, conexão compartilhada)
+                    future = executor.submit(
+                        copy_context().run, self._execute, app, batch_request, results,
+                        current_user, remote_addr
+                    )
+                    running[future] = batch_request.id
+                
+                if not running:
+                    continue
+                
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[running.pop(future)] = future.result()
+        
+        return [(batch_request.id,) + results[batch_request.id] for batch_request in parsed]
+    
+    def _error(self, app, status, message):
+        """Resultado de erro no formato das respostas da API"""
+        return status, app.json.dumps_bytes({'error': message})
+    
+    def _resolve(self, app, path, results):
+        """
+        Substitui as referências {id.campo} pelos valores das respostas
+        
+        Returns:
+            str: Caminho resolvido, ou None se alguma referência não existir
+        """
+        def replace(match):
+            value = app.json.loads(results[match.group(1)][1])
+            for key in match.group(2)[1:].split('.'):
+                if isinstance(value, list) and key.isdigit() and int(key) < len(value):
+                    value = value[int(key)]
+                elif isinstance(value, dict) and key in value:
+                    value = value[key]
+                else:
+                    raise LookupError(match.group(0))
+            if isinstance(value, (dict, list)) or value is None:
+                raise LookupError(match.group(0))
+            return quote(str(value), safe='')
+        
+        try:
+            return REFERENCE_PATTERN.sub(replace, path)
+        except LookupError as e:
+            logger.debug("Referência não resolvida no lote: %s", e)
+            return None
+    
+    def _execute(self, app, batch_request, results, current_user, remote_addr):
+        """
+        Executa uma sub-requisição chamando a view diretamente (sem os hooks
+        before/after_request: métricas, compressão e access log são do lote)
+        
+        Returns:
+            tuple: (status, corpo JSON em bytes)
+        """
+        path = self._resolve(app, batch_request.path, results)
+        if path is None:
+            return self._error(app, 424, "Referência não encontrada na resposta da dependência")
+        
+        path, _, query = path.partition('?')
+        environ = EnvironBuilder(
+            path=path, query_string=query, method='GET',
+            environ_base={'REMOTE_ADDR': remote_addr}
+        ).get_environ()
+        
+        set_authenticated_user(current_user)
+        with app.request_context(environ):
+            if request.routing_exception is not None:
+                if getattr(request.routing_exception, 'code', None) == 405:
+                    return self._error(app, 405, 'Método não permitido')
+                return self._error(app, 404, 'Rota não encontrada')
+            if request.endpoint in EXCLUDED_ENDPOINTS:
+                return self._error(app, 400, 'Rota não suportada em lote')
+            
+            try:
+                response = app.make_response(app.view_functions[request.endpoint](**request.view_args))
+            except HTTPException as e:
+                return self._error(app, e.code, e.description)
+            except Exception as e:
+                logger.error("Erro na sub-requisição %s do lote: %s", batch_request.id, e, exc_info=True)
+                return self._error(app, 500, 'Erro interno do servidor')
+            
+            try:
+                if response.mimetype != 'application/json' or response.direct_passthrough:
+                    return self._error(app, 400, 'Rota não suportada em lote')
+                return response.status_code, response.get_data().rstrip()
+            finally:
+                response.close()
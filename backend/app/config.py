@@ -27,6 +27,11 @@ class Config:
     DB_USER = os.getenv('DB_USER', 'guacamole')
     DB_PASSWORD = os.getenv('DB_PASSWORD', 'guacamole')
     
+    # Pool de conexões (por processo; deve comportar as threads do worker)
+    DB_POOL_MIN_CONN = int(os.getenv('DB_POOL_MIN_CONN', 1))
+    DB_POOL_MAX_CONN = int(os.getenv('DB_POOL_MAX_CONN', 10))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5))
+    
     # String de conexão PostgreSQL
     SQLALCHEMY_DATABASE_URI = (
         f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
@@ -35,6 +40,19 @@ class Config:
     
     # NFS - Caminho para arquivos de gravação
     NFS_MOUNT_PATH = os.getenv('NFS_MOUNT_PATH', '/var/lib/guacamole/recordings')
+    # Prazo da validação em segundo plano antes de /api/ready reportar degradado
+    NFS_INIT_TIMEOUT = float(os.getenv('NFS_INIT_TIMEOUT', 10))
+    
+    # Operações NFS: pool limitado, prazo por chamada e circuit breaker
+    NFS_WORKERS = int(os.getenv('NFS_WORKERS', 16))
+    NFS_MAX_PENDING = int(os.getenv('NFS_MAX_PENDING', 64))
+    NFS_CALL_TIMEOUT = float(os.getenv('NFS_CALL_TIMEOUT', 5))
+    NFS_BREAKER_FAILURE_THRESHOLD = int(os.getenv('NFS_BREAKER_FAILURE_THRESHOLD', 5))
+    NFS_BREAKER_SLOW_MS = float(os.getenv('NFS_BREAKER_SLOW_MS', 2000))
+    NFS_BREAKER_WINDOW = int(os.getenv('NFS_BREAKER_WINDOW', 20))
+    NFS_BREAKER_SLOW_RATIO = float(os.getenv('NFS_BREAKER_SLOW_RATIO', 0.5))
+    NFS_BREAKER_RESET_SECONDS = int(os.getenv('NFS_BREAKER_RESET_SECONDS', 30))
+    NFS_PROBE_INTERVAL = float(os.getenv('NFS_PROBE_INTERVAL', 5))
     
     # JWT - Autenticação
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
@@ -46,6 +64,89 @@ class Config:
     # Logging
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+    LOG_QUEUE_HIGH_WATERMARK = float(os.getenv('LOG_QUEUE_HIGH_WATERMARK', 0.8))
+    LOG_OVERFLOW_POLICY = os.getenv('LOG_OVERFLOW_POLICY', 'drop_low')
+    LOG_BATCH_SIZE = int(os.getenv('LOG_BATCH_SIZE', 256))
+    
+    # Access log (uma linha por requisição)
+    ACCESS_LOG_SAMPLE_RATE = float(os.getenv('ACCESS_LOG_SAMPLE_RATE', 1.0))
+    ACCESS_LOG_SLOW_MS = float(os.getenv('ACCESS_LOG_SLOW_MS', 1000))
+    
+    # Header Server-Timing (db, nfs, ser, cmp, app) nas respostas /api/*
+    SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', 'True').lower() == 'true'
+    
+    # ETag fraco, 304 e compressão (brotli/gzip) das respostas JSON /api/*
+    RESPONSE_COMPRESSION_ENABLED = os.getenv('RESPONSE_COMPRESSION_ENABLED', 'True').lower() == 'true'
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+    GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 6))
+    BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 5))
+    
+    # Cache de respostas das listagens de conexões (por usuário e por processo)
+    RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'True').lower() == 'true'
+    RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', 30))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 1024))
+    RESPONSE_CACHE_VERSION_INTERVAL = float(os.getenv('RESPONSE_CACHE_VERSION_INTERVAL', 1))
+    
+    # Feed SSE de sessões (/api/sessions/events): uma consulta por intervalo
+    # por processo, compartilhada por todos os assinantes
+    SESSION_EVENTS_POLL_INTERVAL = float(os.getenv('SESSION_EVENTS_POLL_INTERVAL', 2))
+    SESSION_EVENTS_HEARTBEAT = float(os.getenv('SESSION_EVENTS_HEARTBEAT', 15))
+    SESSION_EVENTS_RETRY_MS = int(os.getenv('SESSION_EVENTS_RETRY_MS', 3000))
+    SESSION_EVENTS_MAX_SUBSCRIBERS = int(os.getenv('SESSION_EVENTS_MAX_SUBSCRIBERS', 100))
+    # Assinantes do Flask ocupam uma thread cada: deixa threads livres para a API
+    SESSION_EVENTS_MAX_THREAD_SUBSCRIBERS = int(os.getenv(
+        'SESSION_EVENTS_MAX_THREAD_SUBSCRIBERS', max(int(os.getenv('GUNICORN_THREADS', 8)) - 2, 1)
+    ))
+    SESSION_EVENTS_QUEUE_SIZE = int(os.getenv('SESSION_EVENTS_QUEUE_SIZE', 256))
+    
+    # Índice local das gravações (filtro has_recording do histórico)
+    RECORDING_INDEX_TTL = float(os.getenv('RECORDING_INDEX_TTL', 60))
+    
+    # Consultas em massa (POST /api/connections/bulk e /api/recordings/bulk)
+    BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', 500))
+    
+    # Sessões ativas por conexão nas listagens (cache curto)
+    ACTIVE_SESSIONS_TTL = float(os.getenv('ACTIVE_SESSIONS_TTL', 5))
+    
+    # Permissões de leitura de conexões (listagens e gravações)
+    ACL_ENABLED = os.getenv('ACL_ENABLED', 'True').lower() == 'true'
+    ACL_CACHE_MAX_USERS = int(os.getenv('ACL_CACHE_MAX_USERS', 1000))
+    
+    # Rollups de sessões (/api/analytics)
+    ANALYTICS_AUTO_REFRESH = os.getenv('ANALYTICS_AUTO_REFRESH', 'True').lower() == 'true'
+    ANALYTICS_REFRESH_INTERVAL = float(os.getenv('ANALYTICS_REFRESH_INTERVAL', 60))
+    ANALYTICS_REFRESH_BATCH = int(os.getenv('ANALYTICS_REFRESH_BATCH', 5000))
+    ANALYTICS_MAX_SESSION_HOURS = int(os.getenv('ANALYTICS_MAX_SESSION_HOURS', 24))
+    
+    # Requisições em lote (/api/batch)
+    BATCH_MAX_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', 20))
+    BATCH_MAX_WORKERS = int(os.getenv('BATCH_MAX_WORKERS', 8))
+    
+    # Métricas Prometheus (/api/metrics)
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+    
+    # Administração (endpoints /api/admin e profiling sob demanda)
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+    
+    # Profiling sob demanda
+    PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0.0))
+    PROFILING_INTERVAL_MS = float(os.getenv('PROFILING_INTERVAL_MS', 5))
+    PROFILING_DIR = os.getenv('PROFILING_DIR', '/tmp/guacplayer-profiles')
+    PROFILING_MAX_FILES = int(os.getenv('PROFILING_MAX_FILES', 50))
+    
+    # Modo ASGI (asgi.py): pool assíncrono e executor das operações NFS
+    ASGI_DB_POOL_MIN_CONN = int(os.getenv('ASGI_DB_POOL_MIN_CONN', 2))
+    ASGI_DB_POOL_MAX_CONN = int(os.getenv('ASGI_DB_POOL_MAX_CONN', 20))
+    ASGI_NFS_WORKERS = int(os.getenv('ASGI_NFS_WORKERS', 16))
+    ASGI_NFS_MAX_PENDING = int(os.getenv('ASGI_NFS_MAX_PENDING', 1024))
+    ASGI_STREAM_CHUNK_SIZE = int(os.getenv('ASGI_STREAM_CHUNK_SIZE', 256 * 1024))
+    # Threads das rotas atendidas pelo Flask (cada uma pode usar uma conexão do DB_POOL)
+    ASGI_WSGI_WORKERS = int(os.getenv('ASGI_WSGI_WORKERS', 8))
+    # Executor das leituras síncronas de banco das rotas nativas (permissões e
+    # árvore de grupos, quase sempre em cache), separado do executor NFS
+    ASGI_DB_WORKERS = int(os.getenv('ASGI_DB_WORKERS', 4))
+    ASGI_DB_MAX_PENDING = int(os.getenv('ASGI_DB_MAX_PENDING', 256))
     
     # Upload de arquivos
     MAX_CONTENT_LENGTH = 500 * 1024 * 1024  # 500MB
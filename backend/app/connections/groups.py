@@ -0,0 +1,215 @@
+"""
+Árvore de grupos de conexões
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Hierarquia de guacamole_connection_group montada com uma única
+consulta recursiva, em cache até a versão dos dados mudar, e resolução das
+subárvores usadas no filtro group_id das listagens
+"""
+
+import threading
+from collections import defaultdict
+from app.database import GuacamoleQueries
+from app.utils.logger import setup_logger
+from app.utils.table_version import group_tree_version
+
+logger = setup_logger(__name__)
+
+# Identificador do grupo raiz implícito (conexões com parent_id NULL)
+ROOT_GROUP = 'root'
+
+
+def parse_group_id(value):
+    """
+    Interpreta o parâmetro group_id
+    
+    Args:
+        value: Valor de ?group_id= (ID numérico ou "root")
+    
+    Returns:
+        int ou str: ID do grupo, ROOT_GROUP ou None se ausente
+    
+    Raises:
+        ValueError: Valor inválido
+    """
+    if value is None or value.strip() == '':
+        return None
+    if value.strip().lower() == ROOT_GROUP:
+        return ROOT_GROUP
+    try:
+        return int(value)
+    except ValueError as e:
+        raise ValueError("group_id deve ser um ID numérico ou root") from e
+
+
+class ConnectionGroupTree:
+    """Grupos de conexões e o grupo de cada conexão, em uma versão dos dados"""
+    
+    def __init__(self, groups, parents, version=None):
+        """
+        Inicializa a árvore
+        
+        Args:
+            groups: Linhas (id, parent_id, nome, tipo, caminho) ordenadas pelo caminho
+            parents: {connection_id: parent_id}
+            version: Versão das tabelas de grupos em que a árvore foi lida
+        """
+        self.version = version
+        self.groups = {}
+        self.children = defaultdict(list)
+        for group_id, parent_id, name, group_type, path in groups:
+            self.groups[group_id] = {
+                'connection_group_id': group_id,
+                'parent_id': parent_id,
+                'connection_group_name': name,
+                'type': group_type,
+                'depth': len(path) - 1
+            }
+            self.children[parent_id].append(group_id)
+        self.parents = parents
+        self._counts = self._count_connections(None)
+    
+    def __contains__(self, group_id):
+        return group_id in self.groups
+    
+    def subtree(self, group_id):
+        """
+        IDs do grupo e de todos os seus descendentes
+        
+        Args:
+            group_id: ID do grupo
+        
+        Returns:
+            list: IDs da subárvore
+        """
+        result = []
+        pending = [group_id]
+        while pending:
+            current = pending.pop()
+            result.append(current)
+            pending.extend(self.children.get(current, ()))
+        return result
+    
+    def _count_connections(self, acl):
+        """Conexões (legíveis) diretamente em cada grupo; None = raiz"""
+        counts = defaultdict(int)
+        for connection_id, parent_id in self.parents.items():
+            if acl is None or acl.allows(connection_id):
+                counts[parent_id] += 1
+        return counts
+    
+    def to_tree(self, acl=None, group_id=None):
+        """
+        Monta a hierarquia aninhada
+        
+        Sem ADMINISTER, somente grupos com alguma conexão legível na
+        subárvore aparecem, e as contagens consideram só as legíveis.
+        
+        Args:
+            acl: ConnectionAcl do usuário (None = sem restrição)
+            group_id: Raiz da subárvore (None = árvore completa)
+        
+        Returns:
+            tuple: (lista de nós raiz, conexões legíveis fora de grupos)
+        """
+        restricted = acl is not None and not acl.administer
+        counts = self._count_connections(acl) if restricted else self._counts
+        
+        # Ordem do caminho: pais antes dos filhos; totais somados de trás para frente
+        nodes = {
+            gid: dict(group, connection_count=counts.get(gid, 0), total_connections=counts.get(gid, 0), children=[])
+            for gid, group in self.groups.items()
+        }
+        for gid in reversed(list(self.groups)):
+            parent_id = self.groups[gid]['parent_id']
+            if parent_id in nodes:
+                nodes[parent_id]['total_connections'] += nodes[gid]['total_connections']
+        
+        def visible(gid):
+            return not restricted or nodes[gid]['total_connections'] > 0
+        
+        for gid in self.groups:
+            parent_id = self.groups[gid]['parent_id']
+            if parent_id in nodes and visible(gid):
+                nodes[parent_id]['children'].append(nodes[gid])
+        
+        if group_id is None:
+            roots = [nodes[gid] for gid in self.children.get(None, ()) if visible(gid)]
+        else:
+            roots = [nodes[group_id]] if group_id in nodes and visible(group_id) else []
+        return roots, counts.get(None, 0)
+
+
+class GroupTreeCache:
+    """Árvore de grupos do processo, relida quando a versão das tabelas de grupos muda"""
+    
+    def __init__(self):
+        """Inicializa o cache (carregado sob demanda)"""
+        self._lock = threading.Lock()
+        self._tree = None
+        self._queries = GuacamoleQueries()
+    
+    def get(self):
+        """
+        Obtém a árvore da versão atual das tabelas de grupos
+        
+        Returns:
+            ConnectionGroupTree: Árvore de grupos
+        """
+        version = group_tree_version()
+        tree = self._tree
+        if tree is not None and tree.version == version:
+            return tree
+        
+        with self._lock:
+            if self._tree is None or self._tree.version != version:
+                groups, parents = self._queries.get_connection_group_tree()
+                self._tree = ConnectionGroupTree(groups, parents, version)
+                logger.debug("Árvore de grupos carregada: %s grupos (versão %s)", len(groups), version)
+            return self._tree
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_group_tree():
+    """
+    Obtém a árvore de grupos de conexões em cache
+    
+    Returns:
+        ConnectionGroupTree: Árvore da versão atual dos dados
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = GroupTreeCache()
+    return _cache.get()
+
+
+def group_filter(group_id, recursive=True, acl=None):
+    """
+    Resolve o filtro de grupo das listagens de conexões
+    
+    Args:
+        group_id: Resultado de parse_group_id
+        recursive: Incluir as conexões dos subgrupos
+        acl: ConnectionAcl do usuário (grupo sem conexões legíveis = inexistente)
+    
+    Returns:
+        dict: Filtros de CONNECTION_LIST_FILTERS (vazio sem group_id)
+    
+    Raises:
+        ValueError: Grupo inexistente
+    """
+    if group_id is None or (group_id == ROOT_GROUP and recursive):
+        return {}
+    if group_id == ROOT_GROUP:
+        return {'root': None}
+    
+    tree = get_group_tree()
+    if group_id not in tree or not tree.to_tree(acl, group_id)[0]:
+        raise ValueError(f"Grupo de conexões {group_id} não encontrado")
+    
+    return {'group_ids': tree.subtree(group_id) if recursive else [group_id]}
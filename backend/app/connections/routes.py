@@ -6,9 +6,16 @@ Descrição: Endpoints para gerenciamento de conexões
 """
 
 from flask import Blueprint, request, jsonify
-from app.connections.services import ConnectionService
-from app.utils.decorators import handle_errors, token_required
+from app.connections.services import (
+    ConnectionService, CONNECTION_FIELDS, HISTORY_FIELDS, parse_connection_ids, parse_has_recording
+)
+from app.auth.acl import get_user_acl
+from app.connections.groups import ROOT_GROUP, group_filter, parse_group_id
+from app.utils.fields import parse_fields
+from app.utils.decorators import handle_errors, token_required, validate_json
 from app.utils.logger import setup_logger
+from app.utils.nfs_guard import NFSUnavailableError
+from app.utils.response_cache import cached_response
 
 logger = setup_logger(__name__)
 
@@ -22,6 +29,7 @@ service = ConnectionService()
 @connections_bp.route('', methods=['GET'])
 @handle_errors
 @token_required
+@cached_response
 def list_connections(current_user):
     """
     Endpoint para listar conexões com paginação
@@ -30,10 +38,20 @@ def list_connections(current_user):
         page: Número da página (padrão: 1)
         per_page: Itens por página (padrão: 20)
         search: Termo de busca (opcional)
+        fields: Campos de cada conexão, separados por vírgula (opcional)
+        group_id: Somente conexões do grupo (ID ou root) (opcional)
+        recursive: Incluir os subgrupos de group_id (padrão: true)
     
     Returns:
         dict: Lista de conexões paginada
     """
+    # Campo ou grupo inválido: ValueError vira 400 em handle_errors
+    fields = parse_fields(request.args.get('fields'), CONNECTION_FIELDS)
+    group_id = parse_group_id(request.args.get('group_id'))
+    recursive = request.args.get('recursive', 'true').strip().lower() not in ('false', '0', 'no')
+    acl = get_user_acl(current_user)
+    group_filters = group_filter(group_id, recursive, acl)
+    
     try:
         # Obter parâmetros de paginação
         page = request.args.get('page', 1, type=int)
@@ -46,41 +64,113 @@ def list_connections(current_user):
         if per_page < 1 or per_page > 100:
             per_page = 20
         
-        logger.info(f"Listando conexões: página {page}, per_page {per_page}, search '{search}'")
+        logger.debug("Listando conexões: página %s, per_page %s, search '%s'", page, per_page, search)
         
-        # Buscar conexões
+        # Buscar conexões (somente as legíveis pelo usuário)
         if search:
-            result = service.search_connections(search, page, per_page)
+            result = service.search_connections(search, page, per_page, fields, acl, group_filters)
         else:
-            result = service.get_connections_paginated(page, per_page)
+            result = service.get_connections_paginated(page, per_page, fields, acl, group_filters)
         
         return jsonify(result), 200
     
     except Exception as e:
-        logger.error(f"Erro ao listar conexões: {str(e)}")
+        logger.error("Erro ao listar conexões: %s", e)
         return jsonify({'error': 'Erro ao listar conexões'}), 500
 
 
+@connections_bp.route('/groups', methods=['GET'])
+@handle_errors
+@token_required
+@cached_response
+def get_connection_groups(current_user):
+    """
+    Endpoint para obter a hierarquia de grupos de conexões
+    
+    Query Parameters:
+        group_id: Raiz da subárvore (opcional)
+    
+    Returns:
+        dict: Grupos aninhados com a quantidade de conexões de cada um
+    """
+    group_id = parse_group_id(request.args.get('group_id'))
+    if group_id == ROOT_GROUP:
+        group_id = None
+    
+    try:
+        logger.debug("Obtendo árvore de grupos de conexões (raiz: %s)", group_id)
+        
+        result = service.get_group_tree(get_user_acl(current_user), group_id)
+        
+        if not result:
+            return jsonify({'error': 'Grupo de conexões não encontrado'}), 404
+        
+        return jsonify(result), 200
+    
+    except Exception as e:
+        logger.error("Erro ao obter árvore de grupos: %s", e)
+        return jsonify({'error': 'Erro ao obter grupos de conexões'}), 500
+
+
+@connections_bp.route('/bulk', methods=['POST'])
+@handle_errors
+@token_required
+@validate_json('ids')
+def get_connections_bulk(current_user, data):
+    """
+    Endpoint para obter várias conexões em uma chamada
+    
+    Body:
+        ids: Lista de IDs de conexão (até BULK_MAX_ITEMS)
+    
+    Query Parameters:
+        fields: Campos de cada conexão, separados por vírgula (opcional)
+    
+    Returns:
+        dict: Conexões encontradas e IDs inexistentes ("missing")
+    """
+    # Entrada inválida: ValueError vira 400 em handle_errors
+    connection_ids = parse_connection_ids(data['ids'])
+    fields = parse_fields(request.args.get('fields'), CONNECTION_FIELDS)
+    
+    try:
+        logger.debug("Consulta em massa de %s conexões", len(connection_ids))
+        
+        result = service.get_connections_bulk(connection_ids, fields, get_user_acl(current_user))
+        
+        return jsonify(result), 200
+    
+    except Exception as e:
+        logger.error("Erro ao obter conexões em massa: %s", e)
+        return jsonify({'error': 'Erro ao obter conexões'}), 500
+
+
 @connections_bp.route('/<int:connection_id>', methods=['GET'])
 @handle_errors
 @token_required
+@cached_response
 def get_connection(connection_id, current_user):
     """
     Endpoint para obter detalhes de uma conexão
     
+    Query Parameters:
+        fields: Campos da conexão, separados por vírgula (opcional)
+    
     Args:
         connection_id: ID da conexão
     
     Returns:
         dict: Detalhes da conexão
     """
+    fields = parse_fields(request.args.get('fields'), CONNECTION_FIELDS)
+    
     try:
-        logger.info(f"Obtendo detalhes da conexão {connection_id}")
+        logger.debug("Obtendo detalhes da conexão %s", connection_id)
         
-        connection = service.get_connection_detail(connection_id)
+        connection = service.get_connection_detail(connection_id, fields, get_user_acl(current_user))
         
         if not connection:
-            logger.warning(f"Conexão {connection_id} não encontrada")
+            logger.warning("Conexão %s não encontrada", connection_id)
             return jsonify({'error': 'Conexão não encontrada'}), 404
         
         return jsonify({
@@ -89,13 +179,14 @@ def get_connection(connection_id, current_user):
         }), 200
     
     except Exception as e:
-        logger.error(f"Erro ao obter conexão {connection_id}: {str(e)}")
+        logger.error("Erro ao obter conexão %s: %s", connection_id, e)
         return jsonify({'error': 'Erro ao obter conexão'}), 500
 
 
 @connections_bp.route('/<int:connection_id>/history', methods=['GET'])
 @handle_errors
 @token_required
+@cached_response
 def get_connection_history(connection_id, current_user):
     """
     Endpoint para obter histórico de sessões de uma conexão
@@ -103,13 +194,18 @@ def get_connection_history(connection_id, current_user):
     Query Parameters:
         page: Número da página (padrão: 1)
         per_page: Itens por página (padrão: 20)
+        fields: Campos de cada sessão, separados por vírgula (opcional)
+        has_recording: Somente sessões com (true) ou sem (false) gravação
     
     Args:
         connection_id: ID da conexão
     
     Returns:
-        dict: Histórico paginado
+        dict: Histórico paginado, com a gravação de cada sessão
     """
+    fields = parse_fields(request.args.get('fields'), HISTORY_FIELDS)
+    has_recording = parse_has_recording(request.args.get('has_recording'))
+    
     try:
         # Obter parâmetros de paginação
         page = request.args.get('page', 1, type=int)
@@ -121,16 +217,20 @@ def get_connection_history(connection_id, current_user):
         if per_page < 1 or per_page > 100:
             per_page = 20
         
-        logger.info(f"Obtendo histórico da conexão {connection_id}: página {page}")
+        logger.debug("Obtendo histórico da conexão %s: página %s", connection_id, page)
         
-        result = service.get_connection_history_paginated(connection_id, page, per_page)
+        result = service.get_connection_history_paginated(
+            connection_id, page, per_page, fields, has_recording, get_user_acl(current_user)
+        )
         
         if not result:
-            logger.warning(f"Conexão {connection_id} não encontrada")
+            logger.warning("Conexão %s não encontrada", connection_id)
             return jsonify({'error': 'Conexão não encontrada'}), 404
         
         return jsonify(result), 200
     
+    except NFSUnavailableError:
+        raise
     except Exception as e:
-        logger.error(f"Erro ao obter histórico da conexão {connection_id}: {str(e)}")
+        logger.error("Erro ao obter histórico da conexão %s: %s", connection_id, e)
         return jsonify({'error': 'Erro ao obter histórico'}), 500
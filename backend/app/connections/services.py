@@ -5,11 +5,174 @@ Data: 2025
 Descrição: Lógica de negócio para operações com conexões
 """
 
-from app.database import GuacamoleQueries
+import threading
+import time
+from dataclasses import fields as dataclass_fields
+from app.config import Config
+from app.connections.groups import get_group_tree
+from app.database import GuacamoleQueries, ConnectionRow, HistoryRow
+from app.recordings.services import RecordingService
+from app.utils.fields import select, wants
 from app.utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+# Campos aceitos em ?fields= (itens de conexão e de histórico)
+CONNECTION_FIELDS = tuple(field.name for field in dataclass_fields(ConnectionRow))
+HISTORY_FIELDS = tuple(field.name for field in dataclass_fields(HistoryRow))
+
+
+def parse_has_recording(value):
+    """
+    Interpreta o filtro has_recording do histórico
+    
+    Args:
+        value: Valor de ?has_recording= (true/false, 1/0)
+    
+    Returns:
+        bool: Filtro, ou None se ausente
+    
+    Raises:
+        ValueError: Valor não booleano
+    """
+    if value is None or value == '':
+        return None
+    
+    normalized = value.strip().lower()
+    if normalized in ('true', '1', 'yes'):
+        return True
+    if normalized in ('false', '0', 'no'):
+        return False
+    raise ValueError("has_recording deve ser true ou false")
+
+
+def parse_connection_ids(values):
+    """
+    Valida os IDs de uma consulta em massa
+    
+    Args:
+        values: Lista recebida no corpo da requisição
+    
+    Returns:
+        list: IDs sem repetição, na ordem recebida
+    
+    Raises:
+        ValueError: Lista vazia, grande demais ou com ID não inteiro
+    """
+    if not isinstance(values, list) or not values:
+        raise ValueError("'ids' deve ser uma lista não vazia")
+    if len(values) > Config.BULK_MAX_ITEMS:
+        raise ValueError(f"Máximo de {Config.BULK_MAX_ITEMS} IDs por consulta")
+    if any(not isinstance(value, int) or isinstance(value, bool) for value in values):
+        raise ValueError("'ids' deve conter apenas inteiros")
+    
+    return list(dict.fromkeys(values))
+
+
+def list_filters(acl=None, group_filters=None):
+    """
+    Monta os filtros da listagem de conexões
+    
+    Args:
+        acl: ConnectionAcl do usuário (None = sem restrição)
+        group_filters: Resultado de group_filter (None = todos os grupos)
+    
+    Returns:
+        dict: Filtros de CONNECTION_LIST_FILTERS
+    """
+    filters = dict(group_filters or {})
+    if acl is not None and not acl.administer:
+        filters['connection_ids'] = acl.readable_ids()
+    return filters
+
+
+class ActiveSessionCounter:
+    """
+    Sessões em andamento por conexão, em cache por ACTIVE_SESSIONS_TTL
+    segundos; as conexões de uma página ausentes ou expiradas são contadas
+    juntas em uma única consulta agrupada
+    """
+    
+    def __init__(self, db, ttl):
+        """
+        Inicializa o contador
+        
+        Args:
+            db: GuacamoleQueries
+            ttl: Validade das contagens em segundos
+        """
+        self.db = db
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._counts = {}
+    
+    def counts(self, connection_ids):
+        """
+        Obtém as sessões ativas das conexões
+        
+        Args:
+            connection_ids: IDs das conexões
+        
+        Returns:
+            dict: {connection_id: sessões ativas} para todos os IDs pedidos
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = {
+                i: self._counts[i][0] for i in connection_ids
+                if i in self._counts and self._counts[i][1] > now
+            }
+        
+        stale = [i for i in connection_ids if i not in cached]
+        if stale:
+            loaded = self.db.get_active_session_counts(stale)
+            expires = time.monotonic() + self.ttl
+            with self._lock:
+                # Descarta as expiradas para o cache não crescer indefinidamente
+                self._counts = {i: entry for i, entry in self._counts.items() if entry[1] > now}
+                for i in stale:
+                    self._counts[i] = (loaded.get(i, 0), expires)
+                    cached[i] = loaded.get(i, 0)
+        
+        return cached
+
+
+_counter = None
+_counter_lock = threading.Lock()
+
+
+def get_active_session_counter():
+    """
+    Obtém o contador de sessões ativas do processo
+    
+    Returns:
+        ActiveSessionCounter: Contador compartilhado
+    """
+    global _counter
+    if _counter is None:
+        with _counter_lock:
+            if _counter is None:
+                _counter = ActiveSessionCounter(GuacamoleQueries(), Config.ACTIVE_SESSIONS_TTL)
+    return _counter
+
+
+def annotate_active_sessions(connections, counter):
+    """
+    Preenche ConnectionRow.active_sessions de uma página de conexões
+    
+    Args:
+        connections: Lista de ConnectionRow (alterada no lugar)
+        counter: ActiveSessionCounter
+    
+    Returns:
+        list: A mesma lista
+    """
+    if connections:
+        counts = counter.counts([conn.connection_id for conn in connections])
+        for conn in connections:
+            conn.active_sessions = counts[conn.connection_id]
+    return connections
+
 
 class ConnectionService:
     """Serviço para gerenciar operações com conexões"""
@@ -17,14 +180,19 @@ class ConnectionService:
     def __init__(self):
         """Inicializa o serviço"""
         self.db = GuacamoleQueries()
+        self.recordings = RecordingService()
+        self.active_sessions = get_active_session_counter()
     
-    def get_connections_paginated(self, page=1, per_page=20):
+    def get_connections_paginated(self, page=1, per_page=20, fields=None, acl=None, group_filters=None):
         """
         Obtém conexões com paginação
         
         Args:
             page: Número da página (começa em 1)
             per_page: Quantidade de itens por página
+            fields: Campos de cada conexão (None = todos)
+            acl: ConnectionAcl do usuário (None = sem restrição)
+            group_filters: Resultado de group_filter (None = todos os grupos)
         
         Returns:
             dict: Dados paginados
@@ -34,20 +202,23 @@ class ConnectionService:
             offset = (page - 1) * per_page
             
             # Buscar conexões
-            connections, total = self.db.get_connections(offset, per_page)
+            connections, total = self.db.get_connections(offset, per_page, list_filters(acl, group_filters))
             
-            # Enriquecer com parâmetros
-            for conn in connections:
-                conn['parameters'] = self.db.get_connection_parameters(conn['connection_id'])
+            # Enriquecer com parâmetros e sessões ativas (somente se pedidos)
+            if wants(fields, 'parameters'):
+                for conn in connections:
+                    conn.parameters = self.db.get_connection_parameters(conn.connection_id)
+            if wants(fields, 'active_sessions'):
+                annotate_active_sessions(connections, self.active_sessions)
             
             # Calcular paginação
             total_pages = (total + per_page - 1) // per_page
             
-            logger.info(f"Conexões paginadas retornadas: página {page}, total {total}")
+            logger.debug("Conexões paginadas retornadas: página %s, total %s", page, total)
             
             return {
                 'success': True,
-                'data': connections,
+                'data': [select(conn, fields) for conn in connections],
                 'pagination': {
                     'page': page,
                     'per_page': per_page,
@@ -57,72 +228,132 @@ class ConnectionService:
             }
         
         except Exception as e:
-            logger.error(f"Erro ao obter conexões paginadas: {str(e)}")
+            logger.error("Erro ao obter conexões paginadas: %s", e)
             raise
     
-    def get_connection_detail(self, connection_id):
+    def get_connection_detail(self, connection_id, fields=None, acl=None):
         """
         Obtém detalhes completos de uma conexão
         
         Args:
             connection_id: ID da conexão
+            fields: Campos da conexão (None = todos)
+            acl: ConnectionAcl do usuário (None = sem restrição)
         
         Returns:
-            dict: Detalhes da conexão
+            ConnectionRow: Detalhes da conexão com parâmetros (dict se fields),
+            ou None se inexistente ou não legível
         """
         try:
+            # Conexão não legível é tratada como inexistente
+            if acl is not None and not acl.allows(connection_id):
+                logger.warning("Conexão %s não legível pelo usuário", connection_id)
+                return None
+            
             # Buscar conexão
             connection = self.db.get_connection_by_id(connection_id)
             
             if not connection:
-                logger.warning(f"Conexão {connection_id} não encontrada")
+                logger.warning("Conexão %s não encontrada", connection_id)
                 return None
             
-            # Adicionar parâmetros
-            connection['parameters'] = self.db.get_connection_parameters(connection_id)
+            # Adicionar parâmetros e sessões ativas (somente se pedidos)
+            if wants(fields, 'parameters'):
+                connection.parameters = self.db.get_connection_parameters(connection_id)
+            if wants(fields, 'active_sessions'):
+                annotate_active_sessions([connection], self.active_sessions)
             
-            logger.info(f"Detalhes da conexão {connection_id} recuperados")
-            return connection
+            logger.debug("Detalhes da conexão %s recuperados", connection_id)
+            return select(connection, fields)
         
         except Exception as e:
-            logger.error(f"Erro ao obter detalhes da conexão {connection_id}: {str(e)}")
+            logger.error("Erro ao obter detalhes da conexão %s: %s", connection_id, e)
             raise
     
-    def get_connection_history_paginated(self, connection_id, page=1, per_page=20):
+    def get_connections_bulk(self, connection_ids, fields=None, acl=None):
         """
-        Obtém histórico de sessões de uma conexão com paginação
+        Obtém várias conexões com uma única consulta (ANY)
+        
+        Args:
+            connection_ids: IDs validados por parse_connection_ids
+            fields: Campos de cada conexão (None = todos)
+            acl: ConnectionAcl do usuário (None = sem restrição)
+        
+        Returns:
+            dict: Conexões encontradas, na ordem pedida, e IDs inexistentes
+            (ou não legíveis)
+        """
+        try:
+            readable = connection_ids if acl is None else [i for i in connection_ids if acl.allows(i)]
+            connections = self.db.get_connections_by_ids(
+                readable, with_parameters=wants(fields, 'parameters')
+            ) if readable else []
+            if wants(fields, 'active_sessions'):
+                annotate_active_sessions(connections, self.active_sessions)
+            found = {conn.connection_id: conn for conn in connections}
+            
+            logger.debug("Consulta em massa: %s de %s conexões encontradas", len(found), len(connection_ids))
+            
+            return {
+                'success': True,
+                'data': [select(found[i], fields) for i in connection_ids if i in found],
+                'missing': [i for i in connection_ids if i not in found]
+            }
+        
+        except Exception as e:
+            logger.error("Erro ao obter conexões em massa: %s", e)
+            raise
+    
+    def get_connection_history_paginated(self, connection_id, page=1, per_page=20, fields=None,
+                                         has_recording=None, acl=None):
+        """
+        Obtém histórico de sessões de uma conexão com paginação, anotado com
+        a gravação de cada sessão
         
         Args:
             connection_id: ID da conexão
             page: Número da página
             per_page: Quantidade de itens por página
+            fields: Campos de cada sessão (None = todos)
+            has_recording: Filtrar sessões com (True) ou sem (False) gravação
+            acl: ConnectionAcl do usuário (None = sem restrição)
         
         Returns:
             dict: Dados paginados do histórico
         """
         try:
-            # Verificar se conexão existe
+            # Verificar se conexão existe e é legível
+            if acl is not None and not acl.allows(connection_id):
+                logger.warning("Histórico da conexão %s não legível pelo usuário", connection_id)
+                return None
             connection = self.db.get_connection_by_id(connection_id)
             if not connection:
-                logger.warning(f"Conexão {connection_id} não encontrada")
+                logger.warning("Conexão %s não encontrada", connection_id)
                 return None
             
             # Calcular offset
             offset = (page - 1) * per_page
             
-            # Buscar histórico
-            history, total = self.db.get_connection_history(connection_id, offset, per_page)
+            # Buscar histórico (filtro por gravação antes da paginação)
+            recorded_ids = self.recordings.recorded_history_ids() if has_recording is not None else None
+            history, total = self.db.get_connection_history(
+                connection_id, offset, per_page, recorded_ids, has_recording
+            )
+            
+            # Anotar a página com as gravações (uma consulta NFS em lote)
+            if wants(fields, 'recording'):
+                self.recordings.annotate_history(history)
             
             # Calcular paginação
             total_pages = (total + per_page - 1) // per_page
             
-            logger.info(f"Histórico da conexão {connection_id} recuperado: página {page}, total {total}")
+            logger.debug("Histórico da conexão %s recuperado: página %s, total %s", connection_id, page, total)
             
             return {
                 'success': True,
                 'connection_id': connection_id,
-                'connection_name': connection['connection_name'],
-                'data': history,
+                'connection_name': connection.connection_name,
+                'data': [select(session, fields) for session in history],
                 'pagination': {
                     'page': page,
                     'per_page': per_page,
@@ -132,10 +363,10 @@ class ConnectionService:
             }
         
         except Exception as e:
-            logger.error(f"Erro ao obter histórico da conexão {connection_id}: {str(e)}")
+            logger.error("Erro ao obter histórico da conexão %s: %s", connection_id, e)
             raise
     
-    def search_connections(self, query, page=1, per_page=20):
+    def search_connections(self, query, page=1, per_page=20, fields=None, acl=None, group_filters=None):
         """
         Busca conexões por nome ou protocolo
         
@@ -143,6 +374,9 @@ class ConnectionService:
             query: Termo de busca
             page: Número da página
             per_page: Quantidade de itens por página
+            fields: Campos de cada conexão (None = todos)
+            acl: ConnectionAcl do usuário (None = sem restrição)
+            group_filters: Resultado de group_filter (None = todos os grupos)
         
         Returns:
             dict: Resultados da busca
@@ -151,14 +385,14 @@ class ConnectionService:
             # Para MVP, implementar busca simples em memória
             # Em produção, usar índice de busca no banco
             
-            all_connections, total = self.db.get_connections(0, 1000)
+            all_connections, total = self.db.get_connections(0, 1000, list_filters(acl, group_filters))
             
             # Filtrar por query
             query_lower = query.lower()
             filtered = [
                 conn for conn in all_connections
-                if query_lower in conn['connection_name'].lower() or
-                   query_lower in conn['protocol'].lower()
+                if query_lower in conn.connection_name.lower() or
+                   query_lower in conn.protocol.lower()
             ]
             
             # Aplicar paginação
@@ -168,16 +402,19 @@ class ConnectionService:
             total_filtered = len(filtered)
             total_pages = (total_filtered + per_page - 1) // per_page
             
-            # Enriquecer com parâmetros
-            for conn in paginated:
-                conn['parameters'] = self.db.get_connection_parameters(conn['connection_id'])
+            # Enriquecer com parâmetros e sessões ativas (somente se pedidos)
+            if wants(fields, 'parameters'):
+                for conn in paginated:
+                    conn.parameters = self.db.get_connection_parameters(conn.connection_id)
+            if wants(fields, 'active_sessions'):
+                annotate_active_sessions(paginated, self.active_sessions)
             
-            logger.info(f"Busca por '{query}' retornou {total_filtered} resultados")
+            logger.debug("Busca por '%s' retornou %s resultados", query, total_filtered)
             
             return {
                 'success': True,
                 'query': query,
-                'data': paginated,
+                'data': [select(conn, fields) for conn in paginated],
                 'pagination': {
                     'page': page,
                     'per_page': per_page,
@@ -187,5 +424,40 @@ class ConnectionService:
             }
         
         except Exception as e:
-            logger.error(f"Erro ao buscar conexões: {str(e)}")
+            logger.error("Erro ao buscar conexões: %s", e)
+            raise
+    
+    def get_group_tree(self, acl=None, group_id=None):
+        """
+        Obtém a hierarquia de grupos de conexões (árvore em cache)
+        
+        Args:
+            acl: ConnectionAcl do usuário (None = sem restrição)
+            group_id: Raiz da subárvore (None = árvore completa)
+        
+        Returns:
+            dict: Grupos aninhados e conexões fora de grupos, ou None se o
+            grupo não existe (ou não tem conexões legíveis)
+        """
+        try:
+            tree = get_group_tree()
+            if group_id is not None and group_id not in tree:
+                logger.warning("Grupo de conexões %s não encontrado", group_id)
+                return None
+            
+            roots, root_connections = tree.to_tree(acl, group_id)
+            if group_id is not None and not roots:
+                logger.warning("Grupo de conexões %s sem conexões legíveis", group_id)
+                return None
+            
+            logger.debug("Árvore de grupos retornada: %s raízes", len(roots))
+            
+            return {
+                'success': True,
+                'data': roots,
+                'root_connection_count': root_connections if group_id is None else None
+            }
+        
+        except Exception as e:
+            logger.error("Erro ao obter árvore de grupos: %s", e)
             raise
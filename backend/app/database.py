@@ -5,15 +5,549 @@ Data: 2025
 Descrição: Gerencia conexão com PostgreSQL e consultas ao banco Guacamole
 """
 
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
 import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
 from psycopg2.extras import RealDictCursor
-from contextlib import contextmanager
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
 from app.config import Config
 from app.utils.logger import setup_logger
+from app.utils.request_context import timed
 
 logger = setup_logger(__name__)
 
 
+# Consultas compartilhadas com o acesso assíncrono (app.asgi.database)
+SQL_COUNT_CONNECTIONS = "SELECT COUNT(*) as total FROM guacamole_connection"
+
+SQL_LIST_CONNECTIONS = """
+    SELECT 
+        connection_id,
+        connection_name,
+        protocol,
+        parent_id,
+        max_connections,
+        max_connections_per_user,
+        proxy_hostname,
+        proxy_port
+    FROM guacamole_connection
+    ORDER BY connection_name
+    LIMIT %s OFFSET %s
+"""
+
+# Listagem filtrada: fragmentos fixos de CONNECTION_LIST_FILTERS unidos com
+# AND (conexões legíveis pelo usuário e subárvore de grupos)
+SQL_COUNT_CONNECTIONS_FILTERED = "SELECT COUNT(*) as total FROM guacamole_connection WHERE {conditions}"
+
+SQL_LIST_CONNECTIONS_FILTERED = """
+    SELECT 
+        connection_id,
+        connection_name,
+        protocol,
+        parent_id,
+        max_connections,
+        max_connections_per_user,
+        proxy_hostname,
+        proxy_port
+    FROM guacamole_connection
+    WHERE {conditions}
+    ORDER BY connection_name
+    LIMIT %s OFFSET %s
+"""
+
+CONNECTION_LIST_FILTERS = {
+    'connection_ids': 'connection_id = ANY(%s)',
+    'group_ids': 'parent_id = ANY(%s)',
+    'root': 'parent_id IS NULL'
+}
+
+SQL_GET_CONNECTION = """
+    SELECT 
+        connection_id,
+        connection_name,
+        protocol,
+        parent_id,
+        max_connections,
+        max_connections_per_user,
+        proxy_hostname,
+        proxy_port
+    FROM guacamole_connection
+    WHERE connection_id = %s
+"""
+
+SQL_GET_CONNECTION_PARAMETERS = """
+    SELECT 
+        parameter_name,
+        parameter_value
+    FROM guacamole_connection_parameter
+    WHERE connection_id = %s
+"""
+
+# Várias conexões em uma consulta; a variante com parâmetros os agrega em
+# JSON (decodificado pelo psycopg2) para evitar uma consulta por conexão
+SQL_GET_CONNECTIONS_BY_IDS = """
+    SELECT 
+        connection_id,
+        connection_name,
+        protocol,
+        parent_id,
+        max_connections,
+        max_connections_per_user,
+        proxy_hostname,
+        proxy_port
+    FROM guacamole_connection
+    WHERE connection_id = ANY(%s)
+"""
+
+SQL_GET_CONNECTIONS_WITH_PARAMETERS_BY_IDS = """
+    SELECT 
+        c.connection_id,
+        c.connection_name,
+        c.protocol,
+        c.parent_id,
+        c.max_connections,
+        c.max_connections_per_user,
+        c.proxy_hostname,
+        c.proxy_port,
+        COALESCE(
+            (SELECT json_object_agg(p.parameter_name, p.parameter_value)
+             FROM guacamole_connection_parameter p
+             WHERE p.connection_id = c.connection_id),
+            '{}'::json
+        ) AS parameters
+    FROM guacamole_connection c
+    WHERE c.connection_id = ANY(%s)
+"""
+
+SQL_COUNT_CONNECTION_HISTORY = """
+    SELECT COUNT(*) as total 
+    FROM guacamole_connection_history 
+    WHERE connection_id = %s
+"""
+
+# Filtro por gravação: a página é preenchida percorrendo os history_id da
+# conexão em blocos por keyset (start_date, history_id), na ordem da
+# listagem, cruzados com o índice local em Python; o índice não vai ao banco
+SQL_LIST_CONNECTION_HISTORY_CHUNK = """
+    SELECT history_id, start_date
+    FROM guacamole_connection_history
+    WHERE connection_id = %s{after}
+    ORDER BY start_date DESC, history_id DESC
+    LIMIT %s
+"""
+
+HISTORY_CHUNK_AFTER = " AND (start_date, history_id) < (%s, %s)"
+
+# Linhas por bloco do percurso acima
+HISTORY_CHUNK_SIZE = 500
+
+# Todos os history_id da conexão, sem ordenação, só para o total filtrado
+# (contado uma vez por versão do índice; ver RecordedHistoryCounts)
+SQL_LIST_CONNECTION_HISTORY_IDS = """
+    SELECT history_id
+    FROM guacamole_connection_history
+    WHERE connection_id = %s
+"""
+
+SQL_GET_CONNECTION_HISTORY_BY_IDS = """
+    SELECT 
+        history_id,
+        connection_id,
+        user_id,
+        start_date,
+        end_date,
+        remote_host
+    FROM guacamole_connection_history
+    WHERE history_id = ANY(%s)
+    ORDER BY start_date DESC, history_id DESC
+"""
+
+SQL_LIST_CONNECTION_HISTORY = """
+    SELECT 
+        history_id,
+        connection_id,
+        user_id,
+        start_date,
+        end_date,
+        remote_host
+    FROM guacamole_connection_history
+    WHERE connection_id = %s
+    ORDER BY start_date DESC, history_id DESC
+    LIMIT %s OFFSET %s
+"""
+
+# Busca global no histórico: filtros opcionais (fragmentos fixos de
+# HISTORY_SEARCH_FILTERS, unidos com AND) e paginação por keyset na ordem
+# (start_date, history_id) decrescente
+SQL_SEARCH_HISTORY = """
+    SELECT 
+        h.history_id,
+        h.connection_id,
+        h.connection_name,
+        h.user_id,
+        h.username,
+        h.remote_host,
+        h.start_date,
+        h.end_date,
+        c.protocol
+    FROM guacamole_connection_history h
+    LEFT JOIN guacamole_connection c ON c.connection_id = h.connection_id
+    WHERE {conditions}
+    ORDER BY h.start_date DESC, h.history_id DESC
+    LIMIT %s
+"""
+
+HISTORY_SEARCH_FILTERS = {
+    'username': 'h.username = %s',
+    'start_from': 'h.start_date >= %s',
+    'start_to': 'h.start_date < %s',
+    'remote_host': 'h.remote_host = %s',
+    'protocol': 'c.protocol = %s',
+    'connection_ids': 'h.connection_id = ANY(%s)',
+    'after': '(h.start_date, h.history_id) < (%s, %s)'
+}
+
+# Árvore de grupos de conexões em uma consulta: caminho de IDs desde a raiz
+# (também evita ciclos) e quantidade de conexões diretamente no grupo
+SQL_CONNECTION_GROUP_TREE = """
+    WITH RECURSIVE tree AS (
+        SELECT
+            connection_group_id,
+            parent_id,
+            connection_group_name,
+            type,
+            ARRAY[connection_group_id] AS path
+        FROM guacamole_connection_group
+        WHERE parent_id IS NULL
+        UNION ALL
+        SELECT
+            g.connection_group_id,
+            g.parent_id,
+            g.connection_group_name,
+            g.type,
+            t.path || g.connection_group_id
+        FROM guacamole_connection_group g
+        JOIN tree t ON g.parent_id = t.connection_group_id
+        WHERE NOT g.connection_group_id = ANY(t.path)
+    )
+    SELECT connection_group_id, parent_id, connection_group_name, type, path
+    FROM tree
+    ORDER BY path
+"""
+
+# Grupo de cada conexão (NULL = raiz), para contagens e poda por permissão
+SQL_CONNECTION_PARENTS = "SELECT connection_id, parent_id FROM guacamole_connection"
+
+# Conexão de cada sessão (acesso às gravações, nomeadas pelo history_id)
+SQL_GET_HISTORY_CONNECTIONS = """
+    SELECT history_id, connection_id
+    FROM guacamole_connection_history
+    WHERE history_id = ANY(%s)
+"""
+
+# Permissões efetivas de um usuário: a própria entidade e os grupos (ativos)
+# dos quais é membro, direta ou indiretamente. ADMINISTER libera tudo; as
+# demais conexões exigem READ explícito (o Guacamole não herda permissões de
+# conexão pelos grupos de conexões)
+SQL_USER_ACL = """
+    WITH RECURSIVE entities(entity_id) AS (
+        SELECT entity_id FROM guacamole_user WHERE user_id = %s AND NOT disabled
+        UNION
+        SELECT g.entity_id
+        FROM guacamole_user_group_member m
+        JOIN entities e ON e.entity_id = m.member_entity_id
+        JOIN guacamole_user_group g ON g.user_group_id = m.user_group_id
+        WHERE NOT g.disabled
+    )
+    SELECT
+        EXISTS (
+            SELECT 1 FROM guacamole_system_permission sp
+            JOIN entities e ON e.entity_id = sp.entity_id
+            WHERE sp.permission = 'ADMINISTER'
+        ) AS administer,
+        ARRAY(
+            SELECT DISTINCT cp.connection_id FROM guacamole_connection_permission cp
+            JOIN entities e ON e.entity_id = cp.entity_id
+            WHERE cp.permission = 'READ'
+            ORDER BY cp.connection_id
+        ) AS connection_ids
+"""
+
+# Índices de uma tabela: colunas-chave, INCLUDE (PostgreSQL 11+) e o
+# predicado dos índices parciais
+SQL_TABLE_INDEXES = """
+    SELECT 
+        i.relname AS index_name,
+        x.indnkeyatts,
+        ARRAY(
+            SELECT pg_get_indexdef(x.indexrelid, k, true)
+            FROM generate_series(1, x.indnatts) AS k
+            ORDER BY k
+        ) AS columns,
+        x.indisvalid,
+        pg_get_expr(x.indpred, x.indrelid, true) AS predicate
+    FROM pg_index x
+    JOIN pg_class i ON i.oid = x.indexrelid
+    WHERE x.indrelid = %s::regclass
+    ORDER BY i.relname
+"""
+
+# Detecção barata de mudanças: contadores de escrita das tabelas de conexões
+# e de permissões (pg_stat, atualizados com pequeno atraso) e último
+# history_id (índice da PK)
+SQL_DATA_VERSION = """
+    SELECT
+        COALESCE(SUM(n_tup_ins + n_tup_upd + n_tup_del), 0) AS changes,
+        (SELECT COALESCE(MAX(history_id), 0) FROM guacamole_connection_history) AS last_history_id
+    FROM pg_stat_user_tables
+    WHERE relname IN (
+        'guacamole_connection',
+        'guacamole_connection_group',
+        'guacamole_connection_parameter',
+        'guacamole_connection_history',
+        'guacamole_connection_permission',
+        'guacamole_system_permission',
+        'guacamole_user_group',
+        'guacamole_user_group_member'
+    )
+"""
+
+# Versão de um conjunto de tabelas (só os contadores de escrita do pg_stat),
+# para caches que não devem ser invalidados a cada sessão iniciada/encerrada
+SQL_TABLE_VERSION = """
+    SELECT COALESCE(SUM(n_tup_ins + n_tup_upd + n_tup_del), 0)
+    FROM pg_stat_user_tables
+    WHERE relname = ANY(%s)
+"""
+
+# Tabelas lidas por SQL_USER_ACL (usuários desabilitados incluídos)
+PERMISSION_TABLES = (
+    'guacamole_connection_permission',
+    'guacamole_system_permission',
+    'guacamole_user_group',
+    'guacamole_user_group_member',
+    'guacamole_user',
+    'guacamole_entity'
+)
+
+# Tabelas da árvore de grupos (grupos e o grupo pai de cada conexão)
+GROUP_TREE_TABLES = (
+    'guacamole_connection_group',
+    'guacamole_connection'
+)
+
+# Sessões em andamento por conexão de uma página da listagem (atendida pelo
+# índice parcial WHERE end_date IS NULL, que contém só as sessões ativas)
+SQL_ACTIVE_SESSION_COUNTS = """
+    SELECT connection_id, COUNT(*)
+    FROM guacamole_connection_history
+    WHERE end_date IS NULL AND connection_id = ANY(%s)
+    GROUP BY connection_id
+"""
+
+# Sessões ativas e o maior history_id (ponto de partida do feed de sessões)
+SQL_ACTIVE_SESSIONS = """
+    SELECT 
+        history_id,
+        connection_id,
+        connection_name,
+        user_id,
+        username,
+        remote_host,
+        start_date,
+        end_date
+    FROM guacamole_connection_history
+    WHERE end_date IS NULL
+    ORDER BY history_id
+"""
+
+SQL_LAST_HISTORY_ID = "SELECT COALESCE(MAX(history_id), 0) FROM guacamole_connection_history"
+
+# Sessões novas desde o último history_id visto e estado atual das ativas
+SQL_SESSION_CHANGES = """
+    SELECT 
+        history_id,
+        connection_id,
+        connection_name,
+        user_id,
+        username,
+        remote_host,
+        start_date,
+        end_date
+    FROM guacamole_connection_history
+    WHERE history_id > %s OR history_id = ANY(%s)
+    ORDER BY history_id
+"""
+
+
+@dataclass
+class ConnectionRow:
+    """Linha de guacamole_connection (serializada diretamente pelo provedor JSON)"""
+    connection_id: int
+    connection_name: str
+    protocol: str
+    parent_id: Optional[int]
+    max_connections: Optional[int]
+    max_connections_per_user: Optional[int]
+    proxy_hostname: Optional[str]
+    proxy_port: Optional[int]
+    parameters: Optional[dict] = None
+    active_sessions: Optional[int] = None
+
+
+@dataclass
+class HistoryRow:
+    """Linha de guacamole_connection_history (mesma ordem de SQL_LIST_CONNECTION_HISTORY)"""
+    history_id: int
+    connection_id: Optional[int]
+    user_id: Optional[int]
+    start_date: datetime
+    end_date: Optional[datetime]
+    remote_host: Optional[str]
+    recording: Optional[dict] = None
+
+
+@dataclass
+class HistorySearchRow:
+    """Resultado da busca global no histórico (mesma ordem de SQL_SEARCH_HISTORY)"""
+    history_id: int
+    connection_id: Optional[int]
+    connection_name: str
+    user_id: Optional[int]
+    username: str
+    remote_host: Optional[str]
+    start_date: datetime
+    end_date: Optional[datetime]
+    protocol: Optional[str]
+
+
+@dataclass
+class SessionRow:
+    """Sessão de guacamole_connection_history (mesma ordem de SQL_ACTIVE_SESSIONS)"""
+    history_id: int
+    connection_id: Optional[int]
+    connection_name: str
+    user_id: Optional[int]
+    username: str
+    remote_host: Optional[str]
+    start_date: datetime
+    end_date: Optional[datetime]
+
+
+class _PoolState:
+    """
+    Pool de conexões do processo atual
+    
+    O pool é criado sob demanda e pertence ao PID que o criou: com
+    preload_app o master do gunicorn importa a aplicação antes do fork, e os
+    sockets herdados não podem ser compartilhados entre processos.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pool = None
+        self.slots = None
+        self.pid = None
+    
+    def get(self, config):
+        """
+        Retorna o pool do processo atual, criando-o se necessário
+        
+        Args:
+            config: Parâmetros de conexão
+        
+        Returns:
+            tuple: (ThreadedConnectionPool, semáforo de slots)
+        """
+        pid = os.getpid()
+        if self.pool is not None and self.pid == pid:
+            return self.pool, self.slots
+        
+        with self.lock:
+            if self.pool is None or self.pid != pid:
+                self.pool = ThreadedConnectionPool(
+                    Config.DB_POOL_MIN_CONN, Config.DB_POOL_MAX_CONN, **config
+                )
+                self.slots = threading.BoundedSemaphore(Config.DB_POOL_MAX_CONN)
+                self.pid = pid
+                logger.debug(
+                    "Pool PostgreSQL criado (pid %s, máx. %s conexões)", pid, Config.DB_POOL_MAX_CONN
+                )
+        return self.pool, self.slots
+    
+    def reset_after_fork(self):
+        """Descarta o pool herdado sem fechar os sockets do processo pai"""
+        self.lock = threading.Lock()
+        self.pool = None
+        self.slots = None
+        self.pid = None
+    
+    def close(self):
+        """Fecha todas as conexões do pool (encerramento do worker)"""
+        with self.lock:
+            if self.pool is not None and self.pid == os.getpid():
+                self.pool.closeall()
+            self.pool = None
+            self.slots = None
+            self.pid = None
+
+
+_pool_state = _PoolState()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_pool_state.reset_after_fork)
+
+# Conexão compartilhada pelas sub-requisições de um lote (/api/batch)
+_shared_connection = ContextVar('guacplayer_shared_db_connection', default=None)
+
+
+class _SharedConnection:
+    """Conexão de um lote, obtida do pool só na primeira consulta"""
+    
+    def __init__(self, db):
+        """
+        Inicializa a reserva (sem conexão)
+        
+        Args:
+            db: DatabaseConnection usado para obter a conexão do pool
+        """
+        self.db = db
+        self.conn = None
+        self._lock = threading.Lock()
+        self._stack = ExitStack()
+    
+    def get(self):
+        """
+        Obtém a conexão, reservando-a do pool no primeiro uso
+        
+        Returns:
+            psycopg2.connection: Conexão em autocommit
+        """
+        with self._lock:
+            if self.conn is None:
+                conn = self._stack.enter_context(self.db._pooled_connection())
+                conn.autocommit = True
+                self.conn = conn
+            return self.conn
+    
+    def release(self, exc_info=(None, None, None)):
+        """Devolve a conexão ao pool, se alguma consulta a reservou"""
+        if self.conn is not None and not self.conn.closed:
+            self.conn.autocommit = False
+        self._stack.__exit__(*exc_info)
+
+
+def close_pool():
+    """Fecha o pool de conexões do processo atual"""
+    _pool_state.close()
+
+
 class DatabaseConnection:
     """Gerenciador de conexão com PostgreSQL"""
     
@@ -30,43 +564,264 @@ class DatabaseConnection:
     @contextmanager
     def get_connection(self):
         """
-        Context manager para obter conexão com o banco de dados
+        Context manager para obter conexão do pool
+        
+        Aguarda até DB_POOL_TIMEOUT segundos por uma conexão livre quando
+        todas estão em uso.
+        
+        Yields:
+            psycopg2.connection: Conexão com o banco
+        """
+        shared = _shared_connection.get()
+        if shared is not None:
+            # Em autocommit: commit/rollback ficam a cargo de shared_connection()
+            yield shared.get()
+            return
+        
+        with self._pooled_connection() as conn:
+            yield conn
+    
+    @contextmanager
+    def _pooled_connection(self):
+        """
+        Reserva uma conexão do pool (commit ao sair, rollback em erro)
         
         Yields:
             psycopg2.connection: Conexão com o banco
         """
+        pool, slots = _pool_state.get(self.config)
+        if not slots.acquire(timeout=Config.DB_POOL_TIMEOUT):
+            raise psycopg2.OperationalError("Tempo esgotado aguardando conexão do pool")
+        
         conn = None
+        discard = False
         try:
-            conn = psycopg2.connect(**self.config)
-            logger.info("Conexão com PostgreSQL estabelecida")
+            conn = pool.getconn()
+            logger.debug("Conexão com PostgreSQL obtida do pool")
             yield conn
             conn.commit()
-        except psycopg2.Error as e:
-            if conn:
-                conn.rollback()
-            logger.error(f"Erro ao conectar ao PostgreSQL: {str(e)}")
+        except BaseException as e:
+            if conn and not conn.closed:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    discard = True
+            if isinstance(e, psycopg2.Error):
+                logger.error("Erro ao conectar ao PostgreSQL: %s", e)
             raise
         finally:
             if conn:
-                conn.close()
-                logger.info("Conexão com PostgreSQL fechada")
+                # Conexões quebradas são fechadas em vez de voltarem ao pool
+                pool.putconn(conn, close=discard or bool(conn.closed))
+                logger.debug("Conexão com PostgreSQL devolvida ao pool")
+            slots.release()
+    
+    @contextmanager
+    def shared_connection(self):
+        """
+        Context manager que compartilha uma conexão do pool entre todas as
+        consultas feitas no contexto atual (inclusive em threads iniciadas
+        com copy_context), em autocommit para que o erro de uma consulta não
+        aborte as demais. A conexão só é reservada na primeira consulta:
+        contextos sem acesso ao banco não dependem do pool.
+        """
+        shared = _SharedConnection(self)
+        token = _shared_connection.set(shared)
+        exc_info = (None, None, None)
+        try:
+            yield
+        except BaseException as e:
+            exc_info = (type(e), e, e.__traceback__)
+            raise
+        finally:
+            _shared_connection.reset(token)
+            shared.release(exc_info)
     
     @contextmanager
-    def get_cursor(self):
+    def get_cursor(self, cursor_factory=RealDictCursor):
         """
-        Context manager para obter cursor com dicionário
+        Context manager para obter cursor (linhas como dicionário por padrão)
+        
+        Args:
+            cursor_factory: Classe do cursor (None para linhas como tuplas)
         
         Yields:
-            psycopg2.cursor: Cursor com resultados como dicionário
+            psycopg2.cursor: Cursor da conexão
         """
         with self.get_connection() as conn:
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor = conn.cursor(cursor_factory=cursor_factory)
             try:
                 yield cursor
             finally:
                 cursor.close()
 
 
+def history_chunk_sql(connection_id, after, size):
+    """
+    Monta a consulta de um bloco de history_id da conexão
+    
+    Args:
+        connection_id: ID da conexão
+        after: (start_date, history_id) da última linha do bloco anterior
+            (None = primeiro bloco)
+        size: Número máximo de linhas
+    
+    Returns:
+        tuple: (SQL, parâmetros)
+    """
+    if after is None:
+        return SQL_LIST_CONNECTION_HISTORY_CHUNK.format(after=''), (connection_id, size)
+    return SQL_LIST_CONNECTION_HISTORY_CHUNK.format(after=HISTORY_CHUNK_AFTER), (connection_id, *after, size)
+
+
+class RecordedHistoryPager:
+    """
+    Página do histórico filtrado por gravação, montada bloco a bloco
+    
+    Cada bloco (history_id, start_date) lido com history_chunk_sql é
+    cruzado com o índice local; a leitura termina quando a página está
+    completa ou a conexão não tem mais sessões.
+    """
+    
+    def __init__(self, recorded_ids, has_recording, offset, limit, chunk_size=HISTORY_CHUNK_SIZE):
+        """
+        Inicializa a página
+        
+        Args:
+            recorded_ids: history_id com gravação (índice local)
+            has_recording: Manter sessões com (True) ou sem (False) gravação
+            offset: Número de registros filtrados a pular
+            limit: Número máximo de registros
+            chunk_size: Linhas por bloco
+        """
+        self.recorded = recorded_ids or frozenset()
+        self.has_recording = has_recording
+        self.skip = offset
+        self.limit = limit
+        self.chunk_size = chunk_size
+        self.page_ids = []
+        self.after = None
+        self.done = limit <= 0
+    
+    def chunk_sql(self, connection_id):
+        """Consulta do próximo bloco: (SQL, parâmetros)"""
+        return history_chunk_sql(connection_id, self.after, self.chunk_size)
+    
+    def feed(self, rows):
+        """
+        Consome um bloco de linhas (history_id, start_date)
+        
+        Args:
+            rows: Linhas do bloco, na ordem da listagem
+        """
+        for history_id, _ in rows:
+            if (history_id in self.recorded) != self.has_recording:
+                continue
+            if self.skip:
+                self.skip -= 1
+                continue
+            self.page_ids.append(history_id)
+            if len(self.page_ids) >= self.limit:
+                self.done = True
+                return
+        
+        if len(rows) < self.chunk_size:
+            self.done = True
+        else:
+            self.after = (rows[-1][1], rows[-1][0])
+
+
+class RecordedHistoryCounts:
+    """
+    Sessões gravadas por conexão, recontadas só quando o índice de
+    gravações é recarregado ou o total de sessões da conexão muda
+    """
+    
+    def __init__(self, max_entries=1024):
+        """
+        Inicializa o cache
+        
+        Args:
+            max_entries: Número máximo de conexões mantidas
+        """
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+    
+    def get(self, connection_id, recorded_ids, history_total):
+        """
+        Obtém a contagem em cache
+        
+        Args:
+            connection_id: ID da conexão
+            recorded_ids: Índice de gravações atual
+            history_total: Total de sessões da conexão
+        
+        Returns:
+            int: Sessões gravadas da conexão (None = recontar)
+        """
+        with self._lock:
+            entry = self._entries.get(connection_id)
+            if entry is None or entry[0] is not recorded_ids or entry[1] != history_total:
+                return None
+            self._entries.move_to_end(connection_id)
+            return entry[2]
+    
+    def put(self, connection_id, recorded_ids, history_total, history_ids):
+        """
+        Conta as sessões gravadas e guarda o resultado
+        
+        Args:
+            connection_id: ID da conexão
+            recorded_ids: Índice de gravações atual
+            history_total: Total de sessões da conexão
+            history_ids: Todos os history_id da conexão
+        
+        Returns:
+            int: Sessões gravadas da conexão
+        """
+        recorded = recorded_ids or frozenset()
+        count = sum(1 for history_id in history_ids if history_id in recorded)
+        with self._lock:
+            self._entries[connection_id] = (recorded_ids, history_total, count)
+            self._entries.move_to_end(connection_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return count
+
+
+recorded_history_counts = RecordedHistoryCounts()
+
+
+def recorded_history_total(recorded_count, history_total, has_recording):
+    """Total do histórico filtrado a partir da contagem de sessões gravadas"""
+    return recorded_count if has_recording else history_total - recorded_count
+
+
+def connection_list_sql(filters):
+    """
+    Monta as consultas de contagem e listagem de conexões
+    
+    Args:
+        filters: Dicionário {filtro: valor} com chaves de CONNECTION_LIST_FILTERS
+            (None ou vazio = todas as conexões)
+    
+    Returns:
+        tuple: (SQL de contagem, SQL de listagem, parâmetros dos filtros)
+    """
+    if not filters:
+        return SQL_COUNT_CONNECTIONS, SQL_LIST_CONNECTIONS, ()
+    
+    # Somente fragmentos fixos entram no SQL; os valores vão como parâmetros
+    conditions = ' AND '.join(CONNECTION_LIST_FILTERS[name] for name in filters)
+    args = tuple(value for value in filters.values() if value is not None)
+    return (
+        SQL_COUNT_CONNECTIONS_FILTERED.format(conditions=conditions),
+        SQL_LIST_CONNECTIONS_FILTERED.format(conditions=conditions),
+        args
+    )
+
+
 class GuacamoleQueries:
     """Classe com consultas específicas do Guacamole"""
     
@@ -74,49 +829,39 @@ class GuacamoleQueries:
         """Inicializa o gerenciador de queries"""
         self.db = DatabaseConnection()
     
-    def get_connections(self, offset=0, limit=20):
+    @timed('db')
+    def get_connections(self, offset=0, limit=20, filters=None):
         """
         Obtém lista paginada de conexões
         
         Args:
             offset: Número de registros a pular
             limit: Número máximo de registros a retornar
+            filters: Dicionário {filtro: valor} com chaves de CONNECTION_LIST_FILTERS
         
         Returns:
-            tuple: (lista de conexões, total de registros)
+            tuple: (lista de ConnectionRow, total de registros)
         """
+        count_sql, list_sql, args = connection_list_sql(filters)
+        
         try:
-            with self.db.get_cursor() as cursor:
+            with self.db.get_cursor(cursor_factory=None) as cursor:
                 # Contar total de conexões
-                cursor.execute("SELECT COUNT(*) as total FROM guacamole_connection")
-                total = cursor.fetchone()['total']
+                cursor.execute(count_sql, args)
+                total = cursor.fetchone()[0]
                 
                 # Buscar conexões com paginação
-                query = """
-                    SELECT 
-                        connection_id,
-                        connection_name,
-                        protocol,
-                        parent_id,
-                        max_connections,
-                        max_connections_per_user,
-                        proxy_hostname,
-                        proxy_port
-                    FROM guacamole_connection
-                    ORDER BY connection_name
-                    LIMIT %s OFFSET %s
-                """
+                cursor.execute(list_sql, args + (limit, offset))
+                connections = [ConnectionRow(*row) for row in cursor.fetchall()]
                 
-                cursor.execute(query, (limit, offset))
-                connections = cursor.fetchall()
-                
-                logger.info(f"Recuperadas {len(connections)} conexões (offset: {offset}, limit: {limit})")
+                logger.debug("Recuperadas %s conexões (offset: %s, limit: %s)", len(connections), offset, limit)
                 return connections, total
         
         except psycopg2.Error as e:
-            logger.error(f"Erro ao buscar conexões: {str(e)}")
+            logger.error("Erro ao buscar conexões: %s", e)
             raise
     
+    @timed('db')
     def get_connection_by_id(self, connection_id):
         """
         Obtém detalhes de uma conexão específica
@@ -125,38 +870,51 @@ class GuacamoleQueries:
             connection_id: ID da conexão
         
         Returns:
-            dict: Detalhes da conexão
+            ConnectionRow: Detalhes da conexão
         """
         try:
-            with self.db.get_cursor() as cursor:
-                query = """
-                    SELECT 
-                        connection_id,
-                        connection_name,
-                        protocol,
-                        parent_id,
-                        max_connections,
-                        max_connections_per_user,
-                        proxy_hostname,
-                        proxy_port
-                    FROM guacamole_connection
-                    WHERE connection_id = %s
-                """
+            with self.db.get_cursor(cursor_factory=None) as cursor:
+                cursor.execute(SQL_GET_CONNECTION, (connection_id,))
+                row = cursor.fetchone()
                 
-                cursor.execute(query, (connection_id,))
-                connection = cursor.fetchone()
-                
-                if connection:
-                    logger.info(f"Conexão {connection_id} recuperada com sucesso")
-                    return connection
+                if row:
+                    logger.debug("Conexão %s recuperada com sucesso", connection_id)
+                    return ConnectionRow(*row)
                 else:
-                    logger.warning(f"Conexão {connection_id} não encontrada")
+                    logger.warning("Conexão %s não encontrada", connection_id)
                     return None
         
         except psycopg2.Error as e:
-            logger.error(f"Erro ao buscar conexão {connection_id}: {str(e)}")
+            logger.error("Erro ao buscar conexão %s: %s", connection_id, e)
+            raise
+    
+    @timed('db')
+    def get_connections_by_ids(self, connection_ids, with_parameters=True):
+        """
+        Obtém várias conexões em uma única consulta
+        
+        Args:
+            connection_ids: IDs das conexões
+            with_parameters: Incluir os parâmetros de cada conexão
+        
+        Returns:
+            list: ConnectionRow encontradas (sem ordem definida)
+        """
+        sql = SQL_GET_CONNECTIONS_WITH_PARAMETERS_BY_IDS if with_parameters else SQL_GET_CONNECTIONS_BY_IDS
+        
+        try:
+            with self.db.get_cursor(cursor_factory=None) as cursor:
+                cursor.execute(sql, (list(connection_ids),))
+                connections = [ConnectionRow(*row) for row in cursor.fetchall()]
+                
+                logger.debug("Recuperadas %s de %s conexões por ID", len(connections), len(connection_ids))
+                return connections
+        
+        except psycopg2.Error as e:
+            logger.error("Erro ao buscar conexões por ID: %s", e)
             raise
     
+    @timed('db')
     def get_connection_parameters(self, connection_id):
         """
         Obtém parâmetros de uma conexão
@@ -168,29 +926,21 @@ class GuacamoleQueries:
             dict: Parâmetros da conexão
         """
         try:
-            with self.db.get_cursor() as cursor:
-                query = """
-                    SELECT 
-                        parameter_name,
-                        parameter_value
-                    FROM guacamole_connection_parameter
-                    WHERE connection_id = %s
-                """
-                
-                cursor.execute(query, (connection_id,))
-                params = cursor.fetchall()
+            with self.db.get_cursor(cursor_factory=None) as cursor:
+                cursor.execute(SQL_GET_CONNECTION_PARAMETERS, (connection_id,))
                 
-                # Converter para dicionário
-                parameters = {param['parameter_name']: param['parameter_value'] for param in params}
+                # Converter pares (nome, valor) para dicionário
+                parameters = dict(cursor.fetchall())
                 
-                logger.info(f"Parâmetros da conexão {connection_id} recuperados")
+                logger.debug("Parâmetros da conexão %s recuperados", connection_id)
                 return parameters
         
         except psycopg2.Error as e:
-            logger.error(f"Erro ao buscar parâmetros da conexão {connection_id}: {str(e)}")
+            logger.error("Erro ao buscar parâmetros da conexão %s: %s", connection_id, e)
             raise
     
-    def get_connection_history(self, connection_id, offset=0, limit=20):
+    @timed('db')
+    def get_connection_history(self, connection_id, offset=0, limit=20, recorded_ids=None, has_recording=None):
         """
         Obtém histórico de sessões de uma conexão
         
@@ -198,46 +948,204 @@ class GuacamoleQueries:
             connection_id: ID da conexão
             offset: Número de registros a pular
             limit: Número máximo de registros a retornar
+            recorded_ids: history_id com gravação (usado com has_recording)
+            has_recording: Filtrar sessões com (True) ou sem (False) gravação
         
         Returns:
-            tuple: (lista de sessões, total de registros)
+            tuple: (lista de HistoryRow, total de registros)
         """
         try:
-            with self.db.get_cursor() as cursor:
+            with self.db.get_cursor(cursor_factory=None) as cursor:
                 # Contar total de sessões
-                count_query = """
-                    SELECT COUNT(*) as total 
-                    FROM guacamole_connection_history 
-                    WHERE connection_id = %s
-                """
-                cursor.execute(count_query, (connection_id,))
-                total = cursor.fetchone()['total']
-                
-                # Buscar histórico com paginação
-                query = """
-                    SELECT 
-                        history_id,
-                        connection_id,
-                        user_id,
-                        start_date,
-                        end_date,
-                        remote_host
-                    FROM guacamole_connection_history
-                    WHERE connection_id = %s
-                    ORDER BY start_date DESC
-                    LIMIT %s OFFSET %s
-                """
+                cursor.execute(SQL_COUNT_CONNECTION_HISTORY, (connection_id,))
+                total = cursor.fetchone()[0]
                 
-                cursor.execute(query, (connection_id, limit, offset))
-                history = cursor.fetchall()
+                if has_recording is None:
+                    # Buscar histórico com paginação
+                    cursor.execute(SQL_LIST_CONNECTION_HISTORY, (connection_id, limit, offset))
+                    history = [HistoryRow(*row) for row in cursor.fetchall()]
+                else:
+                    # Filtro antes da paginação, sem enviar o índice de gravações ao banco
+                    pager = RecordedHistoryPager(recorded_ids, has_recording, offset, limit)
+                    while not pager.done:
+                        cursor.execute(*pager.chunk_sql(connection_id))
+                        pager.feed(cursor.fetchall())
+                    history = []
+                    if pager.page_ids:
+                        cursor.execute(SQL_GET_CONNECTION_HISTORY_BY_IDS, (pager.page_ids,))
+                        history = [HistoryRow(*row) for row in cursor.fetchall()]
+                    
+                    # Total filtrado: recontado só com índice ou histórico novos
+                    recorded = recorded_history_counts.get(connection_id, recorded_ids, total)
+                    if recorded is None:
+                        cursor.execute(SQL_LIST_CONNECTION_HISTORY_IDS, (connection_id,))
+                        recorded = recorded_history_counts.put(
+                            connection_id, recorded_ids, total, [row[0] for row in cursor.fetchall()]
+                        )
+                    total = recorded_history_total(recorded, total, has_recording)
                 
-                logger.info(f"Histórico da conexão {connection_id} recuperado ({len(history)} registros)")
+                logger.debug("Histórico da conexão %s recuperado (%s registros)", connection_id, len(history))
                 return history, total
         
         except psycopg2.Error as e:
-            logger.error(f"Erro ao buscar histórico da conexão {connection_id}: {str(e)}")
+            logger.error("Erro ao buscar histórico da conexão %s: %s", connection_id, e)
+            raise
+    
+    @timed('db')
+    def search_history(self, filters, after=None, limit=20):
+        """
+        Busca sessões em todas as conexões com uma única consulta
+        
+        Args:
+            filters: Dicionário {filtro: valor} com chaves de HISTORY_SEARCH_FILTERS
+            after: (start_date, history_id) da última linha da página anterior
+            limit: Número máximo de registros a retornar
+        
+        Returns:
+            list: HistorySearchRow na ordem (start_date, history_id) decrescente
+        """
+        conditions = []
+        params = []
+        for name, value in filters.items():
+            conditions.append(HISTORY_SEARCH_FILTERS[name])
+            params.append(value)
+        if after is not None:
+            conditions.append(HISTORY_SEARCH_FILTERS['after'])
+            params.extend(after)
+        
+        # Somente fragmentos fixos entram no SQL; os valores vão como parâmetros
+        sql = SQL_SEARCH_HISTORY.format(conditions=' AND '.join(conditions) or 'TRUE')
+        
+        try:
+            with self.db.get_cursor(cursor_factory=None) as cursor:
+                cursor.execute(sql, params + [limit])
+                rows = [HistorySearchRow(*row) for row in cursor.fetchall()]
+                
+                logger.debug("Busca no histórico retornou %s registros (filtros: %s)", len(rows), sorted(filters))
+                return rows
+        
+        except psycopg2.Error as e:
+            logger.error("Erro na busca do histórico: %s", e)
             raise
     
+    @timed('db')
+    def get_table_indexes(self, table):
+        """
+        Lista os índices de uma tabela
+        
+        Args:
+            table: Nome da tabela
+        
+        Returns:
+            list: Dicionários {name, columns, include, predicate, valid}
+        """
+        try:
+            with self.db.get_cursor(cursor_factory=None) as cursor:
+                cursor.execute(SQL_TABLE_INDEXES, (table,))
+                return [
+                    {
+                        'name': name,
+                        'columns': list(columns[:key_count]),
+                        'include': list(columns[key_count:]),
+                        'predicate': predicate,
+                        'valid': valid
+                    }
+                    for name, key_count, columns, valid, predicate in cursor.fetchall()
+                ]
+        
+        except psycopg2.Error as e:
+            logger.error("Erro ao listar índices de %s: %s", table, e)
+            raise
+    
+    @timed('db')
+    def get_connection_group_tree(self):
+        """
+        Obtém os grupos de conexões (ordenados pelo caminho desde a raiz) e o
+        grupo de cada conexão
+        
+        Returns:
+            tuple: (lista de (id, parent_id, nome, tipo, caminho), {connection_id: parent_id})
+        """
+        try:
+            with self.db.get_cursor(cursor_factory=None) as cursor:
+                cursor.execute(SQL_CONNECTION_GROUP_TREE)
+                groups = cursor.fetchall()
+                
+                cursor.execute(SQL_CONNECTION_PARENTS)
+                parents = dict(cursor.fetchall())
+                
+                logger.debug("Árvore de grupos: %s grupos, %s conexões", len(groups), len(parents))
+                return groups, parents
+        
+        except psycopg2.Error as e:
+            logger.error("Erro ao buscar árvore de grupos de conexões: %s", e)
+            raise
+    
+    @timed('db')
+    def get_active_session_counts(self, connection_ids):
+        """
+        Conta as sessões em andamento de várias conexões em uma consulta
+        
+        Args:
+            connection_ids: IDs das conexões
+        
+        Returns:
+            dict: {connection_id: sessões ativas} (conexões sem sessões ausentes)
+        """
+        try:
+            with self.db.get_cursor(cursor_factory=None) as cursor:
+                cursor.execute(SQL_ACTIVE_SESSION_COUNTS, (list(connection_ids),))
+                return dict(cursor.fetchall())
+        
+        except psycopg2.Error as e:
+            logger.error("Erro ao contar sessões ativas: %s", e)
+            raise
+    
+    @timed('db')
+    def get_history_connections(self, history_ids):
+        """
+        Obtém a conexão de cada sessão
+        
+        Args:
+            history_ids: IDs das sessões
+        
+        Returns:
+            dict: {history_id: connection_id} das sessões existentes
+        """
+        try:
+            with self.db.get_cursor(cursor_factory=None) as cursor:
+                cursor.execute(SQL_GET_HISTORY_CONNECTIONS, (list(history_ids),))
+                return dict(cursor.fetchall())
+        
+        except psycopg2.Error as e:
+            logger.error("Erro ao buscar conexões das sessões: %s", e)
+            raise
+    
+    @timed('db')
+    def get_user_acl(self, user_id):
+        """
+        Obtém as permissões efetivas de leitura de conexões de um usuário
+        
+        Args:
+            user_id: ID do usuário
+        
+        Returns:
+            tuple: (possui ADMINISTER, lista ordenada de connection_id legíveis)
+        """
+        try:
+            with self.db.get_cursor(cursor_factory=None) as cursor:
+                cursor.execute(SQL_USER_ACL, (user_id,))
+                administer, connection_ids = cursor.fetchone()
+                
+                logger.debug("Permissões do usuário %s: administrador %s, %s conexões",
+                             user_id, administer, len(connection_ids))
+                return administer, connection_ids
+        
+        except psycopg2.Error as e:
+            logger.error("Erro ao buscar permissões do usuário %s: %s", user_id, e)
+            raise
+    
+    @timed('db')
     def get_user_by_id(self, user_id):
         """
         Obtém informações de um usuário
@@ -264,16 +1172,17 @@ class GuacamoleQueries:
                 user = cursor.fetchone()
                 
                 if user:
-                    logger.info(f"Usuário {user_id} recuperado com sucesso")
+                    logger.debug("Usuário %s recuperado com sucesso", user_id)
                     return user
                 else:
-                    logger.warning(f"Usuário {user_id} não encontrado")
+                    logger.warning("Usuário %s não encontrado", user_id)
                     return None
         
         except psycopg2.Error as e:
-            logger.error(f"Erro ao buscar usuário {user_id}: {str(e)}")
+            logger.error("Erro ao buscar usuário %s: %s", user_id, e)
             raise
     
+    @timed('db')
     def get_user_by_username(self, username):
         """
         Obtém informações de um usuário pelo nome de usuário
@@ -301,12 +1210,95 @@ class GuacamoleQueries:
                 user = cursor.fetchone()
                 
                 if user:
-                    logger.info(f"Usuário '{username}' recuperado com sucesso")
+                    logger.debug("Usuário '%s' recuperado com sucesso", username)
                     return user
                 else:
-                    logger.warning(f"Usuário '{username}' não encontrado")
+                    logger.warning("Usuário '%s' não encontrado", username)
                     return None
         
         except psycopg2.Error as e:
-            logger.error(f"Erro ao buscar usuário '{username}': {str(e)}")
+            logger.error("Erro ao buscar usuário '%s': %s", username, e)
+            raise
+    
+    @timed('db')
+    def get_active_sessions(self):
+        """
+        Obtém as sessões em andamento
+        
+        Returns:
+            tuple: (lista de SessionRow, maior history_id existente)
+        """
+        try:
+            with self.db.get_cursor(cursor_factory=None) as cursor:
+                cursor.execute(SQL_LAST_HISTORY_ID)
+                last_id = cursor.fetchone()[0]
+                
+                cursor.execute(SQL_ACTIVE_SESSIONS)
+                sessions = [SessionRow(*row) for row in cursor.fetchall()]
+                
+                logger.debug("%s sessões ativas (último history_id: %s)", len(sessions), last_id)
+                return sessions, last_id
+        
+        except psycopg2.Error as e:
+            logger.error("Erro ao buscar sessões ativas: %s", e)
+            raise
+    
+    @timed('db')
+    def get_session_changes(self, after_id, active_ids):
+        """
+        Obtém as sessões iniciadas após after_id e o estado atual das ativas
+        
+        Args:
+            after_id: Maior history_id já conhecido
+            active_ids: history_ids das sessões conhecidas como ativas
+        
+        Returns:
+            list: SessionRow ordenadas por history_id
+        """
+        try:
+            with self.db.get_cursor(cursor_factory=None) as cursor:
+                cursor.execute(SQL_SESSION_CHANGES, (after_id, list(active_ids)))
+                return [SessionRow(*row) for row in cursor.fetchall()]
+        
+        except psycopg2.Error as e:
+            logger.error("Erro ao buscar alterações de sessões: %s", e)
+            raise
+    
+    @timed('db')
+    def get_table_version(self, tables):
+        """
+        Obtém a versão de um conjunto de tabelas
+        
+        Args:
+            tables: Nomes das tabelas
+        
+        Returns:
+            int: Soma dos contadores de escrita; muda quando alguma das
+            tabelas é alterada
+        """
+        try:
+            with self.db.get_cursor(cursor_factory=None) as cursor:
+                cursor.execute(SQL_TABLE_VERSION, (list(tables),))
+                return int(cursor.fetchone()[0])
+        
+        except psycopg2.Error as e:
+            logger.error("Erro ao obter versão das tabelas %s: %s", tables, e)
+            raise
+    
+    @timed('db')
+    def get_data_version(self):
+        """
+        Obtém a versão atual dos dados de conexões e histórico
+        
+        Returns:
+            tuple: (contador de escritas, último history_id); muda quando
+            conexões, parâmetros ou sessões são alterados
+        """
+        try:
+            with self.db.get_cursor(cursor_factory=None) as cursor:
+                cursor.execute(SQL_DATA_VERSION)
+                return tuple(cursor.fetchone())
+        
+        except psycopg2.Error as e:
+            logger.error("Erro ao obter versão dos dados: %s", e)
             raise
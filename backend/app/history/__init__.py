@@ -0,0 +1 @@
+"""Módulo de busca no histórico de sessões"""
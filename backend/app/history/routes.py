@@ -0,0 +1,71 @@
+"""
+Rotas de busca no histórico
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Endpoint de busca global no histórico de sessões
+"""
+
+from flask import Blueprint, request, jsonify
+from app.auth.acl import get_user_acl
+from app.history.services import HistoryService, HISTORY_SEARCH_FIELDS, parse_date
+from app.utils.decorators import handle_errors, token_required
+from app.utils.fields import parse_fields
+from app.utils.logger import setup_logger
+from app.utils.response_cache import cached_response
+
+logger = setup_logger(__name__)
+
+# Criar blueprint de histórico
+history_bp = Blueprint('history', __name__)
+
+# Instanciar serviço
+service = HistoryService()
+
+
+@history_bp.route('', methods=['GET'])
+@handle_errors
+@token_required
+@cached_response
+def search_history(current_user):
+    """
+    Endpoint para buscar sessões em todas as conexões
+    
+    Query Parameters:
+        user: Nome do usuário (opcional)
+        from: Início do período, ISO 8601, inclusivo (opcional)
+        to: Fim do período, ISO 8601, exclusivo (opcional)
+        remote_host: Endereço de origem (opcional)
+        protocol: Protocolo da conexão (opcional)
+        cursor: Cursor da próxima página, de pagination.next_cursor (opcional)
+        per_page: Itens por página (padrão: 20)
+        fields: Campos de cada sessão, separados por vírgula (opcional)
+    
+    Returns:
+        dict: Sessões (mais recentes primeiro) e cursor da próxima página
+    """
+    # Filtro inválido: ValueError vira 400 em handle_errors
+    filters = {
+        'username': request.args.get('user') or None,
+        'start_from': parse_date(request.args.get('from'), 'from'),
+        'start_to': parse_date(request.args.get('to'), 'to'),
+        'remote_host': request.args.get('remote_host') or None,
+        'protocol': request.args.get('protocol') or None
+    }
+    fields = parse_fields(request.args.get('fields'), HISTORY_SEARCH_FIELDS)
+    cursor = request.args.get('cursor') or None
+    
+    per_page = request.args.get('per_page', 20, type=int)
+    if per_page < 1 or per_page > 100:
+        per_page = 20
+    
+    logger.debug("Buscando histórico: filtros %s, per_page %s", filters, per_page)
+    
+    try:
+        result = service.search(filters, cursor, per_page, fields, get_user_acl(current_user))
+        return jsonify(result), 200
+    
+    except ValueError:
+        raise
+    except Exception as e:
+        logger.error("Erro ao buscar histórico: %s", e)
+        return jsonify({'error': 'Erro ao buscar histórico'}), 500
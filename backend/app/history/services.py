@@ -0,0 +1,250 @@
+"""
+Serviços de busca no histórico de sessões
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Busca global no histórico (todas as conexões) por usuário,
+período, remote_host e protocolo, com paginação por keyset, e a verificação
+dos índices compostos que mantêm a busca em varreduras de índice
+"""
+
+import base64
+import json
+from dataclasses import fields as dataclass_fields
+from datetime import datetime
+from app.database import GuacamoleQueries, HistorySearchRow
+from app.utils.fields import select
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+HISTORY_TABLE = 'guacamole_connection_history'
+
+# Campos aceitos em ?fields=
+HISTORY_SEARCH_FIELDS = tuple(field.name for field in dataclass_fields(HistorySearchRow))
+
+# Colunas lidas pela busca além das chaves: no INCLUDE do índice de ordenação
+# a busca sem filtros seletivos vira index-only scan
+SEARCH_COVERING_COLUMNS = ('connection_id', 'connection_name', 'user_id', 'username', 'remote_host', 'end_date')
+
+# Índices compostos recomendados: a chave termina na ordem do keyset
+# (start_date, history_id), então cada filtro de igualdade é um intervalo
+# contíguo do índice e a página seguinte continua de onde a anterior parou
+RECOMMENDED_INDEXES = [
+    {
+        'name': 'guacplayer_history_start_id',
+        'columns': ('start_date', 'history_id'),
+        'include': SEARCH_COVERING_COLUMNS,
+        'reason': 'Ordenação do keyset e filtro por período; INCLUDE cobre a busca'
+    },
+    {
+        'name': 'guacplayer_history_username_start_id',
+        'columns': ('username', 'start_date', 'history_id'),
+        'include': (),
+        'reason': 'Filtro por usuário'
+    },
+    {
+        'name': 'guacplayer_history_remote_host_start_id',
+        'columns': ('remote_host', 'start_date', 'history_id'),
+        'include': (),
+        'reason': 'Filtro por remote_host'
+    },
+    {
+        'name': 'guacplayer_history_connection_start_id',
+        'columns': ('connection_id', 'start_date', 'history_id'),
+        'include': (),
+        'reason': 'Filtro por protocolo (conexões do protocolo) e histórico por conexão'
+    },
+    {
+        'name': 'guacplayer_history_active_connection',
+        'columns': ('connection_id',),
+        'include': (),
+        'where': 'end_date IS NULL',
+        'reason': 'Sessões ativas por conexão nas listagens; parcial, contém só as sessões em andamento'
+    }
+]
+
+
+def index_definition(index):
+    """
+    Monta o CREATE INDEX de uma recomendação
+    
+    Args:
+        index: Item de RECOMMENDED_INDEXES
+    
+    Returns:
+        str: Comando SQL (CONCURRENTLY, para não bloquear escritas)
+    """
+    columns = ', '.join('%s DESC' % column if column in ('start_date', 'history_id') else column
+                        for column in index['columns'])
+    definition = 'CREATE INDEX CONCURRENTLY IF NOT EXISTS %s ON %s (%s)' % (
+        index['name'], HISTORY_TABLE, columns
+    )
+    if index['include']:
+        definition += ' INCLUDE (%s)' % ', '.join(index['include'])
+    if index.get('where'):
+        definition += ' WHERE %s' % index['where']
+    return definition
+
+
+def _normalize_predicate(predicate):
+    """Predicado comparável (sem parênteses, espaços extras e caixa)"""
+    if not predicate:
+        return None
+    return ' '.join(predicate.replace('(', ' ').replace(')', ' ').lower().split())
+
+
+def encode_cursor(row):
+    """
+    Gera o cursor da página seguinte a partir da última linha
+    
+    Args:
+        row: Última HistorySearchRow da página
+    
+    Returns:
+        str: Cursor opaco (base64 url-safe)
+    """
+    payload = json.dumps([row.start_date.isoformat(), row.history_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Interpreta o cursor recebido em ?cursor=
+    
+    Args:
+        cursor: Valor gerado por encode_cursor
+    
+    Returns:
+        tuple: (start_date, history_id)
+    
+    Raises:
+        ValueError: Cursor inválido
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        start_date, history_id = json.loads(payload)
+        start_date, history_id = datetime.fromisoformat(start_date), int(history_id)
+    except (TypeError, ValueError, OverflowError, UnicodeDecodeError) as e:
+        raise ValueError("Cursor inválido") from e
+    
+    # history_id fora de bigint falharia no banco (500) em vez de 400
+    if not 0 <= history_id < 2 ** 63:
+        raise ValueError("Cursor inválido")
+    return start_date, history_id
+
+
+def parse_date(value, name):
+    """
+    Interpreta uma data ISO 8601 da query string
+    
+    Args:
+        value: Texto da data (ex.: 2025-01-31 ou 2025-01-31T12:00:00Z)
+        name: Nome do parâmetro (para a mensagem de erro)
+    
+    Returns:
+        datetime: Data ou None se ausente
+    
+    Raises:
+        ValueError: Data inválida
+    """
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError as e:
+        raise ValueError(f"{name} deve ser uma data ISO 8601") from e
+
+
+class HistoryService:
+    """Serviço de busca no histórico de sessões"""
+    
+    def __init__(self):
+        """Inicializa o serviço"""
+        self.db = GuacamoleQueries()
+    
+    def search(self, filters, cursor=None, per_page=20, fields=None, acl=None):
+        """
+        Busca sessões em todas as conexões
+        
+        Args:
+            filters: {username, start_from, start_to, remote_host, protocol} (valores None são ignorados)
+            cursor: Cursor da página anterior (opcional)
+            per_page: Quantidade de itens por página
+            fields: Campos de cada sessão (None = todos)
+            acl: ConnectionAcl do usuário (None = sem restrição)
+        
+        Returns:
+            dict: Sessões e cursor da próxima página (None na última)
+        """
+        try:
+            active = {name: value for name, value in filters.items() if value is not None}
+            if acl is not None and not acl.administer:
+                # Somente sessões de conexões legíveis, filtradas no banco
+                active['connection_ids'] = acl.readable_ids()
+            after = decode_cursor(cursor) if cursor else None
+            
+            # Uma linha a mais indica se existe próxima página
+            rows = self.db.search_history(active, after, per_page + 1)
+            page = rows[:per_page]
+            next_cursor = encode_cursor(page[-1]) if len(rows) > per_page else None
+            
+            logger.debug("Busca no histórico: %s registros, próxima página: %s", len(page), bool(next_cursor))
+            
+            return {
+                'success': True,
+                'data': [select(row, fields) for row in page],
+                'pagination': {
+                    'per_page': per_page,
+                    'next_cursor': next_cursor
+                }
+            }
+        
+        except Exception as e:
+            logger.error("Erro na busca do histórico: %s", e)
+            raise
+    
+    def index_recommendations(self):
+        """
+        Compara os índices de guacamole_connection_history com os recomendados
+        
+        Um índice existente atende a recomendação quando suas colunas-chave
+        começam pelas recomendadas, contém (na chave ou no INCLUDE) as
+        colunas de cobertura e tem o mesmo predicado (índices parciais só
+        atendem recomendações parciais).
+        
+        Returns:
+            dict: Recomendações com o índice que as atende ou o CREATE INDEX
+        """
+        existing = [index for index in self.db.get_table_indexes(HISTORY_TABLE) if index['valid']]
+        
+        recommendations = []
+        for recommended in RECOMMENDED_INDEXES:
+            key_count = len(recommended['columns'])
+            satisfied_by = next(
+                (
+                    index['name'] for index in existing
+                    if tuple(index['columns'][:key_count]) == recommended['columns'] and
+                    set(recommended['include']) <= set(index['columns'] + index['include']) and
+                    _normalize_predicate(index['predicate']) == _normalize_predicate(recommended.get('where'))
+                ),
+                None
+            )
+            recommendations.append({
+                'name': recommended['name'],
+                'columns': list(recommended['columns']),
+                'include': list(recommended['include']),
+                'where': recommended.get('where'),
+                'reason': recommended['reason'],
+                'satisfied_by': satisfied_by,
+                'definition': None if satisfied_by else index_definition(recommended)
+            })
+        
+        missing = sum(1 for item in recommendations if item['satisfied_by'] is None)
+        logger.info("Índices do histórico: %s de %s recomendações pendentes", missing, len(recommendations))
+        
+        return {
+            'table': HISTORY_TABLE,
+            'existing': existing,
+            'recommendations': recommendations,
+            'missing': missing
+        }
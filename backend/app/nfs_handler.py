@@ -7,34 +7,180 @@ Descrição: Gerencia leitura de arquivos de vídeo armazenados em NFS
 
 import os
 import json
+import threading
+import time
 from pathlib import Path
 from app.config import Config
 from app.utils.logger import setup_logger
+from app.utils.fields import wants
+from app.utils.request_context import timed
+from app.utils.nfs_guard import nfs_guarded, get_nfs_guard
 
 logger = setup_logger(__name__)
 
+# Extensões do arquivo de vídeo principal de uma gravação
+VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.webm', '.avi', '.mov')
+
+
+class NFSMountMonitor:
+    """
+    Validação do caminho NFS em segundo plano, com prazo
+    
+    Um ponto de montagem travado bloqueia exists()/mkdir() indefinidamente;
+    por isso a validação roda em uma thread própria e a aplicação sobe mesmo
+    assim, reportando prontidão degradada até o NFS responder. A validação
+    pertence ao PID que a iniciou (threads não sobrevivem ao fork).
+    """
+    
+    def __init__(self, path, timeout):
+        """
+        Inicializa o monitor
+        
+        Args:
+            path: Caminho do ponto de montagem
+            timeout: Prazo em segundos antes de reportar estado degradado
+        """
+        self.path = Path(path)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._pid = None
+        self._done = threading.Event()
+        self._started_at = None
+        self._finished_at = None
+        self._degraded_logged = False
+        self.ok = False
+        self.error = None
+    
+    def ensure_started(self):
+        """Inicia a validação neste processo, se ainda não iniciada"""
+        if self._pid == os.getpid():
+            return
+        
+        with self._lock:
+            if self._pid != os.getpid():
+                self._start()
+    
+    def _start(self):
+        """Dispara a thread de validação (chamado com o lock adquirido)"""
+        self._pid = os.getpid()
+        self._done = threading.Event()
+        self._started_at = time.monotonic()
+        self._finished_at = None
+        self._degraded_logged = False
+        self.ok = False
+        self.error = None
+        threading.Thread(target=self._validate, name='nfs-validate', daemon=True).start()
+    
+    def _validate(self):
+        """Valida se o caminho NFS está acessível"""
+        try:
+            if not self.path.exists():
+                logger.warning("Caminho NFS não existe: %s", self.path)
+                # Criar diretório se não existir (para desenvolvimento)
+                self.path.mkdir(parents=True, exist_ok=True)
+                logger.info("Diretório NFS criado: %s", self.path)
+            else:
+                logger.info("Caminho NFS validado: %s", self.path)
+            self.ok = True
+        except Exception as e:
+            self.error = str(e)
+            logger.error("Erro ao validar caminho NFS %s: %s", self.path, e)
+        finally:
+            self._finished_at = time.monotonic()
+            self._done.set()
+    
+    def wait(self, timeout=None):
+        """
+        Aguarda o fim da validação
+        
+        Args:
+            timeout: Tempo máximo em segundos
+        
+        Returns:
+            bool: True se o caminho foi validado
+        """
+        self.ensure_started()
+        self._done.wait(timeout)
+        return self.ok
+    
+    def status(self):
+        """
+        Estado da validação
+        
+        Returns:
+            str: 'ready', 'pending' (dentro do prazo), 'degraded' (prazo
+            excedido, NFS ainda sem resposta) ou 'error'
+        """
+        self.ensure_started()
+        
+        if self._done.is_set():
+            if self.ok:
+                return 'ready'
+            # Nova tentativa após uma falha, respeitando o prazo como intervalo
+            if time.monotonic() - self._finished_at >= self.timeout:
+                with self._lock:
+                    if self._done.is_set() and not self.ok:
+                        self._start()
+            return 'error'
+        
+        if time.monotonic() - self._started_at < self.timeout:
+            return 'pending'
+        
+        if not self._degraded_logged:
+            self._degraded_logged = True
+            logger.warning("NFS sem resposta após %ss: %s", self.timeout, self.path)
+        return 'degraded'
+    
+    def to_dict(self):
+        """
+        Estado da validação para o endpoint de prontidão
+        
+        Returns:
+            dict: Estado, caminho, tempo decorrido e erro (se houver)
+        """
+        status = self.status()
+        end = self._finished_at if self._done.is_set() else time.monotonic()
+        info = {
+            'status': status,
+            'path': str(self.path),
+            'elapsed_ms': round((end - self._started_at) * 1000, 2)
+        }
+        if self.error:
+            info['error'] = self.error
+        return info
+
+
+_monitors = {}
+_monitors_lock = threading.Lock()
+
+
+def get_mount_monitor(path=None):
+    """
+    Obtém o monitor (compartilhado) de um caminho NFS
+    
+    Args:
+        path: Caminho do ponto de montagem (padrão: Config.NFS_MOUNT_PATH)
+    
+    Returns:
+        NFSMountMonitor: Monitor do caminho
+    """
+    key = str(Path(path or Config.NFS_MOUNT_PATH))
+    with _monitors_lock:
+        if key not in _monitors:
+            _monitors[key] = NFSMountMonitor(key, Config.NFS_INIT_TIMEOUT)
+        return _monitors[key]
+
 
 class NFSHandler:
     """Gerenciador de acesso a arquivos NFS"""
     
     def __init__(self):
-        """Inicializa o gerenciador NFS"""
+        """Inicializa o gerenciador NFS (sem E/S: a validação é preguiçosa)"""
         self.recordings_path = Path(Config.NFS_MOUNT_PATH)
-        self._validate_path()
-    
-    def _validate_path(self):
-        """Valida se o caminho NFS está acessível"""
-        if not self.recordings_path.exists():
-            logger.warning(f"Caminho NFS não existe: {self.recordings_path}")
-            # Criar diretório se não existir (para desenvolvimento)
-            try:
-                self.recordings_path.mkdir(parents=True, exist_ok=True)
-                logger.info(f"Diretório NFS criado: {self.recordings_path}")
-            except Exception as e:
-                logger.error(f"Erro ao criar diretório NFS: {str(e)}")
-        else:
-            logger.info(f"Caminho NFS validado: {self.recordings_path}")
+        self.mount = get_mount_monitor(self.recordings_path)
     
+    @timed('nfs')
+    @nfs_guarded
     def get_recording_path(self, history_uuid):
         """
         Obtém o caminho completo de uma gravação
@@ -45,15 +191,18 @@ class NFSHandler:
         Returns:
             Path: Caminho da gravação ou None se não existir
         """
+        self.mount.ensure_started()
         recording_dir = self.recordings_path / history_uuid
         
         if not recording_dir.exists():
-            logger.warning(f"Diretório de gravação não encontrado: {recording_dir}")
+            logger.warning("Diretório de gravação não encontrado: %s", recording_dir)
             return None
         
-        logger.info(f"Caminho de gravação encontrado: {recording_dir}")
+        logger.debug("Caminho de gravação encontrado: %s", recording_dir)
         return recording_dir
     
+    @timed('nfs')
+    @nfs_guarded
     def get_recording_files(self, history_uuid):
         """
         Lista todos os arquivos de uma gravação
@@ -80,13 +229,15 @@ class NFSHandler:
                         'modified': file.stat().st_mtime
                     })
             
-            logger.info(f"Encontrados {len(files)} arquivos para gravação {history_uuid}")
+            logger.debug("Encontrados %s arquivos para gravação %s", len(files), history_uuid)
             return sorted(files, key=lambda x: x['modified'], reverse=True)
         
         except Exception as e:
-            logger.error(f"Erro ao listar arquivos de gravação {history_uuid}: {str(e)}")
+            logger.error("Erro ao listar arquivos de gravação %s: %s", history_uuid, e)
             return []
     
+    @timed('nfs')
+    @nfs_guarded
     def get_video_file(self, history_uuid):
         """
         Obtém o arquivo de vídeo principal de uma gravação
@@ -103,21 +254,21 @@ class NFSHandler:
             return None
         
         # Procurar por arquivos de vídeo (mp4, mkv, webm, etc)
-        video_extensions = ['.mp4', '.mkv', '.webm', '.avi', '.mov']
-        
         try:
             for file in recording_dir.iterdir():
-                if file.is_file() and file.suffix.lower() in video_extensions:
-                    logger.info(f"Arquivo de vídeo encontrado: {file}")
+                if file.is_file() and file.suffix.lower() in VIDEO_EXTENSIONS:
+                    logger.debug("Arquivo de vídeo encontrado: %s", file)
                     return file
             
-            logger.warning(f"Nenhum arquivo de vídeo encontrado em {recording_dir}")
+            logger.warning("Nenhum arquivo de vídeo encontrado em %s", recording_dir)
             return None
         
         except Exception as e:
-            logger.error(f"Erro ao procurar arquivo de vídeo em {recording_dir}: {str(e)}")
+            logger.error("Erro ao procurar arquivo de vídeo em %s: %s", recording_dir, e)
             return None
     
+    @timed('nfs')
+    @nfs_guarded
     def get_recording_metadata(self, history_uuid):
         """
         Obtém metadados de uma gravação (se existirem)
@@ -139,20 +290,24 @@ class NFSHandler:
             try:
                 with open(metadata_file, 'r', encoding='utf-8') as f:
                     metadata = json.load(f)
-                    logger.info(f"Metadados carregados para gravação {history_uuid}")
+                    logger.debug("Metadados carregados para gravação %s", history_uuid)
                     return metadata
             except Exception as e:
-                logger.error(f"Erro ao ler metadados de {history_uuid}: {str(e)}")
+                logger.error("Erro ao ler metadados de %s: %s", history_uuid, e)
                 return {}
         
         return {}
     
-    def get_recording_info(self, history_uuid):
+    @timed('nfs')
+    @nfs_guarded
+    def get_recording_info(self, history_uuid, fields=None):
         """
         Obtém informações completas de uma gravação
         
         Args:
             history_uuid: UUID da gravação
+            fields: Campos desejados (None = todos); os demais não são lidos
+                do NFS (listagem de arquivos, metadata.json, busca do vídeo)
         
         Returns:
             dict: Informações da gravação
@@ -160,32 +315,107 @@ class NFSHandler:
         recording_dir = self.get_recording_path(history_uuid)
         
         if not recording_dir:
-            logger.warning(f"Gravação não encontrada: {history_uuid}")
+            logger.warning("Gravação não encontrada: %s", history_uuid)
             return None
         
         try:
-            video_file = self.get_video_file(history_uuid)
-            metadata = self.get_recording_metadata(history_uuid)
-            files = self.get_recording_files(history_uuid)
-            
             info = {
                 'uuid': history_uuid,
                 'path': str(recording_dir),
-                'exists': True,
-                'video_file': str(video_file) if video_file else None,
-                'files': files,
-                'metadata': metadata,
-                'size_bytes': sum(f['size'] for f in files),
-                'created_at': recording_dir.stat().st_ctime
+                'exists': True
             }
             
-            logger.info(f"Informações de gravação {history_uuid} recuperadas")
+            if wants(fields, 'video_file'):
+                video_file = self.get_video_file(history_uuid)
+                info['video_file'] = str(video_file) if video_file else None
+            if wants(fields, 'metadata'):
+                info['metadata'] = self.get_recording_metadata(history_uuid)
+            if wants(fields, 'files', 'size_bytes'):
+                files = self.get_recording_files(history_uuid)
+                info['files'] = files
+                info['size_bytes'] = sum(f['size'] for f in files)
+            if wants(fields, 'created_at'):
+                info['created_at'] = recording_dir.stat().st_ctime
+            
+            logger.debug("Informações de gravação %s recuperadas", history_uuid)
             return info
         
         except Exception as e:
-            logger.error(f"Erro ao obter informações de gravação {history_uuid}: {str(e)}")
+            logger.error("Erro ao obter informações de gravação %s: %s", history_uuid, e)
             return None
     
+    @timed('nfs')
+    @nfs_guarded
+    def list_recording_keys(self):
+        """
+        Lista os diretórios de gravação com uma única leitura da raiz
+        
+        Returns:
+            list: Nomes dos diretórios (history_id das sessões gravadas)
+        """
+        self.mount.ensure_started()
+        with os.scandir(self.recordings_path) as entries:
+            keys = [entry.name for entry in entries if entry.is_dir()]
+        
+        logger.debug("Índice de gravações: %s diretórios", len(keys))
+        return keys
+    
+    @timed('nfs')
+    def get_recordings_summary(self, history_uuids):
+        """
+        Obtém o resumo de várias gravações, com as leituras distribuídas em
+        paralelo pelo pool NFS (um lote de UUIDs por thread)
+        
+        Args:
+            history_uuids: UUIDs das gravações
+        
+        Returns:
+            list: Resumos na ordem de history_uuids
+        """
+        self.mount.ensure_started()
+        workers = max(1, min(Config.NFS_WORKERS, len(history_uuids)))
+        chunks = [history_uuids[index::workers] for index in range(workers)]
+        
+        summaries = {}
+        for chunk in get_nfs_guard().map(self._summarize_recordings, chunks):
+            summaries.update(chunk)
+        return [summaries[history_uuid] for history_uuid in history_uuids]
+    
+    def _summarize_recordings(self, history_uuids):
+        """
+        Resume gravações com uma única listagem de diretório por gravação
+        (executado em uma thread do pool NFS)
+        
+        Args:
+            history_uuids: UUIDs das gravações
+        
+        Returns:
+            dict: {uuid: {uuid, exists, video_file, size_bytes}}
+        """
+        summaries = {}
+        for history_uuid in history_uuids:
+            summary = {'uuid': history_uuid, 'exists': False, 'video_file': None, 'size_bytes': None}
+            summaries[history_uuid] = summary
+            
+            try:
+                with os.scandir(self.recordings_path / history_uuid) as entries:
+                    files = [entry for entry in entries if entry.is_file()]
+                    summary['exists'] = True
+                    summary['size_bytes'] = sum(entry.stat().st_size for entry in files)
+                    video_file = next(
+                        (entry for entry in files if Path(entry.name).suffix.lower() in VIDEO_EXTENSIONS),
+                        None
+                    )
+                    summary['video_file'] = video_file.path if video_file else None
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            except OSError as e:
+                logger.error("Erro ao resumir gravação %s: %s", history_uuid, e)
+        
+        return summaries
+    
+    @timed('nfs')
+    @nfs_guarded
     def file_exists(self, file_path):
         """
         Verifica se um arquivo existe e está dentro do caminho permitido
@@ -202,18 +432,18 @@ class NFSHandler:
             
             # Verificar se o arquivo está dentro do diretório permitido
             if not str(full_path).startswith(str(base_path)):
-                logger.warning(f"Tentativa de acesso a arquivo fora do diretório permitido: {file_path}")
+                logger.warning("Tentativa de acesso a arquivo fora do diretório permitido: %s", file_path)
                 return False
             
             exists = full_path.exists() and full_path.is_file()
             
             if exists:
-                logger.info(f"Arquivo validado: {file_path}")
+                logger.debug("Arquivo validado: %s", file_path)
             else:
-                logger.warning(f"Arquivo não encontrado: {file_path}")
+                logger.warning("Arquivo não encontrado: %s", file_path)
             
             return exists
         
         except Exception as e:
-            logger.error(f"Erro ao validar arquivo {file_path}: {str(e)}")
+            logger.error("Erro ao validar arquivo %s: %s", file_path, e)
             return False
@@ -6,9 +6,14 @@ Descrição: Endpoints para gerenciamento de gravações
 """
 
 from flask import Blueprint, request, jsonify, send_file
-from app.recordings.services import RecordingService
-from app.utils.decorators import handle_errors, token_required
+from app.recordings.services import (
+    RecordingService, RECORDING_FIELDS, RECORDING_FILE_FIELDS, parse_recording_uuids
+)
+from app.auth.acl import get_user_acl
+from app.utils.fields import parse_fields
+from app.utils.decorators import handle_errors, token_required, validate_json
 from app.utils.logger import setup_logger
+from app.utils.nfs_guard import NFSUnavailableError
 
 logger = setup_logger(__name__)
 
@@ -19,6 +24,40 @@ recordings_bp = Blueprint('recordings', __name__)
 service = RecordingService()
 
 
+@recordings_bp.route('/bulk', methods=['POST'])
+@handle_errors
+@token_required
+@validate_json('uuids')
+def get_recordings_bulk(current_user, data):
+    """
+    Endpoint para consultar várias gravações em uma chamada
+    
+    Body:
+        uuids: Lista de UUIDs de gravação (até BULK_MAX_ITEMS)
+    
+    Returns:
+        dict: Para cada UUID, existência, arquivo de vídeo e tamanho total
+    """
+    # Entrada inválida: ValueError vira 400 em handle_errors
+    history_uuids = parse_recording_uuids(data['uuids'])
+    
+    try:
+        logger.debug("Consulta em massa de %s gravações", len(history_uuids))
+        
+        summaries = service.get_recordings_summary(history_uuids, get_user_acl(current_user))
+        
+        return jsonify({
+            'success': True,
+            'data': summaries
+        }), 200
+    
+    except NFSUnavailableError:
+        raise
+    except Exception as e:
+        logger.error("Erro ao consultar gravações em massa: %s", e)
+        return jsonify({'error': 'Erro ao consultar gravações'}), 500
+
+
 @recordings_bp.route('/<history_uuid>', methods=['GET'])
 @handle_errors
 @token_required
@@ -26,42 +65,43 @@ def get_recording_info(history_uuid, current_user):
     """
     Endpoint para obter informações de uma gravação
     
+    Query Parameters:
+        fields: Campos da resposta, separados por vírgula (opcional); os
+            demais não são lidos do NFS
+    
     Args:
         history_uuid: UUID da gravação
     
     Returns:
         dict: Informações da gravação
     """
+    # Campo desconhecido: ValueError vira 400 em handle_errors
+    fields = parse_fields(request.args.get('fields'), RECORDING_FIELDS)
+    
     try:
-        logger.info(f"Obtendo informações da gravação {history_uuid}")
+        logger.debug("Obtendo informações da gravação %s", history_uuid)
         
         # Validar acesso
-        if not service.validate_recording_access(history_uuid):
-            logger.warning(f"Acesso negado à gravação {history_uuid}")
+        if not service.validate_recording_access(history_uuid, get_user_acl(current_user)):
+            logger.warning("Acesso negado à gravação %s", history_uuid)
             return jsonify({'error': 'Gravação não encontrada'}), 404
         
         # Obter informações
-        info = service.get_recording_info(history_uuid)
+        info = service.get_recording_info(history_uuid, fields)
         
         if not info:
-            logger.warning(f"Gravação {history_uuid} não encontrada")
+            logger.warning("Gravação %s não encontrada", history_uuid)
             return jsonify({'error': 'Gravação não encontrada'}), 404
         
         return jsonify({
             'success': True,
-            'data': {
-                'uuid': info['uuid'],
-                'path': info['path'],
-                'video_file': info['video_file'],
-                'files': info['files'],
-                'size_bytes': info['size_bytes'],
-                'created_at': info['created_at'],
-                'metadata': info['metadata']
-            }
+            'data': info
         }), 200
     
+    except NFSUnavailableError:
+        raise
     except Exception as e:
-        logger.error(f"Erro ao obter informações da gravação {history_uuid}: {str(e)}")
+        logger.error("Erro ao obter informações da gravação %s: %s", history_uuid, e)
         return jsonify({'error': 'Erro ao obter informações da gravação'}), 500
 
 
@@ -82,22 +122,22 @@ def stream_recording(history_uuid, current_user):
         file: Arquivo de vídeo
     """
     try:
-        logger.info(f"Iniciando stream da gravação {history_uuid}")
+        logger.debug("Iniciando stream da gravação %s", history_uuid)
         
         # Validar acesso
-        if not service.validate_recording_access(history_uuid):
-            logger.warning(f"Acesso negado ao stream da gravação {history_uuid}")
+        if not service.validate_recording_access(history_uuid, get_user_acl(current_user)):
+            logger.warning("Acesso negado ao stream da gravação %s", history_uuid)
             return jsonify({'error': 'Gravação não encontrada'}), 404
         
         # Obter arquivo de vídeo
         video_file = service.get_recording_video(history_uuid)
         
         if not video_file:
-            logger.warning(f"Arquivo de vídeo não encontrado para gravação {history_uuid}")
+            logger.warning("Arquivo de vídeo não encontrado para gravação %s", history_uuid)
             return jsonify({'error': 'Arquivo de vídeo não encontrado'}), 404
         
         # Enviar arquivo
-        logger.info(f"Enviando arquivo de vídeo: {video_file}")
+        logger.debug("Enviando arquivo de vídeo: %s", video_file)
         
         return send_file(
             str(video_file),
@@ -105,8 +145,10 @@ def stream_recording(history_uuid, current_user):
             as_attachment=False
         ), 200
     
+    except NFSUnavailableError:
+        raise
     except Exception as e:
-        logger.error(f"Erro ao fazer stream da gravação {history_uuid}: {str(e)}")
+        logger.error("Erro ao fazer stream da gravação %s: %s", history_uuid, e)
         return jsonify({'error': 'Erro ao fazer stream da gravação'}), 500
 
 
@@ -124,22 +166,22 @@ def download_recording(history_uuid, current_user):
         file: Arquivo para download
     """
     try:
-        logger.info(f"Iniciando download da gravação {history_uuid}")
+        logger.debug("Iniciando download da gravação %s", history_uuid)
         
         # Validar acesso
-        if not service.validate_recording_access(history_uuid):
-            logger.warning(f"Acesso negado ao download da gravação {history_uuid}")
+        if not service.validate_recording_access(history_uuid, get_user_acl(current_user)):
+            logger.warning("Acesso negado ao download da gravação %s", history_uuid)
             return jsonify({'error': 'Gravação não encontrada'}), 404
         
         # Obter arquivo de vídeo
         video_file = service.get_recording_video(history_uuid)
         
         if not video_file:
-            logger.warning(f"Arquivo de vídeo não encontrado para gravação {history_uuid}")
+            logger.warning("Arquivo de vídeo não encontrado para gravação %s", history_uuid)
             return jsonify({'error': 'Arquivo de vídeo não encontrado'}), 404
         
         # Enviar arquivo para download
-        logger.info(f"Enviando arquivo para download: {video_file}")
+        logger.debug("Enviando arquivo para download: %s", video_file)
         
         return send_file(
             str(video_file),
@@ -148,8 +190,10 @@ def download_recording(history_uuid, current_user):
             download_name=f'{history_uuid}.mp4'
         ), 200
     
+    except NFSUnavailableError:
+        raise
     except Exception as e:
-        logger.error(f"Erro ao baixar gravação {history_uuid}: {str(e)}")
+        logger.error("Erro ao baixar gravação %s: %s", history_uuid, e)
         return jsonify({'error': 'Erro ao baixar gravação'}), 500
 
 
@@ -160,22 +204,27 @@ def list_recording_files(history_uuid, current_user):
     """
     Endpoint para listar arquivos de uma gravação
     
+    Query Parameters:
+        fields: Campos de cada arquivo, separados por vírgula (opcional)
+    
     Args:
         history_uuid: UUID da gravação
     
     Returns:
         dict: Lista de arquivos
     """
+    fields = parse_fields(request.args.get('fields'), RECORDING_FILE_FIELDS)
+    
     try:
-        logger.info(f"Listando arquivos da gravação {history_uuid}")
+        logger.debug("Listando arquivos da gravação %s", history_uuid)
         
         # Validar acesso
-        if not service.validate_recording_access(history_uuid):
-            logger.warning(f"Acesso negado aos arquivos da gravação {history_uuid}")
+        if not service.validate_recording_access(history_uuid, get_user_acl(current_user)):
+            logger.warning("Acesso negado aos arquivos da gravação %s", history_uuid)
             return jsonify({'error': 'Gravação não encontrada'}), 404
         
         # Listar arquivos
-        files = service.get_recording_files(history_uuid)
+        files = service.get_recording_files(history_uuid, fields)
         
         return jsonify({
             'success': True,
@@ -183,6 +232,8 @@ def list_recording_files(history_uuid, current_user):
             'files': files
         }), 200
     
+    except NFSUnavailableError:
+        raise
     except Exception as e:
-        logger.error(f"Erro ao listar arquivos da gravação {history_uuid}: {str(e)}")
+        logger.error("Erro ao listar arquivos da gravação %s: %s", history_uuid, e)
         return jsonify({'error': 'Erro ao listar arquivos'}), 500
@@ -5,12 +5,123 @@ Data: 2025
 Descrição: Lógica de negócio para operações com gravações
 """
 
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from app.config import Config
 from app.nfs_handler import NFSHandler
 from app.database import GuacamoleQueries
+from app.utils.fields import select
 from app.utils.logger import setup_logger
+from app.utils.nfs_guard import NFSUnavailableError
 
 logger = setup_logger(__name__)
 
+# Campos aceitos em ?fields= (informações da gravação e itens de arquivo)
+RECORDING_FIELDS = ('uuid', 'path', 'video_file', 'files', 'size_bytes', 'created_at', 'metadata')
+RECORDING_FILE_FIELDS = ('name', 'path', 'size', 'modified')
+
+# Sessões com a conexão já conhecida (o vínculo history_id -> conexão não muda)
+HISTORY_CONNECTION_CACHE_SIZE = 10000
+
+
+def parse_recording_uuids(values):
+    """
+    Valida os UUIDs de uma consulta em massa
+    
+    Args:
+        values: Lista recebida no corpo da requisição
+    
+    Returns:
+        list: UUIDs sem repetição, na ordem recebida
+    
+    Raises:
+        ValueError: Lista vazia, grande demais ou com nome inválido
+    """
+    if not isinstance(values, list) or not values:
+        raise ValueError("'uuids' deve ser uma lista não vazia")
+    if len(values) > Config.BULK_MAX_ITEMS:
+        raise ValueError(f"Máximo de {Config.BULK_MAX_ITEMS} UUIDs por consulta")
+    
+    for value in values:
+        # Mesmo formato aceito na URL: um único componente de caminho
+        if (not isinstance(value, str) or not value or value in ('.', '..') or
+                '/' in value or '\\' in value or '\0' in value):
+            raise ValueError(f"UUID inválido: {value!r}")
+    
+    return list(dict.fromkeys(values))
+
+
+class RecordingIndex:
+    """
+    Índice local das sessões gravadas (diretórios da raiz NFS)
+    
+    Recarregado com uma única listagem da raiz a cada RECORDING_INDEX_TTL
+    segundos; enquanto uma thread recarrega, as demais usam o índice anterior.
+    """
+    
+    def __init__(self, nfs, ttl):
+        """
+        Inicializa o índice (carregado sob demanda)
+        
+        Args:
+            nfs: NFSHandler
+            ttl: Validade do índice em segundos
+        """
+        self.nfs = nfs
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._history_ids = None
+        self._expires = 0.0
+    
+    def history_ids(self):
+        """
+        Obtém os history_id que possuem diretório de gravação
+        
+        Returns:
+            frozenset: IDs das sessões gravadas
+        """
+        if self._history_ids is not None and time.monotonic() < self._expires:
+            return self._history_ids
+        
+        # Sem índice anterior é preciso esperar pela carga
+        if not self._lock.acquire(blocking=self._history_ids is None):
+            return self._history_ids
+        try:
+            if self._history_ids is None or time.monotonic() >= self._expires:
+                try:
+                    keys = self.nfs.list_recording_keys()
+                except NFSUnavailableError as e:
+                    if self._history_ids is None:
+                        raise
+                    logger.warning("Índice de gravações não atualizado, usando o anterior: %s", e)
+                    return self._history_ids
+                self._history_ids = frozenset(int(key) for key in keys if key.isdigit())
+                self._expires = time.monotonic() + self.ttl
+            return self._history_ids
+        finally:
+            self._lock.release()
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_recording_index():
+    """
+    Obtém o índice de gravações do processo
+    
+    Returns:
+        RecordingIndex: Índice compartilhado
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = RecordingIndex(NFSHandler(), Config.RECORDING_INDEX_TTL)
+    return _index
+
 
 class RecordingService:
     """Serviço para gerenciar operações com gravações"""
@@ -19,29 +130,81 @@ class RecordingService:
         """Inicializa o serviço"""
         self.nfs = NFSHandler()
         self.db = GuacamoleQueries()
+        self.index = get_recording_index()
+        self._connections_lock = threading.Lock()
+        self._connections = OrderedDict()
     
-    def get_recording_info(self, history_uuid):
+    def _history_connections(self, history_ids):
+        """
+        Obtém a conexão de cada sessão, consultando o banco só para as que
+        não estão em cache
+        
+        Args:
+            history_ids: IDs das sessões
+        
+        Returns:
+            dict: {history_id: connection_id} das sessões existentes
+        """
+        with self._connections_lock:
+            known = {i: self._connections[i] for i in history_ids if i in self._connections}
+        
+        unknown = [i for i in history_ids if i not in known]
+        if unknown:
+            loaded = self.db.get_history_connections(unknown)
+            with self._connections_lock:
+                self._connections.update(loaded)
+                while len(self._connections) > HISTORY_CONNECTION_CACHE_SIZE:
+                    self._connections.popitem(last=False)
+            known.update(loaded)
+        return known
+    
+    def readable_recordings(self, history_uuids, acl):
+        """
+        Filtra as gravações cuja sessão pertence a uma conexão legível
+        
+        Gravações são nomeadas pelo history_id; nomes não numéricos não têm
+        sessão associada e só são visíveis sem restrição (ADMINISTER).
+        
+        Args:
+            history_uuids: UUIDs das gravações
+            acl: ConnectionAcl do usuário (None = sem restrição)
+        
+        Returns:
+            set: UUIDs acessíveis
+        """
+        if acl is None or acl.administer:
+            return set(history_uuids)
+        
+        history_ids = {uuid: int(uuid) for uuid in history_uuids if uuid.isdigit()}
+        connections = self._history_connections(list(set(history_ids.values()))) if history_ids else {}
+        return {
+            uuid for uuid, history_id in history_ids.items()
+            if acl.allows(connections.get(history_id))
+        }
+    
+    def get_recording_info(self, history_uuid, fields=None):
         """
         Obtém informações de uma gravação
         
         Args:
             history_uuid: UUID da gravação
+            fields: Campos da resposta (None = todos)
         
         Returns:
-            dict: Informações da gravação
+            dict: Informações da gravação, com os campos na ordem de fields
         """
         try:
-            info = self.nfs.get_recording_info(history_uuid)
+            info = self.nfs.get_recording_info(history_uuid, fields)
             
             if not info:
-                logger.warning(f"Gravação {history_uuid} não encontrada")
+                logger.warning("Gravação %s não encontrada", history_uuid)
                 return None
             
-            logger.info(f"Informações da gravação {history_uuid} recuperadas")
-            return info
+            logger.debug("Informações da gravação %s recuperadas", history_uuid)
+            return {name: info[name] for name in fields or RECORDING_FIELDS}
         
         except Exception as e:
-            logger.error(f"Erro ao obter informações da gravação {history_uuid}: {str(e)}")
+            logger.error("Erro ao obter informações da gravação %s: %s", history_uuid, e)
             raise
     
     def get_recording_video(self, history_uuid):
@@ -58,22 +221,23 @@ class RecordingService:
             video_file = self.nfs.get_video_file(history_uuid)
             
             if not video_file:
-                logger.warning(f"Arquivo de vídeo não encontrado para gravação {history_uuid}")
+                logger.warning("Arquivo de vídeo não encontrado para gravação %s", history_uuid)
                 return None
             
-            logger.info(f"Arquivo de vídeo encontrado para gravação {history_uuid}")
+            logger.debug("Arquivo de vídeo encontrado para gravação %s", history_uuid)
             return video_file
         
         except Exception as e:
-            logger.error(f"Erro ao obter vídeo da gravação {history_uuid}: {str(e)}")
+            logger.error("Erro ao obter vídeo da gravação %s: %s", history_uuid, e)
             raise
     
-    def get_recording_files(self, history_uuid):
+    def get_recording_files(self, history_uuid, fields=None):
         """
         Lista todos os arquivos de uma gravação
         
         Args:
             history_uuid: UUID da gravação
+            fields: Campos de cada arquivo (None = todos)
         
         Returns:
             list: Lista de arquivos
@@ -81,33 +245,114 @@ class RecordingService:
         try:
             files = self.nfs.get_recording_files(history_uuid)
             
-            logger.info(f"Arquivos da gravação {history_uuid} listados: {len(files)} arquivos")
-            return files
+            logger.debug("Arquivos da gravação %s listados: %s arquivos", history_uuid, len(files))
+            return [select(file, fields) for file in files]
         
         except Exception as e:
-            logger.error(f"Erro ao listar arquivos da gravação {history_uuid}: {str(e)}")
+            logger.error("Erro ao listar arquivos da gravação %s: %s", history_uuid, e)
             raise
     
-    def validate_recording_access(self, history_uuid):
+    def get_recordings_summary(self, history_uuids, acl=None):
+        """
+        Obtém existência, vídeo e tamanho de várias gravações
+        
+        Args:
+            history_uuids: UUIDs validados por parse_recording_uuids
+            acl: ConnectionAcl do usuário (None = sem restrição)
+        
+        Returns:
+            list: Resumos na ordem pedida (não acessíveis como inexistentes)
+        """
+        try:
+            readable = self.readable_recordings(history_uuids, acl)
+            requested = [uuid for uuid in history_uuids if uuid in readable]
+            found = {
+                summary['uuid']: summary
+                for summary in (self.nfs.get_recordings_summary(requested) if requested else [])
+            }
+            summaries = [
+                found.get(uuid) or {'uuid': uuid, 'exists': False, 'video_file': None, 'size_bytes': None}
+                for uuid in history_uuids
+            ]
+            
+            logger.debug("Resumo de %s gravações recuperado", len(summaries))
+            return summaries
+        
+        except Exception as e:
+            logger.error("Erro ao resumir gravações em massa: %s", e)
+            raise
+    
+    def recorded_history_ids(self):
+        """
+        Obtém os history_id com gravação (índice local, sem E/S por sessão)
+        
+        Returns:
+            frozenset: IDs das sessões gravadas
+        """
+        return self.index.history_ids()
+    
+    def annotate_history(self, history):
+        """
+        Preenche HistoryRow.recording com presença, tamanho e tipo do vídeo,
+        consultando o NFS em lote apenas para as sessões do índice
+        
+        Args:
+            history: Lista de HistoryRow (alterada no lugar)
+        
+        Returns:
+            list: A mesma lista
+        """
+        recorded = self.index.history_ids()
+        keys = [str(session.history_id) for session in history if session.history_id in recorded]
+        summaries = {
+            summary['uuid']: summary
+            for summary in (self.nfs.get_recordings_summary(keys) if keys else [])
+            if summary['exists']
+        }
+        
+        for session in history:
+            summary = summaries.get(str(session.history_id))
+            if summary is None:
+                session.recording = None
+                continue
+            video_file = summary['video_file']
+            session.recording = {
+                'uuid': summary['uuid'],
+                'size_bytes': summary['size_bytes'],
+                'video_type': Path(video_file).suffix.lstrip('.').lower() if video_file else None
+            }
+        
+        logger.debug("Histórico anotado: %s de %s sessões com gravação", len(summaries), len(history))
+        return history
+    
+    def validate_recording_access(self, history_uuid, acl=None):
         """
         Valida se uma gravação existe e é acessível
         
         Args:
             history_uuid: UUID da gravação
+            acl: ConnectionAcl do usuário (None = sem restrição)
         
         Returns:
             bool: True se gravação é acessível
         """
         try:
+            # Permissão antes do NFS: sessão de conexão não legível não gera E/S
+            if history_uuid not in self.readable_recordings([history_uuid], acl):
+                logger.warning("Gravação %s não legível pelo usuário", history_uuid)
+                return False
+            
             recording_path = self.nfs.get_recording_path(history_uuid)
             
             if not recording_path:
-                logger.warning(f"Gravação {history_uuid} não é acessível")
+                logger.warning("Gravação %s não é acessível", history_uuid)
                 return False
             
-            logger.info(f"Gravação {history_uuid} validada com sucesso")
+            logger.debug("Gravação %s validada com sucesso", history_uuid)
             return True
         
+        except NFSUnavailableError:
+            raise
         except Exception as e:
-            logger.error(f"Erro ao validar gravação {history_uuid}: {str(e)}")
+            logger.error("Erro ao validar gravação %s: %s", history_uuid, e)
             return False
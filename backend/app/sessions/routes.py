@@ -0,0 +1,68 @@
+"""
+Rotas de sessões
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Feed SSE (Server-Sent Events) de início e fim de sessões
+"""
+
+from flask import Blueprint, Response, current_app, jsonify, stream_with_context
+from app.auth.acl import get_user_acl
+from app.config import Config
+from app.sessions.services import get_session_broker
+from app.utils.decorators import handle_errors, stream_token_required
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Criar blueprint de sessões
+sessions_bp = Blueprint('sessions', __name__)
+
+
+@sessions_bp.route('/events', methods=['GET'])
+@handle_errors
+@stream_token_required
+def session_events(current_user):
+    """
+    Endpoint SSE com os eventos de sessão
+    
+    Envia um evento "snapshot" com as sessões ativas e, em seguida,
+    "session_start" e "session_end" conforme as sessões mudam, somente das
+    conexões legíveis pelo usuário. O token pode vir na query string
+    (?token=), pois EventSource não envia headers.
+    
+    Returns:
+        Response: Stream text/event-stream
+    """
+    try:
+        broker = get_session_broker(current_app.json.dumps_bytes)
+        subscription, snapshot = broker.subscribe(get_user_acl(current_user))
+        
+        if subscription is None:
+            return jsonify({'error': 'Limite de conexões do feed atingido'}), 503, {
+                'Retry-After': str(int(Config.SESSION_EVENTS_HEARTBEAT))
+            }
+    
+    except Exception as e:
+        logger.error("Erro ao iniciar feed de sessões: %s", e)
+        return jsonify({'error': 'Erro ao iniciar feed de sessões'}), 500
+    
+    logger.debug("Feed de sessões iniciado para o usuário %s", current_user)
+    
+    def stream():
+        try:
+            yield b'retry: %d\n\n' % Config.SESSION_EVENTS_RETRY_MS
+            yield snapshot
+            while True:
+                frame = subscription.next_frame(Config.SESSION_EVENTS_HEARTBEAT)
+                if frame is None:
+                    break
+                # Comentário periódico mantém a conexão viva em proxies
+                yield frame or b': keep-alive\n\n'
+        finally:
+            broker.unsubscribe(subscription)
+    
+    return Response(
+        stream_with_context(stream()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
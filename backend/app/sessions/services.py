@@ -0,0 +1,269 @@
+"""
+Serviços de sessões ativas
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Broker de eventos de sessão (início e fim) para o feed SSE. Uma
+única thread por processo consulta o histórico do Guacamole a cada intervalo
+e distribui os eventos já serializados para todos os assinantes, de modo que
+N navegadores custam uma consulta por intervalo. Assinantes do Flask ocupam
+uma thread do worker; os do modo ASGI aguardam no loop de eventos.
+"""
+
+import asyncio
+import queue
+import threading
+from app.config import Config
+from app.database import GuacamoleQueries
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class Subscription:
+    """Fila de eventos SSE de um assinante"""
+    
+    def __init__(self, size, acl=None, loop=None):
+        """
+        Inicializa a assinatura
+        
+        Args:
+            size: Capacidade da fila (assinante lento é desconectado)
+            acl: ConnectionAcl do assinante (None = todas as conexões)
+            loop: Loop asyncio do assinante (None = assinante em thread)
+        """
+        self.queue = queue.Queue(maxsize=size)
+        self.closed = False
+        self.acl = acl
+        self.loop = loop
+        self._ready = asyncio.Event() if loop is not None else None
+    
+    def allows(self, connection_id):
+        """True se o assinante pode ver sessões da conexão"""
+        return self.acl is None or self.acl.allows(connection_id)
+    
+    @property
+    def threaded(self):
+        """True se o assinante ocupa uma thread enquanto conectado"""
+        return self.loop is None
+    
+    def notify(self):
+        """Acorda o assinante assíncrono (chamado pela thread do broker)"""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._ready.set)
+    
+    def next_frame(self, timeout):
+        """
+        Aguarda o próximo evento
+        
+        Args:
+            timeout: Espera máxima em segundos
+        
+        Returns:
+            bytes: Evento SSE; b'' se nada chegou no prazo; None se encerrada
+        """
+        if self.closed:
+            return None
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return b''
+    
+    async def next_frame_async(self, timeout):
+        """
+        Aguarda o próximo evento sem ocupar uma thread (assinante com loop)
+        
+        Args:
+            timeout: Espera máxima em segundos
+        
+        Returns:
+            bytes: Evento SSE; b'' se nada chegou no prazo; None se encerrada
+        """
+        while True:
+            if self.closed:
+                return None
+            try:
+                return self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            
+            # Limpa antes de conferir a fila de novo: um put posterior sempre
+            # agenda um novo set() e não se perde
+            self._ready.clear()
+            if not self.queue.empty() or self.closed:
+                continue
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return b''
+
+
+class SessionEventBroker:
+    """Consulta as sessões do Guacamole e distribui eventos aos assinantes"""
+    
+    def __init__(self, encoder, queries=None):
+        """
+        Inicializa o broker
+        
+        Args:
+            encoder: Função obj -> bytes JSON (provedor JSON da aplicação)
+            queries: GuacamoleQueries (padrão: nova instância)
+        """
+        self.encoder = encoder
+        self.queries = queries or GuacamoleQueries()
+        self._lock = threading.Lock()
+        self._prime_lock = threading.Lock()
+        self._subscribers = set()
+        self._thread = None
+        self._wakeup = threading.Event()
+        self._active = {}
+        self._last_id = None
+        self._sequence = 0
+    
+    def _frame(self, event, data):
+        """Serializa um evento SSE (chamado com o lock adquirido)"""
+        self._sequence += 1
+        return b'id: %d\nevent: %s\ndata: %s\n\n' % (self._sequence, event.encode('ascii'), self.encoder(data))
+    
+    def _prime(self):
+        """Carrega as sessões ativas quando o broker (re)inicia"""
+        with self._prime_lock:
+            if self._last_id is not None:
+                return
+            sessions, last_id = self.queries.get_active_sessions()
+            with self._lock:
+                self._active = {session.history_id: session for session in sessions}
+                self._last_id = last_id
+    
+    def subscribe(self, acl=None, loop=None):
+        """
+        Cria uma assinatura e garante que a consulta periódica esteja rodando
+        
+        Assinantes em thread (Flask) têm o limite adicional
+        SESSION_EVENTS_MAX_THREAD_SUBSCRIBERS, abaixo das threads do worker,
+        para que o feed não esgote as threads das demais rotas. O snapshot e
+        os eventos seguintes só incluem sessões de conexões legíveis pelo
+        assinante (permissões lidas na assinatura).
+        
+        Args:
+            acl: ConnectionAcl do assinante (None = todas as conexões)
+            loop: Loop asyncio do assinante (None = assinante em thread)
+        
+        Returns:
+            tuple: (Subscription, evento SSE "snapshot" com as sessões ativas),
+            ou (None, None) se o limite de assinantes foi atingido
+        """
+        with self._lock:
+            threaded = sum(1 for subscription in self._subscribers if subscription.threaded)
+            if (len(self._subscribers) >= Config.SESSION_EVENTS_MAX_SUBSCRIBERS or
+                    (loop is None and threaded >= Config.SESSION_EVENTS_MAX_THREAD_SUBSCRIBERS)):
+                logger.warning("Limite de assinantes do feed de sessões atingido")
+                return None, None
+        
+        self._prime()
+        
+        subscription = Subscription(Config.SESSION_EVENTS_QUEUE_SIZE, acl, loop)
+        with self._lock:
+            self._subscribers.add(subscription)
+            snapshot = self._frame('snapshot', {'sessions': [
+                session for session in self._active.values() if subscription.allows(session.connection_id)
+            ]})
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='session-events', daemon=True)
+                self._thread.start()
+        
+        logger.debug("Assinante do feed de sessões conectado (%s no total)", len(self._subscribers))
+        return subscription, snapshot
+    
+    def unsubscribe(self, subscription):
+        """Remove a assinatura (a consulta para quando não há assinantes)"""
+        with self._lock:
+            self._subscribers.discard(subscription)
+            if not self._subscribers:
+                self._wakeup.set()
+        logger.debug("Assinante do feed de sessões desconectado")
+    
+    def _run(self):
+        """Consulta as alterações a cada intervalo enquanto houver assinantes"""
+        while True:
+            self._wakeup.wait(Config.SESSION_EVENTS_POLL_INTERVAL)
+            self._wakeup.clear()
+            
+            with self._lock:
+                if not self._subscribers:
+                    # Sem assinantes o estado fica obsoleto: recarregar no próximo
+                    self._thread = None
+                    self._last_id = None
+                    return
+            
+            try:
+                self._poll()
+            except Exception as e:
+                logger.error("Erro ao consultar sessões para o feed: %s", e)
+    
+    def _poll(self):
+        """Consulta o histórico e publica início e fim de sessões"""
+        with self._lock:
+            last_id, active_ids = self._last_id, list(self._active)
+        
+        if last_id is None:
+            # Reiniciado logo após ficar sem assinantes
+            self._prime()
+            return
+        
+        rows = self.queries.get_session_changes(last_id, active_ids)
+        
+        # (connection_id, evento serializado uma vez para todos os assinantes)
+        frames = []
+        with self._lock:
+            for session in rows:
+                if session.history_id > self._last_id:
+                    self._last_id = session.history_id
+                    frames.append((session.connection_id, self._frame('session_start', session)))
+                    if session.end_date is None:
+                        self._active[session.history_id] = session
+                    else:
+                        # Iniciada e encerrada entre duas consultas
+                        frames.append((session.connection_id, self._frame('session_end', session)))
+                elif session.end_date is not None and session.history_id in self._active:
+                    del self._active[session.history_id]
+                    frames.append((session.connection_id, self._frame('session_end', session)))
+            
+            subscribers = list(self._subscribers)
+        
+        if not frames:
+            return
+        
+        for subscription in subscribers:
+            for connection_id, frame in frames:
+                if not subscription.allows(connection_id):
+                    continue
+                try:
+                    subscription.queue.put_nowait(frame)
+                except queue.Full:
+                    # Assinante lento: encerra para que o navegador reconecte
+                    logger.warning("Assinante do feed de sessões atrasado; desconectando")
+                    subscription.closed = True
+                    break
+            subscription.notify()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_session_broker(encoder):
+    """
+    Obtém o broker de eventos de sessão do processo
+    
+    Args:
+        encoder: Função obj -> bytes JSON usada na primeira criação
+    
+    Returns:
+        SessionEventBroker: Broker compartilhado
+    """
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = SessionEventBroker(encoder)
+    return _broker
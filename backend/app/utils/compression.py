@@ -0,0 +1,168 @@
+"""
+Compressão e validação condicional de respostas JSON
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Adiciona ETag fraco (hash do corpo) às respostas JSON de /api/*,
+responde 304 quando o If-None-Match confere e comprime com brotli ou gzip os
+corpos acima do tamanho mínimo configurado
+"""
+
+import gzip
+import hashlib
+import time
+from flask import request
+from werkzeug.http import parse_accept_header, parse_etags, quote_etag
+from app.config import Config
+from app.utils.logger import setup_logger
+from app.utils.request_context import add_timing
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:  # brotli é opcional; sem ele, apenas gzip
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+logger = setup_logger(__name__)
+
+# Métodos e status cujas respostas recebem ETag e compressão
+CONDITIONAL_METHODS = {'GET', 'HEAD'}
+
+
+def is_eligible(method, path, status):
+    """
+    Verifica se a resposta JSON deve receber ETag e compressão
+    
+    Args:
+        method: Método HTTP da requisição
+        path: Caminho da requisição
+        status: Status da resposta
+    
+    Returns:
+        bool: True para respostas 200 de GET/HEAD em /api/*
+    """
+    return (
+        Config.RESPONSE_COMPRESSION_ENABLED and
+        status == 200 and
+        method in CONDITIONAL_METHODS and
+        path.startswith('/api/')
+    )
+
+
+def body_digest(body):
+    """
+    Calcula o valor do ETag fraco de um corpo (o mesmo para todas as
+    codificações)
+    
+    Args:
+        body: Corpo JSON não comprimido (bytes)
+    
+    Returns:
+        str: Hash hexadecimal do corpo
+    """
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Escolhe a codificação pelo header Accept-Encoding (brotli tem preferência)
+    
+    Args:
+        accept_encoding: Valor do header Accept-Encoding, se houver
+    
+    Returns:
+        str: 'br', 'gzip' ou None
+    """
+    if not accept_encoding:
+        return None
+    
+    offered = ['br', 'gzip'] if BROTLI_AVAILABLE else ['gzip']
+    return parse_accept_header(accept_encoding).best_match(offered)
+
+
+def compress(body, encoding):
+    """
+    Comprime o corpo na codificação informada
+    
+    Args:
+        body: Corpo (bytes)
+        encoding: 'br' ou 'gzip'
+    
+    Returns:
+        bytes: Corpo comprimido
+    """
+    if encoding == 'br':
+        return brotli.compress(body, quality=Config.BROTLI_QUALITY)
+    # mtime fixo: o mesmo corpo gera sempre os mesmos bytes
+    return gzip.compress(body, compresslevel=Config.GZIP_LEVEL, mtime=0)
+
+
+def conditional_json(body, if_none_match=None, accept_encoding=None):
+    """
+    Aplica ETag, 304 e compressão a um corpo JSON elegível
+    
+    Args:
+        body: Corpo JSON não comprimido (bytes)
+        if_none_match: Header If-None-Match da requisição
+        accept_encoding: Header Accept-Encoding da requisição
+    
+    Returns:
+        tuple: (status, corpo, headers adicionais); status 304 com corpo vazio
+        quando o cliente já tem a versão atual
+    """
+    digest = body_digest(body)
+    headers = [('ETag', quote_etag(digest, weak=True)), ('Cache-Control', 'private, no-cache')]
+    
+    if if_none_match and parse_etags(if_none_match).contains_weak(digest):
+        return 304, b'', headers
+    
+    if len(body) < Config.COMPRESSION_MIN_SIZE:
+        return 200, body, headers
+    
+    encoding = negotiate_encoding(accept_encoding)
+    headers.append(('Vary', 'Accept-Encoding'))
+    if encoding is None:
+        return 200, body, headers
+    
+    start = time.perf_counter()
+    compressed = compress(body, encoding)
+    add_timing('cmp', time.perf_counter() - start)
+    
+    headers.append(('Content-Encoding', encoding))
+    return 200, compressed, headers
+
+
+def init_compression(app):
+    """
+    Registra o hook que aplica ETag, 304 e compressão às respostas JSON.
+    Deve ser chamado após init_request_context para que as métricas
+    registrem o status e o tamanho finais.
+    
+    Args:
+        app: Aplicação Flask
+    """
+    if not BROTLI_AVAILABLE:
+        logger.info("brotli não instalado; respostas serão comprimidas apenas com gzip")
+    
+    @app.after_request
+    def compress_json_response(response):
+        if (not is_eligible(request.method, request.path, response.status_code) or
+                response.mimetype != 'application/json' or
+                response.direct_passthrough or
+                'Content-Encoding' in response.headers):
+            return response
+        
+        status, body, headers = conditional_json(
+            response.get_data(),
+            request.headers.get('If-None-Match'),
+            request.headers.get('Accept-Encoding')
+        )
+        
+        response.status_code = status
+        response.set_data(body)
+        for name, value in headers:
+            if name == 'Vary':
+                response.vary.add(value)
+            else:
+                response.headers[name] = value
+        return response
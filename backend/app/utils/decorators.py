@@ -5,14 +5,79 @@ Data: 2025
 Descrição: Decoradores para autenticação, validação e tratamento de erros
 """
 
+import hmac
+from contextvars import ContextVar
 from functools import wraps
 from flask import request, jsonify
 import jwt
 from app.config import Config
 from app.utils.logger import setup_logger
+from app.utils.request_context import set_current_user
+from app.utils.nfs_guard import NFSUnavailableError
 
 logger = setup_logger(__name__)
 
+# Usuário já autenticado pela requisição externa (sub-requisições de /api/batch)
+_authenticated_user = ContextVar('guacplayer_authenticated_user', default=None)
+
+
+def set_authenticated_user(user_id):
+    """
+    Marca o usuário como autenticado no contexto atual, dispensando a nova
+    validação do JWT em token_required
+    
+    Args:
+        user_id: ID do usuário autenticado
+    """
+    _authenticated_user.set(user_id)
+
+
+def authenticate_token(auth_header):
+    """
+    Valida o header Authorization ("Bearer <token>")
+    
+    Args:
+        auth_header: Valor do header Authorization (ou None)
+    
+    Returns:
+        tuple: (user_id, None) se válido, ou (None, mensagem de erro)
+    """
+    token = None
+    
+    # Verificar se token está no header Authorization
+    if auth_header:
+        try:
+            token = auth_header.split(" ")[1]
+        except IndexError:
+            logger.warning("Token malformado no header Authorization")
+            return None, 'Token malformado'
+    
+    if not token:
+        logger.warning("Token não fornecido")
+        return None, 'Token não fornecido'
+    
+    try:
+        # Decodificar e validar token
+        data = jwt.decode(
+            token,
+            Config.JWT_SECRET_KEY,
+            algorithms=['HS256']
+        )
+    except jwt.ExpiredSignatureError:
+        logger.warning("Token expirado")
+        return None, 'Token expirado'
+    except jwt.InvalidTokenError as e:
+        logger.warning("Token inválido: %s", e)
+        return None, 'Token inválido'
+    
+    current_user = data.get('user_id')
+    if not current_user:
+        logger.warning("Token inválido: user_id não encontrado")
+        return None, 'Token inválido'
+    
+    set_current_user(current_user)
+    return current_user, None
+
 
 def token_required(f):
     """
@@ -26,43 +91,67 @@ def token_required(f):
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        token = None
+        current_user = _authenticated_user.get()
+        if current_user is None:
+            current_user, error = authenticate_token(request.headers.get('Authorization'))
+            if error:
+                return jsonify({'error': error}), 401
+        
+        # Passar user_id para a função
+        kwargs['current_user'] = current_user
+        return f(*args, **kwargs)
+    
+    return decorated_function
+
+
+def stream_token_required(f):
+    """
+    Decorador para endpoints de streaming consumidos por EventSource, que não
+    envia headers: aceita o token no header Authorization ou em ?token=
+    
+    Args:
+        f: Função a ser decorada
+    
+    Returns:
+        function: Função decorada
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        auth_header = request.headers.get('Authorization')
+        if not auth_header and request.args.get('token'):
+            auth_header = 'Bearer ' + request.args['token']
         
-        # Verificar se token está no header Authorization
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(" ")[1]
-            except IndexError:
-                logger.warning("Token malformado no header Authorization")
-                return jsonify({'error': 'Token malformado'}), 401
+        current_user, error = authenticate_token(auth_header)
+        if error:
+            return jsonify({'error': error}), 401
         
-        if not token:
-            logger.warning("Token não fornecido")
-            return jsonify({'error': 'Token não fornecido'}), 401
+        kwargs['current_user'] = current_user
+        return f(*args, **kwargs)
+    
+    return decorated_function
+
+
+def admin_token_required(f):
+    """
+    Decorador para endpoints administrativos, protegidos pelo header
+    X-Admin-Token (desabilitados quando ADMIN_TOKEN não está configurado)
+    
+    Args:
+        f: Função a ser decorada
+    
+    Returns:
+        function: Função decorada
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not Config.ADMIN_TOKEN:
+            logger.warning("Acesso administrativo com ADMIN_TOKEN não configurado")
+            return jsonify({'error': 'Administração desabilitada'}), 403
         
-        try:
-            # Decodificar e validar token
-            data = jwt.decode(
-                token,
-                Config.JWT_SECRET_KEY,
-                algorithms=['HS256']
-            )
-            current_user = data.get('user_id')
-            
-            if not current_user:
-                logger.warning("Token inválido: user_id não encontrado")
-                return jsonify({'error': 'Token inválido'}), 401
-            
-            # Passar user_id para a função
-            kwargs['current_user'] = current_user
-            
-        except jwt.ExpiredSignatureError:
-            logger.warning("Token expirado")
-            return jsonify({'error': 'Token expirado'}), 401
-        except jwt.InvalidTokenError as e:
-            logger.warning(f"Token inválido: {str(e)}")
-            return jsonify({'error': 'Token inválido'}), 401
+        token = request.headers.get('X-Admin-Token', '')
+        if not hmac.compare_digest(token.encode('utf-8'), Config.ADMIN_TOKEN.encode('utf-8')):
+            logger.warning("Token administrativo inválido")
+            return jsonify({'error': 'Token administrativo inválido'}), 401
         
         return f(*args, **kwargs)
     
@@ -83,14 +172,19 @@ def handle_errors(f):
     def decorated_function(*args, **kwargs):
         try:
             return f(*args, **kwargs)
+        except NFSUnavailableError as e:
+            logger.warning("NFS indisponível: %s", e)
+            return jsonify({'error': 'Armazenamento de gravações indisponível'}), 503, {
+                'Retry-After': str(e.retry_after)
+            }
         except ValueError as e:
-            logger.error(f"Erro de validação: {str(e)}")
+            logger.error("Erro de validação: %s", e)
             return jsonify({'error': f'Erro de validação: {str(e)}'}), 400
         except KeyError as e:
-            logger.error(f"Campo obrigatório faltando: {str(e)}")
+            logger.error("Campo obrigatório faltando: %s", e)
             return jsonify({'error': f'Campo obrigatório faltando: {str(e)}'}), 400
         except Exception as e:
-            logger.error(f"Erro interno do servidor: {str(e)}", exc_info=True)
+            logger.error("Erro interno do servidor: %s", e, exc_info=True)
             return jsonify({'error': 'Erro interno do servidor'}), 500
     
     return decorated_function
@@ -117,7 +211,7 @@ def validate_json(*expected_fields):
             
             for field in expected_fields:
                 if field not in data:
-                    logger.warning(f"Campo obrigatório faltando: {field}")
+                    logger.warning("Campo obrigatório faltando: %s", field)
                     return jsonify({'error': f'Campo obrigatório: {field}'}), 400
             
             kwargs['data'] = data
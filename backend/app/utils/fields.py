@@ -0,0 +1,68 @@
+"""
+Seleção de campos das respostas
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Suporte ao parâmetro ?fields= (lista separada por vírgulas), que
+reduz a saída aos campos pedidos e permite aos serviços pular o trabalho dos
+campos que não serão retornados
+"""
+
+
+def parse_fields(value, allowed):
+    """
+    Interpreta o parâmetro fields
+    
+    Args:
+        value: Valor de ?fields= (ex.: "connection_id,connection_name")
+        allowed: Campos disponíveis, na ordem de saída
+    
+    Returns:
+        tuple: Campos pedidos na ordem de allowed, ou None para todos
+    
+    Raises:
+        ValueError: Campo desconhecido
+    """
+    if not value:
+        return None
+    
+    requested = {name.strip() for name in value.split(',') if name.strip()}
+    if not requested:
+        return None
+    
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise ValueError(f"Campos desconhecidos em fields: {', '.join(sorted(unknown))}")
+    
+    return tuple(name for name in allowed if name in requested)
+
+
+def wants(fields, *names):
+    """
+    Verifica se algum dos campos foi pedido
+    
+    Args:
+        fields: Resultado de parse_fields (None = todos)
+        *names: Campos que dependem do mesmo trabalho
+    
+    Returns:
+        bool: True se o trabalho precisa ser feito
+    """
+    return fields is None or any(name in fields for name in names)
+
+
+def select(item, fields):
+    """
+    Reduz um item (dict ou dataclass) aos campos pedidos
+    
+    Args:
+        item: Item da resposta
+        fields: Resultado de parse_fields (None = item inalterado)
+    
+    Returns:
+        Item original ou dict com os campos pedidos
+    """
+    if fields is None:
+        return item
+    if isinstance(item, dict):
+        return {name: item[name] for name in fields if name in item}
+    return {name: getattr(item, name) for name in fields}
@@ -0,0 +1,130 @@
+"""
+Provedor JSON da aplicação
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Provedor JSON do Flask baseado em orjson (datetime, dataclasses e
+UUID nativos) que mede o tempo de serialização de cada resposta e o soma às
+métricas da requisição (Server-Timing "ser")
+"""
+
+import dataclasses
+import decimal
+import time
+import uuid
+from datetime import date, datetime, time as dt_time
+from flask.json.provider import DefaultJSONProvider
+from app.utils.request_context import add_timing
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional; usa o json da biblioteca padrão
+    orjson = None
+
+# Argumentos de dumps que orjson não reproduz (delegados ao json padrão)
+_STDLIB_ONLY_ARGS = {'cls', 'default', 'allow_nan', 'check_circular', 'skipkeys'}
+
+
+def _default(obj):
+    """
+    Converte tipos não suportados nativamente pelo serializador
+    
+    Datas seguem ISO 8601 (o formato nativo do orjson) também no fallback
+    da biblioteca padrão, para que a resposta não dependa do orjson.
+    
+    Args:
+        obj: Objeto a converter
+    
+    Returns:
+        Valor serializável
+    """
+    if isinstance(obj, (datetime, date, dt_time)):
+        return obj.isoformat()
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Provedor JSON (orjson quando disponível) com medição do tempo de serialização"""
+    
+    default = staticmethod(_default)
+    
+    def _orjson_options(self, kwargs):
+        """Traduz os argumentos de json.dumps para opções do orjson"""
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return option
+    
+    def dumps_bytes(self, obj, **kwargs):
+        """
+        Serializa o objeto para bytes UTF-8 medindo a duração
+        
+        Args:
+            obj: Objeto a serializar
+        
+        Returns:
+            bytes: JSON
+        """
+        if orjson is None or _STDLIB_ONLY_ARGS.intersection(kwargs):
+            return self.dumps(obj, **kwargs).encode('utf-8')
+        
+        start = time.perf_counter()
+        try:
+            return orjson.dumps(obj, default=_default, option=self._orjson_options(kwargs))
+        finally:
+            add_timing('ser', time.perf_counter() - start)
+    
+    def dumps(self, obj, **kwargs):
+        """
+        Serializa o objeto medindo a duração
+        
+        Args:
+            obj: Objeto a serializar
+        
+        Returns:
+            str: JSON
+        """
+        if orjson is not None and not _STDLIB_ONLY_ARGS.intersection(kwargs):
+            return self.dumps_bytes(obj, **kwargs).decode('utf-8')
+        
+        start = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            add_timing('ser', time.perf_counter() - start)
+    
+    def loads(self, s, **kwargs):
+        """
+        Desserializa JSON (corpo das requisições)
+        
+        Args:
+            s: JSON em str ou bytes
+        
+        Returns:
+            Objeto Python
+        """
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+    
+    def response(self, *args, **kwargs):
+        """
+        Monta a resposta JSON serializando direto para bytes
+        
+        Returns:
+            Response: Resposta application/json
+        """
+        obj = self._prepare_response_obj(args, kwargs)
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            body = self.dumps_bytes(obj, indent=2)
+        else:
+            body = self.dumps_bytes(obj, separators=(',', ':'))
+        
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
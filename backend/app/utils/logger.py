@@ -2,17 +2,72 @@
 Sistema de logging da aplicação GuacPlayer
 Autor: GuacPlayer Team
 Data: 2025
-Descrição: Configuração centralizada de logging com suporte a múltiplos níveis
+Descrição: Configuração centralizada de logging com suporte a múltiplos níveis.
+Todos os loggers compartilham um único pipeline assíncrono: as threads de
+requisição apenas enfileiram os registros (QueueHandler) em uma fila limitada
+e uma thread dedicada (QueueListener) formata e escreve em lotes no stderr.
 """
 
+import atexit
+import copy
 import logging
+import logging.handlers
 import json
-from datetime import datetime
+import os
+import queue
+import sys
+import threading
+import time
+from pathlib import PurePath
 from app.config import Config
 
+try:
+    import orjson
+except ImportError:  # orjson é opcional; usa o json da biblioteca padrão
+    orjson = None
+
+
+# Políticas de descarte quando a fila de logs está cheia
+OVERFLOW_DROP_LOW = 'drop_low'    # descarta DEBUG/INFO primeiro
+OVERFLOW_DROP_NEW = 'drop_new'    # descarta qualquer registro novo
+OVERFLOW_BLOCK = 'block'          # bloqueia a thread até haver espaço
+
+OVERFLOW_POLICIES = (OVERFLOW_DROP_LOW, OVERFLOW_DROP_NEW, OVERFLOW_BLOCK)
+
+# Tipos imutáveis cujos argumentos podem ser formatados depois, na thread de escrita
+LAZY_ARG_TYPES = (str, int, float, bool, type(None), bytes, PurePath)
+
+
+def _dumps(data):
+    """
+    Serializa um dicionário de log em JSON compacto
+    
+    Args:
+        data: Dicionário a serializar
+    
+    Returns:
+        str: JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=str).decode('utf-8')
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str)
+
 
 class JSONFormatter(logging.Formatter):
-    """Formatter customizado para logs em formato JSON"""
+    """
+    Formatter customizado para logs em formato JSON.
+    
+    Reaproveita record.created para o timestamp (a parte em segundos é
+    formatada uma vez por segundo), mantém em cache o fragmento JSON constante
+    de cada par logger/nível e usa orjson quando disponível.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        """Inicializa o formatter e seus caches"""
+        super().__init__(*args, **kwargs)
+        self._static_fields = {}
+        self._cached_second = None
+        self._cached_second_text = ''
     
     def format(self, record):
         """
@@ -25,19 +80,349 @@ class JSONFormatter(logging.Formatter):
             str: JSON formatado
         """
         log_data = {
-            'timestamp': datetime.utcnow().isoformat(),
-            'level': record.levelname,
-            'logger': record.name,
             'message': record.getMessage(),
             'module': record.module,
             'function': record.funcName,
             'line': record.lineno
         }
         
-        if record.exc_info:
+        # Campos estruturados adicionais (ex.: access log)
+        fields = getattr(record, 'fields', None)
+        if fields:
+            log_data.update(fields)
+        
+        # Exceções já chegam formatadas quando passam pela fila
+        if record.exc_text:
+            log_data['exception'] = record.exc_text
+        elif record.exc_info:
             log_data['exception'] = self.formatException(record.exc_info)
         
-        return json.dumps(log_data, ensure_ascii=False)
+        return (
+            '{"timestamp":"' + self._timestamp(record.created) + '",'
+            + self._static_fragment(record)
+            + _dumps(log_data)[1:]
+        )
+    
+    def _timestamp(self, created):
+        """
+        Converte record.created para ISO 8601 (UTC) com microssegundos
+        
+        Args:
+            created: Epoch do registro
+        
+        Returns:
+            str: Timestamp formatado
+        """
+        second = int(created)
+        if second != self._cached_second:
+            self._cached_second_text = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(second))
+            self._cached_second = second
+        
+        return '%s.%06d' % (self._cached_second_text, int((created - second) * 1000000))
+    
+    def _static_fragment(self, record):
+        """
+        Retorna o trecho JSON constante ("level" e "logger") do registro
+        
+        Args:
+            record: Registro de log
+        
+        Returns:
+            str: Fragmento terminado em vírgula
+        """
+        key = (record.name, record.levelno)
+        fragment = self._static_fields.get(key)
+        
+        if fragment is None:
+            fragment = _dumps({'level': record.levelname, 'logger': record.name})[1:-1] + ','
+            self._static_fields[key] = fragment
+        
+        return fragment
+
+
+class BatchStreamHandler(logging.StreamHandler):
+    """StreamHandler que escreve vários registros com uma única chamada de escrita"""
+    
+    def handle_batch(self, records):
+        """
+        Formata e escreve um lote de registros de uma só vez
+        
+        Args:
+            records: Lista de registros de log
+        
+        Returns:
+            int: Quantidade de registros escritos
+        """
+        lines = []
+        for record in records:
+            if record.levelno < self.level or not self.filter(record):
+                continue
+            try:
+                lines.append(self.format(record))
+            except Exception:
+                self.handleError(record)
+        
+        if not lines:
+            return 0
+        
+        self.acquire()
+        try:
+            self.stream.write(self.terminator.join(lines) + self.terminator)
+            self.flush()
+        except Exception:
+            self.handleError(records[-1])
+        finally:
+            self.release()
+        
+        return len(lines)
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler com fila limitada e política de descarte configurável.
+    
+    Na política 'drop_low', registros DEBUG/INFO deixam de ser aceitos quando
+    a fila atinge a marca d'água, preservando o espaço restante para WARNING
+    e acima.
+    """
+    
+    def __init__(self, log_queue, policy=OVERFLOW_DROP_LOW, high_watermark=0.8):
+        """
+        Inicializa o handler
+        
+        Args:
+            log_queue: Fila limitada (queue.Queue com maxsize)
+            policy: Política de descarte (drop_low, drop_new ou block)
+            high_watermark: Fração da fila a partir da qual DEBUG/INFO são descartados
+        """
+        super().__init__(log_queue)
+        
+        if policy not in OVERFLOW_POLICIES:
+            policy = OVERFLOW_DROP_LOW
+        
+        self.policy = policy
+        self.low_level_limit = max(1, int(log_queue.maxsize * high_watermark))
+        self.enqueued = 0
+        self.dropped = {}
+    
+    def emit(self, record):
+        """
+        Enfileira o registro, descartando-o antes de qualquer formatação
+        quando a fila não comporta o seu nível
+        
+        Args:
+            record: Registro de log
+        """
+        if not self._admit(record):
+            self._count_drop(record)
+            return
+        
+        try:
+            prepared = self.prepare(record)
+            if self.policy == OVERFLOW_BLOCK:
+                self.queue.put(prepared)
+            else:
+                self.queue.put_nowait(prepared)
+            self.enqueued += 1
+        except queue.Full:
+            self._count_drop(record)
+        except Exception:
+            self.handleError(record)
+    
+    def prepare(self, record):
+        """
+        Prepara o registro para a fila. Argumentos imutáveis no estilo '%'
+        seguem sem formatação (a mensagem é montada só na thread de escrita);
+        os demais são resolvidos aqui, pois podem mudar até lá.
+        
+        Args:
+            record: Registro de log
+        
+        Returns:
+            logging.LogRecord: Cópia pronta para a fila
+        """
+        record = copy.copy(record)
+        
+        if record.args and not _lazy_args(record.args):
+            record.msg = record.getMessage()
+            record.args = None
+        
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        
+        return record
+    
+    def _admit(self, record):
+        """Verifica se há espaço na fila para o nível do registro"""
+        if self.policy != OVERFLOW_DROP_LOW or record.levelno >= logging.WARNING:
+            return True
+        return self.queue.qsize() < self.low_level_limit
+    
+    def _count_drop(self, record):
+        """Contabiliza um registro descartado"""
+        self.dropped[record.levelname] = self.dropped.get(record.levelname, 0) + 1
+
+
+def _lazy_args(args):
+    """Verifica se os argumentos da mensagem podem ser formatados depois"""
+    return isinstance(args, tuple) and all(isinstance(arg, LAZY_ARG_TYPES) for arg in args)
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """QueueListener que drena a fila em lotes para reduzir escritas no stream"""
+    
+    def __init__(self, log_queue, handler, batch_size=256):
+        """
+        Inicializa o listener
+        
+        Args:
+            log_queue: Fila de registros
+            handler: BatchStreamHandler de destino
+            batch_size: Máximo de registros por escrita
+        """
+        super().__init__(log_queue, handler, respect_handler_level=True)
+        self.batch_size = max(1, batch_size)
+        self.written = 0
+        self.batches = 0
+    
+    def _monitor(self):
+        """
+        Consome a fila: aguarda o primeiro registro e agrupa os que já
+        estiverem disponíveis, sem esperar por mais, até o tamanho do lote
+        """
+        q = self.queue
+        handler = self.handlers[0]
+        
+        while True:
+            record = self.dequeue(True)
+            stop = record is self._sentinel
+            batch = [] if stop else [record]
+            
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    record = q.get_nowait()
+                except queue.Empty:
+                    break
+                if record is self._sentinel:
+                    stop = True
+                else:
+                    batch.append(record)
+            
+            if batch:
+                self.written += handler.handle_batch(batch)
+                self.batches += 1
+            
+            if stop:
+                break
+    
+    def enqueue_sentinel(self):
+        """Enfileira o sentinela mesmo com a fila cheia"""
+        self.queue.put(self._sentinel)
+
+
+class _LogPipeline:
+    """Pipeline único (fila + handler + listener) compartilhado pelos loggers"""
+    
+    def __init__(self):
+        """Cria a fila, o handler de enfileiramento e o listener"""
+        self.level = getattr(logging, Config.LOG_LEVEL.upper(), logging.INFO)
+        
+        self.stream_handler = BatchStreamHandler(sys.stderr)
+        self.stream_handler.setLevel(self.level)
+        self.stream_handler.setFormatter(JSONFormatter())
+        
+        self.queue_handler = BoundedQueueHandler(
+            queue.Queue(maxsize=Config.LOG_QUEUE_SIZE),
+            policy=Config.LOG_OVERFLOW_POLICY,
+            high_watermark=Config.LOG_QUEUE_HIGH_WATERMARK
+        )
+        self.queue_handler.setLevel(self.level)
+        
+        self.listener = None
+        self.start()
+    
+    def start(self):
+        """Inicia a thread de escrita"""
+        self.listener = BatchingQueueListener(
+            self.queue_handler.queue,
+            self.stream_handler,
+            batch_size=Config.LOG_BATCH_SIZE
+        )
+        self.listener.start()
+    
+    def stop(self):
+        """Esvazia a fila e encerra a thread de escrita"""
+        if self.listener and self.listener._thread:
+            self.listener.stop()
+    
+    def reset_after_fork(self):
+        """Recria fila e thread no processo filho (threads não sobrevivem ao fork)"""
+        self.queue_handler.queue = queue.Queue(maxsize=Config.LOG_QUEUE_SIZE)
+        self.queue_handler.createLock()
+        self.stream_handler.createLock()
+        self.start()
+    
+    def stats(self):
+        """
+        Retorna contadores do pipeline
+        
+        Returns:
+            dict: Registros enfileirados, pendentes, escritos e descartados
+        """
+        dropped = dict(self.queue_handler.dropped)
+        return {
+            'policy': self.queue_handler.policy,
+            'capacity': self.queue_handler.queue.maxsize,
+            'queued': self.queue_handler.queue.qsize(),
+            'enqueued': self.queue_handler.enqueued,
+            'written': self.listener.written if self.listener else 0,
+            'batches': self.listener.batches if self.listener else 0,
+            'dropped': sum(dropped.values()),
+            'dropped_by_level': dropped
+        }
+
+
+_exception_formatter = logging.Formatter()
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def _get_pipeline():
+    """Obtém (criando na primeira chamada) o pipeline de logging do processo"""
+    global _pipeline
+    
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = _LogPipeline()
+                atexit.register(_pipeline.stop)
+    
+    return _pipeline
+
+
+def _reset_pipeline_after_fork():
+    """Hook de fork: reinicia o pipeline herdado do processo pai"""
+    global _pipeline_lock
+    
+    _pipeline_lock = threading.Lock()
+    if _pipeline is not None:
+        _pipeline.reset_after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_pipeline_after_fork)
+
+
+def get_logging_stats():
+    """
+    Retorna os contadores do pipeline de logging
+    
+    Returns:
+        dict: Contadores de registros enfileirados e descartados
+    """
+    return _get_pipeline().stats()
 
 
 def setup_logger(name):
@@ -56,18 +441,14 @@ def setup_logger(name):
     if logger.handlers:
         return logger
     
-    # Definir nível de logging
-    log_level = getattr(logging, Config.LOG_LEVEL.upper(), logging.INFO)
-    logger.setLevel(log_level)
-    
-    # Handler para console
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(log_level)
+    pipeline = _get_pipeline()
     
-    # Usar JSON formatter
-    formatter = JSONFormatter()
-    console_handler.setFormatter(formatter)
+    # Definir nível de logging
+    logger.setLevel(pipeline.level)
     
-    logger.addHandler(console_handler)
+    # Handler compartilhado que apenas enfileira os registros; sem propagação,
+    # pois o logger pai ('app') usa o mesmo handler e duplicaria a saída
+    logger.addHandler(pipeline.queue_handler)
+    logger.propagate = False
     
     return logger
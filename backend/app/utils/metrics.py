@@ -0,0 +1,195 @@
+"""
+Métricas Prometheus da aplicação
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Histogramas de latência por rota, requisições em andamento, bytes
+enviados por streaming/download e latência por método de GuacamoleQueries e
+NFSHandler. Com vários workers, defina PROMETHEUS_MULTIPROC_DIR para que os
+valores de todos os processos sejam agregados na exposição.
+"""
+
+import os
+import time
+from flask import g, request
+from app.config import Config
+from app.utils.logger import setup_logger
+
+try:
+    from prometheus_client import (
+        CollectorRegistry, Counter, Gauge, Histogram, REGISTRY,
+        CONTENT_TYPE_LATEST, generate_latest
+    )
+    from prometheus_client import multiprocess
+    PROMETHEUS_AVAILABLE = True
+except ImportError:  # prometheus_client é opcional
+    PROMETHEUS_AVAILABLE = False
+
+logger = setup_logger(__name__)
+
+# Endpoints cujos bytes enviados são contabilizados
+STREAMING_ENDPOINTS = {
+    'recordings.stream_recording': 'stream',
+    'recordings.download_recording': 'download'
+}
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+OPERATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+if PROMETHEUS_AVAILABLE:
+    REQUEST_LATENCY = Histogram(
+        'guacplayer_http_request_duration_seconds',
+        'Latência das requisições HTTP por blueprint e rota',
+        ['blueprint', 'route', 'method', 'status'],
+        buckets=LATENCY_BUCKETS
+    )
+    REQUESTS_IN_FLIGHT = Gauge(
+        'guacplayer_http_requests_in_flight',
+        'Requisições HTTP em andamento',
+        multiprocess_mode='livesum'
+    )
+    RECORDING_BYTES_SENT = Counter(
+        'guacplayer_recording_bytes_sent',
+        'Bytes de gravações enviados por streaming e download',
+        ['route']
+    )
+    OPERATION_LATENCY = {
+        'db': Histogram(
+            'guacplayer_db_query_duration_seconds',
+            'Latência das consultas ao banco por método de GuacamoleQueries',
+            ['method'],
+            buckets=OPERATION_BUCKETS
+        ),
+        'nfs': Histogram(
+            'guacplayer_nfs_operation_duration_seconds',
+            'Latência das operações NFS por método de NFSHandler',
+            ['method'],
+            buckets=OPERATION_BUCKETS
+        )
+    }
+else:
+    OPERATION_LATENCY = {}
+
+
+def observe_operation(kind, method, seconds):
+    """
+    Registra a duração de uma operação de banco ou NFS
+    
+    Args:
+        kind: Categoria ('db' ou 'nfs')
+        method: Nome do método executado
+        seconds: Duração em segundos
+    """
+    histogram = OPERATION_LATENCY.get(kind)
+    if histogram is not None:
+        histogram.labels(method=method).observe(seconds)
+
+
+def metrics_enabled():
+    """Indica se as métricas de requisição estão ativas"""
+    return PROMETHEUS_AVAILABLE and Config.METRICS_ENABLED
+
+
+def request_started():
+    """Marca o início de uma requisição (gauge de requisições em andamento)"""
+    if metrics_enabled():
+        REQUESTS_IN_FLIGHT.inc()
+
+
+def observe_request(blueprint, route, method, status, seconds):
+    """
+    Registra a latência de uma requisição (até a resposta ser produzida)
+    
+    Args:
+        blueprint: Blueprint da rota ('app' fora de blueprints)
+        route: Regra da rota (ex.: /api/connections/<int:connection_id>)
+        method: Método HTTP
+        status: Código HTTP
+        seconds: Duração em segundos
+    """
+    if metrics_enabled():
+        REQUEST_LATENCY.labels(
+            blueprint=blueprint,
+            route=route,
+            method=method,
+            status=status
+        ).observe(seconds)
+
+
+def request_finished(streaming_route=None, status=200, bytes_sent=0):
+    """
+    Marca o fim de uma requisição, após o envio do corpo
+    
+    Args:
+        streaming_route: Rótulo da rota de vídeo ('stream' ou 'download'), se houver
+        status: Código HTTP
+        bytes_sent: Bytes do corpo enviados
+    """
+    if not metrics_enabled():
+        return
+    REQUESTS_IN_FLIGHT.dec()
+    if streaming_route and bytes_sent and status < 400:
+        RECORDING_BYTES_SENT.labels(route=streaming_route).inc(bytes_sent)
+
+
+def generate_metrics():
+    """
+    Gera a exposição no formato texto do Prometheus
+    
+    Returns:
+        tuple: (corpo, content type)
+    """
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def init_metrics(app):
+    """
+    Registra os hooks de coleta e o endpoint /api/metrics
+    
+    Args:
+        app: Aplicação Flask
+    """
+    if not PROMETHEUS_AVAILABLE:
+        logger.warning("prometheus_client não instalado; /api/metrics desabilitado")
+        return
+    
+    if not Config.METRICS_ENABLED:
+        return
+    
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_start = time.perf_counter()
+        request_started()
+    
+    @app.after_request
+    def observe_request_metrics(response):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return response
+        
+        status = response.status_code
+        observe_request(
+            request.blueprint or 'app',
+            request.url_rule.rule if request.url_rule else 'unmatched',
+            request.method,
+            status,
+            time.perf_counter() - start
+        )
+        
+        streaming_route = STREAMING_ENDPOINTS.get(request.endpoint)
+        content_length = response.content_length
+        
+        # Requisição só deixa de estar em andamento após o envio do corpo
+        response.call_on_close(lambda: request_finished(streaming_route, status, content_length))
+        return response
+    
+    @app.route('/api/metrics', methods=['GET'])
+    def metrics():
+        """Endpoint de exposição das métricas Prometheus"""
+        body, content_type = generate_metrics()
+        return body, 200, {'Content-Type': content_type}
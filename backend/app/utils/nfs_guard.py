@@ -0,0 +1,366 @@
+"""
+Proteção das operações NFS
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Executa as operações de sistema de arquivos em um pool de threads
+limitado, com prazo por chamada, e um circuit breaker que falha rápido (503 com
+Retry-After) quando a latência ou os erros do NFS passam dos limites. Com o
+circuito aberto, uma thread de sondagem verifica a recuperação do ponto de
+montagem em segundo plano.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextvars import ContextVar, copy_context
+from functools import wraps
+from app.config import Config
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Marca chamadas já em execução no pool (chamadas aninhadas rodam direto)
+_inside_guard = ContextVar('guacplayer_inside_nfs_guard', default=False)
+
+
+class NFSUnavailableError(Exception):
+    """NFS indisponível: prazo excedido, pool saturado ou circuito aberto"""
+    
+    def __init__(self, message, retry_after=None):
+        """
+        Inicializa o erro
+        
+        Args:
+            message: Descrição do erro
+            retry_after: Segundos sugeridos para nova tentativa (header Retry-After)
+        """
+        super().__init__(message)
+        self.retry_after = retry_after or Config.NFS_BREAKER_RESET_SECONDS
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por latência e erros
+    
+    Abre após N falhas consecutivas ou quando a fração de chamadas lentas ou
+    com falha na janela recente passa do limite. Aberto, rejeita chamadas até
+    a sondagem em segundo plano confirmar a recuperação.
+    """
+    
+    def __init__(self, name, probe, failure_threshold, slow_seconds, window, slow_ratio,
+                 reset_seconds, probe_interval):
+        """
+        Inicializa o circuit breaker
+        
+        Args:
+            name: Nome usado nos logs
+            probe: Função de sondagem (exceção ou lentidão = ainda indisponível)
+            failure_threshold: Falhas consecutivas que abrem o circuito
+            slow_seconds: Duração a partir da qual uma chamada é lenta
+            window: Tamanho da janela de chamadas recentes
+            slow_ratio: Fração de chamadas lentas/falhas na janela que abre o circuito
+            reset_seconds: Retry-After sugerido enquanto aberto
+            probe_interval: Intervalo entre sondagens, em segundos
+        """
+        self.name = name
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.slow_seconds = slow_seconds
+        self.slow_ratio = slow_ratio
+        self.reset_seconds = reset_seconds
+        self.probe_interval = probe_interval
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=window)
+        self._consecutive_failures = 0
+        self.state = 'closed'
+        self.opened_at = None
+        self.last_error = None
+    
+    def allow(self):
+        """
+        Verifica se uma chamada pode prosseguir
+        
+        Raises:
+            NFSUnavailableError: Se o circuito estiver aberto
+        """
+        if self.state == 'open':
+            raise NFSUnavailableError(
+                "NFS indisponível (circuito aberto)", retry_after=self.retry_after()
+            )
+    
+    def retry_after(self):
+        """Segundos sugeridos para nova tentativa"""
+        if self.opened_at is None:
+            return self.reset_seconds
+        remaining = self.reset_seconds - (time.monotonic() - self.opened_at)
+        return max(1, math.ceil(remaining)) if remaining > 0 else max(1, math.ceil(self.probe_interval))
+    
+    def record(self, elapsed, error=None):
+        """
+        Registra o resultado de uma chamada
+        
+        Args:
+            elapsed: Duração em segundos
+            error: Exceção (ou descrição) se a chamada falhou
+        """
+        with self._lock:
+            if error is not None:
+                self._consecutive_failures += 1
+                self.last_error = str(error)
+            else:
+                self._consecutive_failures = 0
+            
+            self._recent.append(error is not None or elapsed >= self.slow_seconds)
+            if self.state != 'closed':
+                return
+            
+            bad_ratio = sum(self._recent) / len(self._recent)
+            window_full = len(self._recent) == self._recent.maxlen
+            if (self._consecutive_failures >= self.failure_threshold or
+                    (window_full and bad_ratio >= self.slow_ratio)):
+                self._open()
+    
+    def _open(self):
+        """Abre o circuito e inicia a sondagem (chamado com o lock adquirido)"""
+        self.state = 'open'
+        self.opened_at = time.monotonic()
+        logger.warning(
+            "Circuito %s aberto (falhas consecutivas: %s, último erro: %s)",
+            self.name, self._consecutive_failures, self.last_error
+        )
+        threading.Thread(target=self._probe_loop, name='%s-probe' % self.name, daemon=True).start()
+    
+    def _close(self):
+        """Fecha o circuito após sondagem bem-sucedida"""
+        with self._lock:
+            self.state = 'closed'
+            self.opened_at = None
+            self._recent.clear()
+            self._consecutive_failures = 0
+        logger.info("Circuito %s fechado: NFS recuperado", self.name)
+    
+    def _probe_loop(self):
+        """Sonda o recurso até que responda dentro do limite de lentidão"""
+        while self.state == 'open':
+            time.sleep(self.probe_interval)
+            start = time.perf_counter()
+            try:
+                self.probe()
+            except Exception as e:
+                self.last_error = str(e)
+                logger.debug("Sondagem do circuito %s falhou: %s", self.name, e)
+                continue
+            
+            if time.perf_counter() - start < self.slow_seconds:
+                self._close()
+                return
+    
+    def to_dict(self):
+        """
+        Estado do circuito
+        
+        Returns:
+            dict: Estado, último erro e Retry-After (quando aberto)
+        """
+        info = {'state': self.state}
+        if self.state == 'open':
+            info['retry_after'] = self.retry_after()
+            info['last_error'] = self.last_error
+        return info
+
+
+class NFSGuard:
+    """Pool limitado com prazo por chamada e circuit breaker (por processo)"""
+    
+    def __init__(self, path):
+        """
+        Inicializa a proteção
+        
+        Args:
+            path: Ponto de montagem sondado pelo circuit breaker
+        """
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._executor = None
+        self._slots = None
+        self.breaker = None
+    
+    def _ensure_process(self):
+        """Cria pool e circuit breaker no processo atual (não sobrevivem ao fork)"""
+        if self._pid == os.getpid():
+            return
+        
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._executor = ThreadPoolExecutor(
+                max_workers=Config.NFS_WORKERS, thread_name_prefix='nfs'
+            )
+            # Conta também threads presas em chamadas que excederam o prazo
+            self._slots = threading.BoundedSemaphore(Config.NFS_WORKERS + Config.NFS_MAX_PENDING)
+            self.breaker = CircuitBreaker(
+                'nfs',
+                probe=lambda: os.stat(self.path),
+                failure_threshold=Config.NFS_BREAKER_FAILURE_THRESHOLD,
+                slow_seconds=Config.NFS_BREAKER_SLOW_MS / 1000,
+                window=Config.NFS_BREAKER_WINDOW,
+                slow_ratio=Config.NFS_BREAKER_SLOW_RATIO,
+                reset_seconds=Config.NFS_BREAKER_RESET_SECONDS,
+                probe_interval=Config.NFS_PROBE_INTERVAL
+            )
+            self._pid = os.getpid()
+    
+    def call(self, func, *args, timeout=None, **kwargs):
+        """
+        Executa func no pool respeitando o prazo e o circuit breaker
+        
+        Args:
+            func: Operação de sistema de arquivos
+            *args: Argumentos posicionais
+            timeout: Prazo em segundos (padrão: NFS_CALL_TIMEOUT)
+            **kwargs: Argumentos nomeados
+        
+        Returns:
+            Resultado da função
+        
+        Raises:
+            NFSUnavailableError: Circuito aberto, pool saturado ou prazo excedido
+        """
+        self._ensure_process()
+        future, start = self._submit(func, args, kwargs)
+        deadline = timeout if timeout is not None else Config.NFS_CALL_TIMEOUT
+        return self._wait(func, future, start, deadline, deadline)
+    
+    def map(self, func, items, timeout=None):
+        """
+        Executa func(item) para cada item em paralelo no pool, com um prazo
+        único para o conjunto
+        
+        Args:
+            func: Operação de sistema de arquivos
+            items: Argumento de cada chamada
+            timeout: Prazo em segundos (padrão: NFS_CALL_TIMEOUT)
+        
+        Returns:
+            list: Resultados na ordem de items
+        
+        Raises:
+            NFSUnavailableError: Circuito aberto, pool saturado ou prazo excedido
+        """
+        if _inside_guard.get():
+            # Já em uma thread do pool: esperar pelo pool poderia travá-lo
+            return [func(item) for item in items]
+        
+        self._ensure_process()
+        deadline = timeout if timeout is not None else Config.NFS_CALL_TIMEOUT
+        expires = time.monotonic() + deadline
+        submitted = [self._submit(func, (item,), {}) for item in items]
+        return [
+            self._wait(func, future, start, max(0.0, expires - time.monotonic()), deadline)
+            for future, start in submitted
+        ]
+    
+    def _submit(self, func, args, kwargs):
+        """
+        Agenda func no pool (circuito fechado e vaga disponível)
+        
+        Returns:
+            tuple: (Future, instante do envio)
+        """
+        breaker = self.breaker
+        breaker.allow()
+        
+        if not self._slots.acquire(blocking=False):
+            breaker.record(0.0, error='pool NFS saturado')
+            raise NFSUnavailableError("NFS indisponível (pool saturado)", retry_after=breaker.retry_after())
+        
+        def run():
+            _inside_guard.set(True)
+            return func(*args, **kwargs)
+        
+        start = time.perf_counter()
+        try:
+            future = self._executor.submit(copy_context().run, run)
+        except RuntimeError:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future, start
+    
+    def _wait(self, func, future, start, remaining, deadline):
+        """
+        Aguarda o resultado e registra a chamada no circuit breaker
+        
+        Args:
+            func: Operação (para os logs)
+            future: Future de _submit
+            start: Instante do envio
+            remaining: Espera máxima em segundos
+            deadline: Prazo configurado (para os logs)
+        
+        Returns:
+            Resultado da função
+        """
+        breaker = self.breaker
+        try:
+            result = future.result(timeout=remaining)
+        except FutureTimeoutError:
+            breaker.record(time.perf_counter() - start, error='prazo de %ss excedido' % deadline)
+            logger.warning("Operação NFS %s excedeu o prazo de %ss", getattr(func, '__name__', func), deadline)
+            raise NFSUnavailableError("NFS indisponível (prazo excedido)", retry_after=breaker.retry_after())
+        except NFSUnavailableError:
+            raise
+        except Exception as e:
+            breaker.record(time.perf_counter() - start, error=e)
+            raise
+        
+        breaker.record(time.perf_counter() - start)
+        return result
+    
+    def to_dict(self):
+        """Estado do circuit breaker para o endpoint de prontidão"""
+        self._ensure_process()
+        return self.breaker.to_dict()
+
+
+_guard = None
+_guard_lock = threading.Lock()
+
+
+def get_nfs_guard():
+    """
+    Obtém a proteção NFS compartilhada do processo
+    
+    Returns:
+        NFSGuard: Proteção do ponto de montagem configurado
+    """
+    global _guard
+    if _guard is None:
+        with _guard_lock:
+            if _guard is None:
+                _guard = NFSGuard(Config.NFS_MOUNT_PATH)
+    return _guard
+
+
+def nfs_guarded(f):
+    """
+    Decorador que executa a função pela proteção NFS (pool com prazo e
+    circuit breaker). Chamadas aninhadas rodam direto na thread do pool.
+    
+    Args:
+        f: Função com operações de sistema de arquivos
+    
+    Returns:
+        function: Função decorada
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if _inside_guard.get():
+            return f(*args, **kwargs)
+        return get_nfs_guard().call(f, *args, **kwargs)
+    
+    return decorated_function
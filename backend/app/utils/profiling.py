@@ -0,0 +1,266 @@
+"""
+Profiling sob demanda de requisições
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Executa requisições selecionadas (header/query autorizados ou
+amostragem aleatória) sob um profiler por amostragem de pilha e grava o
+resultado em formato speedscope em um diretório local limitado
+"""
+
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from flask import g, request
+from app.config import Config
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+PROFILE_HEADER = 'X-Profile-Token'
+PROFILE_QUERY_PARAM = 'profile'
+PROFILE_NAME_PATTERN = re.compile(r'^[\w.-]+\.speedscope\.json$')
+MAX_STACK_DEPTH = 128
+
+
+class SamplingProfiler:
+    """
+    Profiler por amostragem: uma thread auxiliar captura periodicamente a
+    pilha da thread alvo via sys._current_frames(), sem instrumentar cada
+    chamada como o cProfile
+    """
+    
+    def __init__(self, thread_id, interval):
+        """
+        Inicializa o profiler
+        
+        Args:
+            thread_id: Identificador da thread a amostrar
+            interval: Intervalo entre amostras em segundos
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        """Inicia a captura de amostras"""
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Encerra a captura de amostras"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+    
+    def _run(self):
+        """Laço de amostragem"""
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            
+            stack.reverse()
+            self.samples[tuple(stack)] += 1
+            self.sample_count += 1
+    
+    def to_speedscope(self, name):
+        """
+        Converte as amostras para o formato speedscope (perfil "sampled")
+        
+        Args:
+            name: Nome do perfil
+        
+        Returns:
+            dict: Documento speedscope
+        """
+        frames = []
+        frame_index = {}
+        samples = []
+        weights = []
+        interval_ms = self.interval * 1000
+        
+        for stack, count in self.samples.items():
+            indexes = []
+            for frame in stack:
+                index = frame_index.get(frame)
+                if index is None:
+                    index = len(frames)
+                    frame_index[frame] = index
+                    frames.append({'name': frame[0], 'file': frame[1], 'line': frame[2]})
+                indexes.append(index)
+            samples.append(indexes)
+            weights.append(count * interval_ms)
+        
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'guacplayer-backend',
+            'shared': {'frames': frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': name,
+                'unit': 'milliseconds',
+                'startValue': 0,
+                'endValue': sum(weights),
+                'samples': samples,
+                'weights': weights
+            }]
+        }
+
+
+class ProfileStore:
+    """Diretório local de perfis com número máximo de arquivos"""
+    
+    def __init__(self, directory, max_files):
+        """
+        Inicializa o armazenamento
+        
+        Args:
+            directory: Diretório dos perfis
+            max_files: Quantidade máxima de perfis mantidos
+        """
+        self.directory = Path(directory)
+        self.max_files = max(1, max_files)
+        self._lock = threading.Lock()
+    
+    def save(self, name, document):
+        """
+        Grava um perfil e remove os mais antigos além do limite
+        
+        Args:
+            name: Nome do arquivo
+            document: Documento speedscope
+        """
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(self.directory / name, 'w', encoding='utf-8') as f:
+                json.dump(document, f)
+            
+            profiles = self._profile_files()
+            for old in profiles[self.max_files:]:
+                try:
+                    old.unlink()
+                except OSError as e:
+                    logger.warning("Erro ao remover perfil antigo %s: %s", old.name, e)
+    
+    def list(self):
+        """
+        Lista os perfis gravados, do mais recente ao mais antigo
+        
+        Returns:
+            list: Nome, tamanho e data de cada perfil
+        """
+        profiles = []
+        for path in self._profile_files():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            profiles.append({
+                'name': path.name,
+                'size': stat.st_size,
+                'created_at': stat.st_mtime
+            })
+        return profiles
+    
+    def get_path(self, name):
+        """
+        Obtém o caminho de um perfil, validando o nome
+        
+        Args:
+            name: Nome do perfil
+        
+        Returns:
+            Path: Caminho do perfil ou None se inválido/inexistente
+        """
+        if not PROFILE_NAME_PATTERN.match(name):
+            return None
+        
+        path = self.directory / name
+        return path if path.is_file() else None
+    
+    def _profile_files(self):
+        """Retorna os arquivos de perfil ordenados do mais recente ao mais antigo"""
+        if not self.directory.exists():
+            return []
+        
+        files = [p for p in self.directory.iterdir() if PROFILE_NAME_PATTERN.match(p.name)]
+        return sorted(files, key=lambda p: p.stat().st_mtime, reverse=True)
+
+
+profile_store = ProfileStore(Config.PROFILING_DIR, Config.PROFILING_MAX_FILES)
+
+
+def _profiling_requested():
+    """Verifica se a requisição atual deve ser perfilada"""
+    token = request.headers.get(PROFILE_HEADER) or request.args.get(PROFILE_QUERY_PARAM)
+    
+    if token and Config.ADMIN_TOKEN:
+        if hmac.compare_digest(token.encode('utf-8'), Config.ADMIN_TOKEN.encode('utf-8')):
+            return True
+        logger.warning("Token de profiling inválido para %s", request.path)
+    
+    return Config.PROFILING_SAMPLE_RATE > 0 and random.random() < Config.PROFILING_SAMPLE_RATE
+
+
+def _profile_name():
+    """Gera o nome do arquivo de perfil da requisição atual"""
+    endpoint = re.sub(r'[^\w.-]', '_', request.endpoint or 'unmatched')
+    return '%s-%d-%06d-%s.speedscope.json' % (
+        time.strftime('%Y%m%dT%H%M%S'), os.getpid(), random.randint(0, 999999), endpoint
+    )
+
+
+def init_profiling(app):
+    """
+    Registra o middleware de profiling sob demanda
+    
+    Args:
+        app: Aplicação Flask
+    """
+    @app.before_request
+    def start_request_profiler():
+        if not _profiling_requested():
+            return
+        
+        profiler = SamplingProfiler(threading.get_ident(), Config.PROFILING_INTERVAL_MS / 1000)
+        profiler.start()
+        g.request_profiler = profiler
+    
+    @app.after_request
+    def stop_request_profiler(response):
+        profiler = g.pop('request_profiler', None)
+        if profiler is None:
+            return response
+        
+        profiler.stop()
+        name = _profile_name()
+        title = '%s %s' % (request.method, request.path)
+        response.headers['X-Profile-Id'] = name
+        
+        def save_profile():
+            try:
+                profile_store.save(name, profiler.to_speedscope(title))
+                logger.info("Perfil %s gravado (%s amostras)", name, profiler.sample_count)
+            except Exception as e:
+                logger.error("Erro ao gravar perfil %s: %s", name, e)
+        
+        # Gravar após o envio da resposta, fora do tempo percebido pelo cliente
+        response.call_on_close(save_profile)
+        return response
@@ -0,0 +1,355 @@
+"""
+Contexto de métricas por requisição
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Acumula tempo de banco, tempo de NFS, tempo de serialização, bytes
+enviados e acertos de cache de cada requisição, expõe os tempos no header
+Server-Timing e emite uma única linha de access log estruturada ao final dela
+"""
+
+import inspect
+import random
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+from urllib.parse import parse_qsl, urlencode
+from flask import g, request
+from app.config import Config
+from app.utils.logger import setup_logger
+from app.utils.metrics import observe_operation
+
+logger = setup_logger(__name__)
+access_logger = setup_logger('app.access')
+
+# Parâmetros de query que nunca devem aparecer no access log
+REDACTED_QUERY_PARAMS = {'token', 'profile'}
+
+_current_metrics = ContextVar('guacplayer_request_metrics', default=None)
+_active_timers = ContextVar('guacplayer_active_timers', default=())
+
+
+class RequestMetrics:
+    """Métricas acumuladas durante uma requisição"""
+    
+    __slots__ = (
+        'method', 'path', 'query', 'endpoint', 'remote_addr', 'user_id',
+        'status', 'start', 'db_ms', 'db_calls', 'nfs_ms', 'nfs_calls',
+        'ser_ms', 'cmp_ms', 'bytes_sent', 'cache_hits', 'cache_misses', '_lock'
+    )
+    
+    def __init__(self, method, path, query='', remote_addr=None):
+        """
+        Inicializa as métricas da requisição
+        
+        Args:
+            method: Método HTTP
+            path: Caminho da requisição
+            query: Query string já sanitizada
+            remote_addr: Endereço do cliente
+        """
+        self.method = method
+        self.path = path
+        self.query = query
+        self.endpoint = None
+        self.remote_addr = remote_addr
+        self.user_id = None
+        self.status = None
+        self.start = time.perf_counter()
+        self.db_ms = 0.0
+        self.db_calls = 0
+        self.nfs_ms = 0.0
+        self.nfs_calls = 0
+        self.ser_ms = 0.0
+        self.cmp_ms = 0.0
+        self.bytes_sent = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._lock = threading.Lock()
+    
+    def add_timing(self, kind, seconds):
+        """
+        Soma uma duração à categoria informada
+        
+        Args:
+            kind: Categoria ('db', 'nfs', 'ser' ou 'cmp')
+            seconds: Duração em segundos
+        """
+        with self._lock:
+            if kind == 'db':
+                self.db_ms += seconds * 1000
+                self.db_calls += 1
+            elif kind == 'nfs':
+                self.nfs_ms += seconds * 1000
+                self.nfs_calls += 1
+            elif kind == 'ser':
+                self.ser_ms += seconds * 1000
+            elif kind == 'cmp':
+                self.cmp_ms += seconds * 1000
+    
+    def elapsed_ms(self):
+        """Retorna o tempo decorrido desde o início da requisição em ms"""
+        return (time.perf_counter() - self.start) * 1000
+    
+    def server_timing(self):
+        """
+        Monta o valor do header Server-Timing
+        
+        Returns:
+            str: Métricas no formato "nome;dur=ms"
+        """
+        return 'db;dur=%.2f, nfs;dur=%.2f, ser;dur=%.2f, cmp;dur=%.2f, app;dur=%.2f' % (
+            self.db_ms, self.nfs_ms, self.ser_ms, self.cmp_ms, self.elapsed_ms()
+        )
+    
+    def to_dict(self):
+        """
+        Serializa as métricas para o access log
+        
+        Returns:
+            dict: Campos estruturados da requisição
+        """
+        return {
+            'method': self.method,
+            'path': self.path,
+            'query': self.query,
+            'endpoint': self.endpoint,
+            'remote_addr': self.remote_addr,
+            'user_id': self.user_id,
+            'status': self.status,
+            'duration_ms': round(self.elapsed_ms(), 2),
+            'db_ms': round(self.db_ms, 2),
+            'db_calls': self.db_calls,
+            'nfs_ms': round(self.nfs_ms, 2),
+            'nfs_calls': self.nfs_calls,
+            'ser_ms': round(self.ser_ms, 2),
+            'cmp_ms': round(self.cmp_ms, 2),
+            'bytes_sent': self.bytes_sent,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses
+        }
+
+
+def current_metrics():
+    """
+    Obtém as métricas da requisição em andamento
+    
+    Returns:
+        RequestMetrics: Métricas atuais ou None fora de uma requisição
+    """
+    return _current_metrics.get()
+
+
+def add_timing(kind, seconds):
+    """Soma uma duração às métricas da requisição atual, se houver"""
+    metrics = _current_metrics.get()
+    if metrics is not None:
+        metrics.add_timing(kind, seconds)
+
+
+def add_bytes_sent(count):
+    """Soma bytes enviados às métricas da requisição atual, se houver"""
+    metrics = _current_metrics.get()
+    if metrics is not None:
+        metrics.bytes_sent += count
+
+
+def record_cache(hit):
+    """
+    Registra um acerto ou falha de cache na requisição atual
+    
+    Args:
+        hit: True para acerto, False para falha
+    """
+    metrics = _current_metrics.get()
+    if metrics is None:
+        return
+    if hit:
+        metrics.cache_hits += 1
+    else:
+        metrics.cache_misses += 1
+
+
+def set_current_user(user_id):
+    """Associa o usuário autenticado às métricas da requisição atual"""
+    metrics = _current_metrics.get()
+    if metrics is not None:
+        metrics.user_id = user_id
+
+
+def timed(kind):
+    """
+    Decorador que mede a duração da função (síncrona ou corrotina), soma-a à
+    categoria informada e a registra nas métricas por método. Chamadas aninhadas da mesma categoria
+    contam apenas uma vez no total da requisição.
+    
+    Args:
+        kind: Categoria ('db' ou 'nfs')
+    
+    Returns:
+        function: Decorador
+    """
+    def decorator(f):
+        method = f.__name__
+        
+        if inspect.iscoroutinefunction(f):
+            @wraps(f)
+            async def decorated_coroutine(*args, **kwargs):
+                active = _active_timers.get()
+                nested = kind in active
+                reset_token = None if nested else _active_timers.set(active + (kind,))
+                start = time.perf_counter()
+                try:
+                    return await f(*args, **kwargs)
+                finally:
+                    elapsed = time.perf_counter() - start
+                    observe_operation(kind, method, elapsed)
+                    if not nested:
+                        add_timing(kind, elapsed)
+                        _active_timers.reset(reset_token)
+            
+            return decorated_coroutine
+        
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            active = _active_timers.get()
+            nested = kind in active
+            reset_token = None if nested else _active_timers.set(active + (kind,))
+            start = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                observe_operation(kind, method, elapsed)
+                if not nested:
+                    add_timing(kind, elapsed)
+                    _active_timers.reset(reset_token)
+        
+        return decorated_function
+    
+    return decorator
+
+
+def sanitize_query(query_string):
+    """
+    Remove valores de parâmetros sensíveis da query string
+    
+    Args:
+        query_string: Query string (bytes ou str)
+    
+    Returns:
+        str: Query string sanitizada
+    """
+    if not query_string:
+        return ''
+    if isinstance(query_string, bytes):
+        query_string = query_string.decode('utf-8', 'replace')
+    
+    pairs = parse_qsl(query_string, keep_blank_values=True)
+    return urlencode([
+        (key, '***' if key in REDACTED_QUERY_PARAMS else value)
+        for key, value in pairs
+    ], safe='*')
+
+
+def bind_metrics(metrics):
+    """
+    Torna as métricas informadas as da requisição atual (contexto corrente)
+    
+    Args:
+        metrics: RequestMetrics ou None
+    
+    Returns:
+        Token: Token para restaurar o valor anterior com reset_metrics()
+    """
+    return _current_metrics.set(metrics)
+
+
+def reset_metrics(token):
+    """Restaura as métricas anteriores a bind_metrics()"""
+    _current_metrics.reset(token)
+
+
+def _should_log(metrics):
+    """Decide se a requisição entra no access log (erros e lentas sempre entram)"""
+    if metrics.status is None or metrics.status >= 400:
+        return True
+    if metrics.elapsed_ms() >= Config.ACCESS_LOG_SLOW_MS:
+        return True
+    return random.random() < Config.ACCESS_LOG_SAMPLE_RATE
+
+
+def emit_access_log(metrics):
+    """Emite a linha de access log da requisição (sujeita à amostragem)"""
+    if not _should_log(metrics):
+        return
+    
+    access_logger.info(
+        "Requisição finalizada",
+        extra={'fields': metrics.to_dict()}
+    )
+
+
+def timing_headers(metrics, path, origin=None):
+    """
+    Headers Server-Timing (e Timing-Allow-Origin) de uma resposta
+    
+    Args:
+        metrics: RequestMetrics da requisição
+        path: Caminho da requisição
+        origin: Header Origin da requisição, se houver
+    
+    Returns:
+        list: Pares (nome, valor); vazia fora de /api/* ou se desabilitado
+    """
+    if not Config.SERVER_TIMING_ENABLED or not path.startswith('/api/'):
+        return []
+    
+    headers = [('Server-Timing', metrics.server_timing())]
+    
+    # Sem Timing-Allow-Origin o navegador oculta os tempos de outra origem
+    if origin and origin in Config.CORS_ORIGINS:
+        headers.append(('Timing-Allow-Origin', origin))
+    return headers
+
+
+def init_request_context(app):
+    """
+    Registra os hooks que criam o contexto de métricas, adicionam o header
+    Server-Timing às respostas /api/* e emitem o access log
+    
+    Args:
+        app: Aplicação Flask
+    """
+    @app.before_request
+    def begin_request_metrics():
+        metrics = RequestMetrics(
+            request.method,
+            request.path,
+            query=sanitize_query(request.query_string),
+            remote_addr=request.remote_addr
+        )
+        metrics.endpoint = request.endpoint
+        g.request_metrics = metrics
+        _current_metrics.set(metrics)
+    
+    @app.after_request
+    def finish_request_metrics(response):
+        metrics = g.get('request_metrics')
+        if metrics is None:
+            return response
+        
+        metrics.status = response.status_code
+        if response.content_length:
+            metrics.bytes_sent += response.content_length
+        
+        for name, value in timing_headers(metrics, request.path, request.headers.get('Origin')):
+            response.headers[name] = value
+        
+        # Emitir após o envio do corpo, para incluir o tempo de streaming
+        response.call_on_close(lambda: emit_access_log(metrics))
+        return response
+    
+    @app.teardown_request
+    def clear_request_metrics(exc):
+        _current_metrics.set(None)
@@ -0,0 +1,249 @@
+"""
+Cache de respostas por usuário
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Cache em memória (por processo) das respostas JSON das listagens,
+chaveado por usuário, rota e query string normalizada. As entradas expiram
+por TTL e são invalidadas quando a versão dos dados do Guacamole muda;
+requisições idênticas simultâneas compartilham um único cálculo
+(single-flight).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request
+from app.config import Config
+from app.database import GuacamoleQueries
+from app.utils.logger import setup_logger
+from app.utils.request_context import REDACTED_QUERY_PARAMS, record_cache
+
+logger = setup_logger(__name__)
+
+# Tempo máximo que uma requisição aguarda o cálculo de outra idêntica
+SINGLE_FLIGHT_WAIT_SECONDS = 30
+
+
+class _Entry:
+    """Resposta armazenada"""
+    
+    __slots__ = ('version', 'expires_at', 'body', 'status', 'mimetype')
+    
+    def __init__(self, version, expires_at, body, status, mimetype):
+        self.version = version
+        self.expires_at = expires_at
+        self.body = body
+        self.status = status
+        self.mimetype = mimetype
+
+
+class _Flight:
+    """Cálculo em andamento compartilhado pelas requisições idênticas"""
+    
+    __slots__ = ('done', 'entry')
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.entry = None
+
+
+class ResponseCache:
+    """Cache LRU de respostas com TTL, versão dos dados e single-flight"""
+    
+    def __init__(self, ttl, max_entries, version_interval):
+        """
+        Inicializa o cache
+        
+        Args:
+            ttl: Validade das entradas em segundos
+            max_entries: Número máximo de entradas (LRU)
+            version_interval: Intervalo mínimo entre consultas de versão
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version_interval = version_interval
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._version = None
+        self._version_checked = 0.0
+        self._version_lock = threading.Lock()
+        self._queries = GuacamoleQueries()
+    
+    def data_version(self):
+        """
+        Obtém a versão dos dados, consultando o banco no máximo uma vez por
+        version_interval
+        
+        Returns:
+            tuple: Versão atual dos dados
+        """
+        if self._version is not None and time.monotonic() - self._version_checked < self.version_interval:
+            return self._version
+        
+        with self._version_lock:
+            if self._version is None or time.monotonic() - self._version_checked >= self.version_interval:
+                version = self._queries.get_data_version()
+                if self._version is not None and version != self._version:
+                    logger.debug("Versão dos dados alterada: %s -> %s", self._version, version)
+                self._version = version
+                self._version_checked = time.monotonic()
+            return self._version
+    
+    def _lookup(self, key, version):
+        """Retorna a entrada válida da chave (chamado com o lock adquirido)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.version != version or entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+    
+    def _store(self, key, entry):
+        """Armazena a entrada removendo as menos usadas (chamado com o lock adquirido)"""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def get_or_compute(self, key, version, compute):
+        """
+        Obtém a resposta da chave ou a calcula uma única vez
+        
+        Args:
+            key: Chave da resposta
+            version: Versão atual dos dados (data_version())
+            compute: Função sem argumentos que retorna a Response da view
+        
+        Returns:
+            tuple: (_Entry ou Response, acerto de cache)
+        """
+        with self._lock:
+            entry = self._lookup(key, version)
+            if entry is not None:
+                return entry, True
+            
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+        
+        if not leader:
+            # Outra requisição idêntica já está calculando: aguarda o resultado
+            if flight.done.wait(SINGLE_FLIGHT_WAIT_SECONDS) and flight.entry is not None:
+                return flight.entry, True
+            return compute(), False
+        
+        entry = None
+        try:
+            response = compute()
+            if response.status_code == 200 and not response.direct_passthrough:
+                entry = _Entry(
+                    version, time.monotonic() + self.ttl,
+                    response.get_data(), response.status_code, response.mimetype
+                )
+            return response, False
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                if entry is not None:
+                    self._store(key, entry)
+            flight.entry = entry
+            flight.done.set()
+    
+    def stats(self):
+        """
+        Estado do cache
+        
+        Returns:
+            dict: Entradas, cálculos em andamento e versão dos dados
+        """
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'inflight': len(self._inflight),
+                'ttl': self.ttl,
+                'data_version': list(self._version) if self._version is not None else None
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """
+    Obtém o cache de respostas do processo
+    
+    Returns:
+        ResponseCache: Cache compartilhado
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(
+                    Config.RESPONSE_CACHE_TTL,
+                    Config.RESPONSE_CACHE_MAX_ENTRIES,
+                    Config.RESPONSE_CACHE_VERSION_INTERVAL
+                )
+    return _cache
+
+
+def _normalized_args():
+    """
+    Parâmetros como as views os leem (request.args.get: primeiro valor, sem
+    strip), ordenados pelo nome e sem os parâmetros de controle
+    """
+    return tuple(sorted(
+        (name, request.args.get(name))
+        for name in request.args
+        if name not in REDACTED_QUERY_PARAMS
+    ))
+
+
+def cached_response(f):
+    """
+    Decorador que armazena em cache a resposta da view por usuário, rota e
+    query string normalizada. Deve ser aplicado abaixo de token_required.
+    
+    Args:
+        f: View a ser decorada
+    
+    Returns:
+        function: Função decorada
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not Config.RESPONSE_CACHE_ENABLED:
+            return f(*args, **kwargs)
+        
+        key = (
+            kwargs.get('current_user'),
+            request.endpoint,
+            tuple(sorted((request.view_args or {}).items())),
+            _normalized_args()
+        )
+        
+        cache = get_response_cache()
+        try:
+            version = cache.data_version()
+        except Exception as e:
+            # Sem a versão dos dados não há como validar o cache
+            logger.warning("Cache de respostas ignorado: %s", e)
+            return f(*args, **kwargs)
+        
+        result, hit = cache.get_or_compute(
+            key, version, lambda: current_app.make_response(f(*args, **kwargs))
+        )
+        
+        record_cache(hit)
+        if isinstance(result, _Entry):
+            return current_app.response_class(result.body, status=result.status, mimetype=result.mimetype)
+        return result
+    
+    return decorated_function
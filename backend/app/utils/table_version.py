@@ -0,0 +1,93 @@
+"""
+Versões de conjuntos de tabelas
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Versões baratas (contadores de escrita do pg_stat) de grupos de
+tabelas específicos, consultadas no máximo uma vez por intervalo. Os caches
+de permissões e da árvore de grupos usam estas versões, e não a versão dos
+dados do cache de respostas, que muda a cada sessão do histórico.
+"""
+
+import threading
+import time
+from app.config import Config
+from app.database import GROUP_TREE_TABLES, PERMISSION_TABLES, GuacamoleQueries
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class TableVersion:
+    """Versão de um conjunto de tabelas, com consulta limitada por intervalo"""
+    
+    def __init__(self, name, tables, interval):
+        """
+        Inicializa a versão (consultada sob demanda)
+        
+        Args:
+            name: Nome para os logs
+            tables: Tabelas acompanhadas
+            interval: Intervalo mínimo entre consultas, em segundos
+        """
+        self.name = name
+        self.tables = tuple(tables)
+        self.interval = interval
+        self._version = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self._queries = GuacamoleQueries()
+    
+    def get(self):
+        """
+        Obtém a versão atual
+        
+        Returns:
+            int: Versão das tabelas
+        """
+        if self._version is not None and time.monotonic() - self._checked < self.interval:
+            return self._version
+        
+        with self._lock:
+            if self._version is None or time.monotonic() - self._checked >= self.interval:
+                version = self._queries.get_table_version(self.tables)
+                if self._version is not None and version != self._version:
+                    logger.debug("Versão de %s alterada: %s -> %s", self.name, self._version, version)
+                self._version = version
+                self._checked = time.monotonic()
+            return self._version
+
+
+_versions = {}
+_versions_lock = threading.Lock()
+
+
+def _table_version(name, tables):
+    """Versão compartilhada do processo, criada no primeiro uso"""
+    version = _versions.get(name)
+    if version is None:
+        with _versions_lock:
+            version = _versions.get(name)
+            if version is None:
+                version = TableVersion(name, tables, Config.RESPONSE_CACHE_VERSION_INTERVAL)
+                _versions[name] = version
+    return version.get()
+
+
+def permissions_version():
+    """
+    Versão das tabelas de permissões, usuários e grupos de usuários
+    
+    Returns:
+        int: Versão atual
+    """
+    return _table_version('permissions', PERMISSION_TABLES)
+
+
+def group_tree_version():
+    """
+    Versão das tabelas da árvore de grupos de conexões
+    
+    Returns:
+        int: Versão atual
+    """
+    return _table_version('group_tree', GROUP_TREE_TABLES)
@@ -0,0 +1,14 @@
+"""
+Ponto de entrada ASGI do GuacPlayer Backend
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Expõe a aplicação assíncrona para servidores ASGI
+    uvicorn asgi:app --workers 4
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+"""
+
+import os
+from app.asgi import create_asgi_app
+from app.config import config_by_name
+
+app = create_asgi_app(config_by_name.get(os.getenv('FLASK_ENV', 'production'), config_by_name['production']))
@@ -0,0 +1,391 @@
+"""
+Benchmark de ponta a ponta das rotas /api/*
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Gera (ou reutiliza) um banco Guacamole sintético e uma árvore de
+gravações, executa cada rota /api/* em processo com o test client do Flask e
+grava os resultados em JSON, opcionalmente comparando com uma baseline
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_api --output results.json
+    python -m benchmarks.bench_api --dsn "host=... dbname=bench" --skip-generate \\
+        --recordings-dir /tmp/recordings --baseline baseline.json
+"""
+
+import argparse
+import itertools
+import os
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+import psycopg2
+from psycopg2.extensions import parse_dsn
+from benchmarks.postgres import benchmark_database
+from benchmarks.reporting import (
+    summarize, run_metadata, write_results, load_results, find_regressions
+)
+
+SERVER_TIMING_PATTERN = re.compile(r'(\w+);dur=([\d.]+)')
+
+# Cenários: nome, método, regra da rota (para checar cobertura) e caminho
+# com campos preenchidos a partir do contexto ({connection_id}, {page}, ...)
+SCENARIOS = [
+    {'name': 'health', 'method': 'GET', 'rule': '/api/health', 'path': '/api/health', 'auth': False},
+    {'name': 'ready', 'method': 'GET', 'rule': '/api/ready', 'path': '/api/ready', 'auth': False},
+    {'name': 'metrics', 'method': 'GET', 'rule': '/api/metrics', 'path': '/api/metrics', 'auth': False},
+    {'name': 'auth_login', 'method': 'POST', 'rule': '/api/auth/login', 'path': '/api/auth/login',
+     'auth': False, 'json': 'credentials'},
+    {'name': 'auth_verify', 'method': 'GET', 'rule': '/api/auth/verify', 'path': '/api/auth/verify'},
+    {'name': 'auth_logout', 'method': 'POST', 'rule': '/api/auth/logout', 'path': '/api/auth/logout'},
+    {'name': 'connections_list', 'method': 'GET', 'rule': '/api/connections',
+     'path': '/api/connections?page={page}&per_page=20'},
+    {'name': 'connections_list_fields', 'method': 'GET', 'rule': '/api/connections',
+     'path': '/api/connections?page={page}&per_page=20&fields=connection_id,connection_name,protocol'},
+    {'name': 'connections_search', 'method': 'GET', 'rule': '/api/connections',
+     'path': '/api/connections?search={search}&page=1&per_page=20'},
+    {'name': 'connection_groups', 'method': 'GET', 'rule': '/api/connections/groups',
+     'path': '/api/connections/groups'},
+    {'name': 'connections_list_root', 'method': 'GET', 'rule': '/api/connections',
+     'path': '/api/connections?group_id=root&recursive=false&per_page=20'},
+    {'name': 'connections_bulk', 'method': 'POST', 'rule': '/api/connections/bulk',
+     'path': '/api/connections/bulk', 'json': {'ids': ['{connection_id}'] * 200}},
+    {'name': 'connection_detail', 'method': 'GET', 'rule': '/api/connections/<int:connection_id>',
+     'path': '/api/connections/{connection_id}'},
+    {'name': 'connection_history', 'method': 'GET', 'rule': '/api/connections/<int:connection_id>/history',
+     'path': '/api/connections/{connection_id}/history?page={page}&per_page=20'},
+    {'name': 'connection_history_recorded', 'method': 'GET',
+     'rule': '/api/connections/<int:connection_id>/history',
+     'path': '/api/connections/{connection_id}/history?has_recording=true&page=1&per_page=20'},
+    {'name': 'history_search', 'method': 'GET', 'rule': '/api/history',
+     'path': '/api/history?per_page=20'},
+    {'name': 'history_search_protocol', 'method': 'GET', 'rule': '/api/history',
+     'path': '/api/history?protocol=rdp&per_page=20'},
+    {'name': 'analytics_sessions', 'method': 'GET', 'rule': '/api/analytics/sessions',
+     'path': '/api/analytics/sessions'},
+    {'name': 'analytics_sessions_user', 'method': 'GET', 'rule': '/api/analytics/sessions',
+     'path': '/api/analytics/sessions?by=user&limit=50'},
+    {'name': 'recording_info', 'method': 'GET', 'rule': '/api/recordings/<history_uuid>',
+     'path': '/api/recordings/{recording}'},
+    {'name': 'recordings_bulk', 'method': 'POST', 'rule': '/api/recordings/bulk',
+     'path': '/api/recordings/bulk', 'json': {'uuids': ['{recording}'] * 200}},
+    {'name': 'recording_files', 'method': 'GET', 'rule': '/api/recordings/<history_uuid>/files',
+     'path': '/api/recordings/{recording}/files'},
+    {'name': 'recording_stream_range', 'method': 'GET', 'rule': '/api/recordings/<history_uuid>/stream',
+     'path': '/api/recordings/{recording}/stream', 'headers': {'Range': 'bytes=0-1048575'}},
+    {'name': 'recording_download', 'method': 'GET', 'rule': '/api/recordings/<history_uuid>/download',
+     'path': '/api/recordings/{recording}/download'},
+    {'name': 'batch_dashboard', 'method': 'POST', 'rule': '/api/batch', 'path': '/api/batch',
+     'json': {'requests': [
+         {'id': 'verify', 'path': '/api/auth/verify'},
+         {'id': 'connections', 'path': '/api/connections?page={page}&per_page=20'},
+         {'id': 'connection', 'path': '/api/connections/{connection_id}'},
+         {'id': 'history', 'path': '/api/connections/{connection_id}/history?page=1&per_page=20'},
+         {'id': 'recording', 'path': '/api/recordings/{recording}'}
+     ]}},
+    {'name': 'admin_profiles', 'method': 'GET', 'rule': '/api/admin/profiles',
+     'path': '/api/admin/profiles', 'auth': 'admin'},
+    {'name': 'admin_indexes', 'method': 'GET', 'rule': '/api/admin/indexes',
+     'path': '/api/admin/indexes', 'auth': 'admin'},
+    {'name': 'admin_analytics_setup', 'method': 'POST', 'rule': '/api/admin/analytics/setup',
+     'path': '/api/admin/analytics/setup', 'auth': 'admin'},
+    {'name': 'admin_analytics_refresh', 'method': 'POST', 'rule': '/api/admin/analytics/refresh',
+     'path': '/api/admin/analytics/refresh?max_batches=1', 'auth': 'admin'},
+]
+
+# Rotas que não fazem sentido medir isoladamente
+EXCLUDED_RULES = {'/api/admin/profiles/<profile_name>', '/api/sessions/events'}
+
+BENCH_ADMIN_TOKEN = 'benchmark-admin-token'
+
+
+def configure_environment(dsn, recordings_dir):
+    """
+    Aponta a configuração da aplicação para o banco e a árvore sintéticos.
+    Precisa rodar antes de importar o pacote app (Config lê o ambiente).
+    
+    Args:
+        dsn: DSN do PostgreSQL
+        recordings_dir: Diretório das gravações
+    """
+    params = parse_dsn(dsn)
+    os.environ['DB_HOST'] = params.get('host', 'localhost')
+    os.environ['DB_PORT'] = params.get('port', '5432')
+    os.environ['DB_NAME'] = params.get('dbname', 'guacamole')
+    os.environ['DB_USER'] = params.get('user', 'guacamole')
+    os.environ['DB_PASSWORD'] = params.get('password', '')
+    os.environ['NFS_MOUNT_PATH'] = str(recordings_dir)
+    os.environ['ADMIN_TOKEN'] = BENCH_ADMIN_TOKEN
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ.setdefault('ACCESS_LOG_SAMPLE_RATE', '0')
+    # Mede o caminho completo; RESPONSE_CACHE_ENABLED=True mede os acertos de cache
+    os.environ.setdefault('RESPONSE_CACHE_ENABLED', 'False')
+
+
+def build_context(dsn, recordings_dir, samples=50):
+    """
+    Coleta valores reais para preencher os caminhos dos cenários
+    
+    Args:
+        dsn: DSN do PostgreSQL
+        recordings_dir: Diretório das gravações
+        samples: Quantidade de valores por campo
+    
+    Returns:
+        dict: Iteradores cíclicos por campo
+    """
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT connection_id FROM guacamole_connection
+                ORDER BY connection_id
+                LIMIT %s
+            """, (samples,))
+            connection_ids = [row[0] for row in cursor.fetchall()]
+            cursor.execute("SELECT count(*) FROM guacamole_connection")
+            total_connections = cursor.fetchone()[0]
+    finally:
+        conn.close()
+    
+    recordings = sorted(p.name for p in Path(recordings_dir).iterdir() if p.is_dir())[:samples]
+    pages = max(1, min(50, total_connections // 20))
+    
+    return {
+        'connection_id': itertools.cycle(connection_ids or [1]),
+        'page': itertools.cycle(range(1, pages + 1)),
+        'search': itertools.cycle(['conn-00', 'rdp', 'ssh', 'conn-01']),
+        'recording': itertools.cycle(recordings or ['missing'])
+    }
+
+
+def _format_path(template, context):
+    """Preenche o caminho do cenário com o próximo valor de cada campo"""
+    fields = {
+        name: next(context[name])
+        for name in re.findall(r'\{(\w+)\}', template)
+    }
+    return template.format(**fields)
+
+
+def _format_body(template, context):
+    """
+    Preenche recursivamente os textos do corpo JSON do cenário; um texto que
+    é só "{campo}" recebe o valor com o tipo original (ex.: IDs inteiros)
+    """
+    if isinstance(template, str):
+        match = re.fullmatch(r'\{(\w+)\}', template)
+        if match:
+            return next(context[match.group(1)])
+        return _format_path(template, context)
+    if isinstance(template, list):
+        return [_format_body(item, context) for item in template]
+    if isinstance(template, dict):
+        return {key: _format_body(value, context) for key, value in template.items()}
+    return template
+
+
+def _parse_server_timing(header):
+    """Converte o header Server-Timing em dicionário {nome: ms}"""
+    return {name: float(value) for name, value in SERVER_TIMING_PATTERN.findall(header or '')}
+
+
+def run_scenario(client, scenario, context, headers, credentials, iterations, warmup):
+    """
+    Executa um cenário e resume as latências
+    
+    Args:
+        client: Test client do Flask
+        scenario: Definição do cenário
+        context: Iteradores de valores
+        headers: Headers por tipo de autenticação
+        credentials: Credenciais de login
+        iterations: Execuções medidas
+        warmup: Execuções de aquecimento (não medidas)
+    
+    Returns:
+        dict: Estatísticas do cenário
+    """
+    request_headers = dict(headers.get(scenario.get('auth', 'user')) or {})
+    request_headers.update(scenario.get('headers', {}))
+    template = scenario.get('json')
+    
+    latencies = []
+    status_codes = {}
+    timing_totals = {}
+    errors = 0
+    
+    for index in range(warmup + iterations):
+        path = _format_path(scenario['path'], context)
+        body = credentials if template == 'credentials' else _format_body(template, context)
+        
+        start = time.perf_counter()
+        response = client.open(path, method=scenario['method'], headers=request_headers, json=body)
+        response.get_data()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        response.close()
+        
+        if index < warmup:
+            continue
+        
+        latencies.append(elapsed_ms)
+        status_codes[response.status_code] = status_codes.get(response.status_code, 0) + 1
+        if response.status_code >= 500:
+            errors += 1
+        
+        for name, value in _parse_server_timing(response.headers.get('Server-Timing')).items():
+            timing_totals[name] = timing_totals.get(name, 0.0) + value
+    
+    stats = summarize(latencies)
+    stats.update({
+        'rule': scenario['rule'],
+        'method': scenario['method'],
+        'errors': errors,
+        'status_codes': {str(code): count for code, count in sorted(status_codes.items())},
+        'server_timing_mean_ms': {
+            name: round(total / len(latencies), 3) for name, total in timing_totals.items()
+        }
+    })
+    return stats
+
+
+def uncovered_routes(app):
+    """Lista as rotas /api/* sem cenário de benchmark"""
+    covered = {(s['rule'], s['method']) for s in SCENARIOS}
+    missing = []
+    
+    for rule in app.url_map.iter_rules():
+        if not rule.rule.startswith('/api/') or rule.rule in EXCLUDED_RULES:
+            continue
+        for method in sorted(rule.methods - {'HEAD', 'OPTIONS'}):
+            if (rule.rule, method) not in covered:
+                missing.append('%s %s' % (method, rule.rule))
+    
+    return missing
+
+
+def run_benchmarks(dsn, recordings_dir, iterations, warmup, only=None, log=print):
+    """
+    Executa todos os cenários contra a aplicação em processo
+    
+    Args:
+        dsn: DSN do PostgreSQL
+        recordings_dir: Diretório das gravações
+        iterations: Execuções medidas por cenário
+        warmup: Execuções de aquecimento por cenário
+        only: Nomes de cenários a executar (opcional)
+        log: Função de progresso
+    
+    Returns:
+        tuple: (estatísticas por cenário, rotas sem cobertura)
+    """
+    configure_environment(dsn, recordings_dir)
+    
+    from app import create_app
+    from benchmarks.synthetic_data import BENCH_USERNAME, BENCH_PASSWORD
+    
+    app = create_app()
+    client = app.test_client()
+    credentials = {'username': BENCH_USERNAME, 'password': BENCH_PASSWORD}
+    
+    login = client.post('/api/auth/login', json=credentials)
+    if login.status_code != 200:
+        raise RuntimeError("Falha no login do usuário de benchmark: %s" % login.get_data(as_text=True))
+    
+    headers = {
+        False: {},
+        'user': {'Authorization': 'Bearer %s' % login.get_json()['token']},
+        'admin': {'X-Admin-Token': BENCH_ADMIN_TOKEN}
+    }
+    
+    # Tabelas de rollup (passo administrativo) antes dos cenários de análise
+    setup = client.post('/api/admin/analytics/setup', headers=headers['admin'])
+    if setup.status_code != 200:
+        raise RuntimeError("Falha ao criar tabelas de rollup: %s" % setup.get_data(as_text=True))
+    context = build_context(dsn, recordings_dir)
+    
+    routes = {}
+    for scenario in SCENARIOS:
+        if only and scenario['name'] not in only:
+            continue
+        log("Executando %s" % scenario['name'])
+        routes[scenario['name']] = run_scenario(
+            client, scenario, context, headers, credentials, iterations, warmup
+        )
+    
+    return routes, uncovered_routes(app)
+
+
+def main(argv=None):
+    """Ponto de entrada de linha de comando"""
+    parser = argparse.ArgumentParser(description='Benchmark das rotas /api/*')
+    parser.add_argument('--dsn', default=os.getenv('BENCH_DSN'),
+                        help='PostgreSQL existente (padrão: cluster temporário via initdb)')
+    parser.add_argument('--skip-generate', action='store_true',
+                        help='Reutiliza dados já gerados no DSN informado')
+    parser.add_argument('--recordings-dir', help='Árvore de gravações (padrão: diretório temporário)')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--only', nargs='*', help='Executa apenas os cenários informados')
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--baseline', help='Resultados anteriores para detectar regressões')
+    parser.add_argument('--max-regression', type=float, default=1.25,
+                        help='Fator máximo tolerado sobre p50/p95 da baseline')
+    
+    from benchmarks.synthetic_data import add_scale_arguments, scale_from_args
+    add_scale_arguments(parser)
+    args = parser.parse_args(argv)
+    
+    if args.skip_generate and not (args.dsn and args.recordings_dir):
+        parser.error('--skip-generate requer --dsn e --recordings-dir')
+    
+    recordings_dir = args.recordings_dir or tempfile.mkdtemp(prefix='guacplayer-bench-recordings-')
+    scale = scale_from_args(args)
+    
+    with benchmark_database(args.dsn) as dsn:
+        if not args.skip_generate:
+            from benchmarks.synthetic_data import generate
+            generate(
+                dsn,
+                recordings_dir=recordings_dir,
+                recordings=args.recordings,
+                video_size=args.video_size,
+                **scale
+            )
+        
+        routes, missing = run_benchmarks(dsn, recordings_dir, args.iterations, args.warmup, only=args.only)
+    
+    results = {
+        'meta': run_metadata(
+            scale=scale,
+            recordings=args.recordings,
+            iterations=args.iterations,
+            warmup=args.warmup
+        ),
+        'routes': routes,
+        'uncovered_routes': missing
+    }
+    write_results(args.output, results)
+    
+    print("\n%-26s %8s %9s %9s %9s %7s" % ('rota', 'n', 'p50 ms', 'p95 ms', 'p99 ms', 'erros'))
+    for name, stats in routes.items():
+        print("%-26s %8d %9.2f %9.2f %9.2f %7d" % (
+            name, stats['count'], stats['p50_ms'], stats['p95_ms'], stats['p99_ms'], stats['errors']
+        ))
+    
+    if missing:
+        print("\nRotas sem cenário de benchmark: %s" % ', '.join(missing))
+    
+    if args.baseline:
+        regressions = find_regressions(results, load_results(args.baseline), max_ratio=args.max_regression)
+        for item in regressions:
+            print("REGRESSÃO %(route)s %(metric)s: %(baseline).2f -> %(current).2f ms (x%(ratio)s)" % item)
+        if regressions:
+            return 1
+    
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
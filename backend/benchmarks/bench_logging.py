@@ -0,0 +1,120 @@
+"""
+Micro-benchmark do pipeline de logging
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Compara o JSONFormatter atual com a implementação anterior
+(datetime.utcnow + json.dumps) e mede o custo de registros filtrados.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_logging [--iterations N] [--output arquivo.json]
+"""
+
+import argparse
+import json
+import logging
+import sys
+import timeit
+from datetime import datetime
+from app.utils import logger as app_logger
+from app.utils.logger import JSONFormatter
+
+
+class LegacyJSONFormatter(logging.Formatter):
+    """Formatter anterior, mantido aqui apenas como referência de desempenho"""
+    
+    def format(self, record):
+        """Formata registro de log como JSON (implementação original)"""
+        log_data = {
+            'timestamp': datetime.utcnow().isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'function': record.funcName,
+            'line': record.lineno
+        }
+        
+        if record.exc_info:
+            log_data['exception'] = self.formatException(record.exc_info)
+        
+        return json.dumps(log_data, ensure_ascii=False)
+
+
+class _ExpensiveArg:
+    """Argumento cuja formatação custa caro, para medir formatação preguiçosa"""
+    
+    def __str__(self):
+        return ','.join(str(i) for i in range(200))
+
+
+def _make_record():
+    """Cria um registro típico de rota"""
+    return logging.LogRecord(
+        'app.connections.services', logging.INFO, __file__, 42,
+        "Histórico da conexão %s recuperado: página %s, total %s", (17, 3, 12345), None,
+        func='get_connection_history_paginated'
+    )
+
+
+def _per_call_us(stmt, iterations):
+    """Executa o trecho e retorna o custo médio por chamada em microssegundos"""
+    best = min(timeit.repeat(stmt, number=iterations, repeat=5))
+    return best / iterations * 1000000
+
+
+def run(iterations):
+    """
+    Executa o benchmark
+    
+    Args:
+        iterations: Número de chamadas por medição
+    
+    Returns:
+        dict: Custo por chamada (µs) de cada cenário
+    """
+    record = _make_record()
+    legacy = LegacyJSONFormatter()
+    current = JSONFormatter()
+    
+    # Logger com nível WARNING: chamadas DEBUG são descartadas sem formatação
+    filtered = logging.getLogger('benchmarks.filtered')
+    filtered.setLevel(logging.WARNING)
+    filtered.propagate = False
+    expensive = _ExpensiveArg()
+    
+    results = {
+        'orjson': app_logger.orjson is not None,
+        'format_legacy_us': _per_call_us(lambda: legacy.format(record), iterations),
+        'format_current_us': _per_call_us(lambda: current.format(record), iterations),
+        'filtered_fstring_us': _per_call_us(lambda: filtered.debug(f"Valor: {expensive}"), iterations),
+        'filtered_lazy_args_us': _per_call_us(lambda: filtered.debug("Valor: %s", expensive), iterations)
+    }
+    results['format_speedup'] = results['format_legacy_us'] / results['format_current_us']
+    
+    return results
+
+
+def main(argv=None):
+    """Ponto de entrada de linha de comando"""
+    parser = argparse.ArgumentParser(description='Micro-benchmark do logging')
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--output', help='Arquivo JSON para gravar os resultados')
+    args = parser.parse_args(argv)
+    
+    results = run(args.iterations)
+    
+    for name, value in results.items():
+        if isinstance(value, float):
+            print(f"{name:28s} {value:10.3f}")
+        else:
+            print(f"{name:28s} {value}")
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
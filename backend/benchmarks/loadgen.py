@@ -0,0 +1,578 @@
+"""
+Gerador de carga com misturas de tráfego realistas
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Executa uma mistura configurável de usuários virtuais (ex.: auditores
+navegando em vídeos com requisições Range + usuários do dashboard paginando)
+contra um backend em execução, ou reproduz arquivos de access log capturados.
+Reporta p50/p95/p99, vazão e taxa de erros por rota.
+
+Uso (a partir de backend/):
+    python -m benchmarks.loadgen --url http://localhost:5000 \\
+        --mix "50 auditor + 200 dashboard" --duration 120
+    python -m benchmarks.loadgen --mix-file mix.json --output load.json
+    python -m benchmarks.loadgen --replay access.log --speed 2
+
+Arquivo de mistura (JSON):
+    {
+        "duration": 120,
+        "ramp_up": 10,
+        "groups": [
+            {"behavior": "auditor", "users": 50, "think_time": 1.0},
+            {"behavior": "dashboard", "users": 200, "think_time": 3.0},
+            {"behavior": "steps", "users": 5, "steps": [
+                {"name": "history", "path": "/api/connections/{connection_id}/history?page={page}"}
+            ]}
+        ]
+    }
+"""
+
+import argparse
+import http.client
+import json
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from urllib.parse import urlsplit, urlencode, parse_qsl
+from benchmarks.reporting import summarize, run_metadata, write_results
+
+ACCESS_LOG_MESSAGE = 'Requisição finalizada'
+
+# Parâmetros de query que não devem ser reenviados na reprodução
+REPLAY_DROPPED_PARAMS = {'token', 'profile'}
+
+RANGE_CHUNK = 1024 * 1024
+
+MIX_PATTERN = re.compile(r'(\d+)\s+(\w+)')
+
+
+class Recorder:
+    """Acumula latências, status e erros por rota (thread-safe)"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+        self.started = None
+        self.finished = None
+    
+    def record(self, route, elapsed_ms, status, nbytes=0):
+        """
+        Registra uma requisição
+        
+        Args:
+            route: Nome da rota
+            elapsed_ms: Latência em milissegundos
+            status: Código HTTP (None para falha de conexão)
+            nbytes: Bytes recebidos no corpo
+        """
+        with self._lock:
+            entry = self._routes.setdefault(route, {
+                'latencies': [], 'status_codes': {}, 'errors': 0, 'bytes': 0
+            })
+            entry['latencies'].append(elapsed_ms)
+            entry['bytes'] += nbytes
+            key = str(status) if status is not None else 'connection_error'
+            entry['status_codes'][key] = entry['status_codes'].get(key, 0) + 1
+            if status is None or status >= 500:
+                entry['errors'] += 1
+    
+    def report(self):
+        """
+        Resume os resultados
+        
+        Returns:
+            dict: Estatísticas por rota e totais
+        """
+        elapsed = max((self.finished or time.monotonic()) - (self.started or 0), 1e-9)
+        routes = {}
+        total_requests = 0
+        total_errors = 0
+        
+        with self._lock:
+            for route, entry in sorted(self._routes.items()):
+                stats = summarize(entry['latencies'])
+                stats.update({
+                    'throughput_rps': round(stats['count'] / elapsed, 2),
+                    'errors': entry['errors'],
+                    'error_rate': round(entry['errors'] / stats['count'], 4) if stats['count'] else 0.0,
+                    'status_codes': entry['status_codes'],
+                    'bytes_received': entry['bytes']
+                })
+                routes[route] = stats
+                total_requests += stats['count']
+                total_errors += entry['errors']
+        
+        return {
+            'routes': routes,
+            'totals': {
+                'duration_s': round(elapsed, 2),
+                'requests': total_requests,
+                'throughput_rps': round(total_requests / elapsed, 2),
+                'errors': total_errors,
+                'error_rate': round(total_errors / total_requests, 4) if total_requests else 0.0
+            }
+        }
+
+
+class LoadClient:
+    """Cliente HTTP de um usuário virtual (conexão keep-alive própria)"""
+    
+    def __init__(self, base_url, recorder, token=None, timeout=30, stop=None):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port
+        self.https = parts.scheme == 'https'
+        self.prefix = parts.path.rstrip('/')
+        self.recorder = recorder
+        self.token = token
+        self.timeout = timeout
+        self.stop = stop
+        self._conn = None
+    
+    def _connection(self):
+        if self._conn is None:
+            factory = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            self._conn = factory(self.host, self.port, timeout=self.timeout)
+        return self._conn
+    
+    def running(self):
+        """Indica se a carga ainda está em execução"""
+        return self.stop is None or not self.stop.is_set()
+    
+    def close(self):
+        """Fecha a conexão"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+    
+    def request(self, route, path, method='GET', headers=None, body=None, record=True):
+        """
+        Executa uma requisição e registra a latência (até o fim do corpo)
+        
+        Args:
+            route: Nome da rota nos relatórios
+            path: Caminho com query string
+            method: Método HTTP
+            headers: Headers adicionais
+            body: Corpo JSON (opcional)
+            record: Registra no Recorder
+        
+        Returns:
+            tuple: (status, corpo em bytes) - status None em falha de conexão
+        """
+        request_headers = {'Accept': 'application/json'}
+        if self.token:
+            request_headers['Authorization'] = 'Bearer %s' % self.token
+        if body is not None:
+            body = json.dumps(body)
+            request_headers['Content-Type'] = 'application/json'
+        request_headers.update(headers or {})
+        
+        start = time.perf_counter()
+        try:
+            conn = self._connection()
+            conn.request(method, self.prefix + path, body=body, headers=request_headers)
+            response = conn.getresponse()
+            data = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            self.close()
+            status, data = None, b''
+        
+        if record:
+            self.recorder.record(route, (time.perf_counter() - start) * 1000, status, len(data))
+        return status, data
+    
+    def get_json(self, route, path, **kwargs):
+        """Executa um GET e decodifica o JSON (None se falhar)"""
+        status, data = self.request(route, path, **kwargs)
+        if status != 200:
+            return None
+        try:
+            return json.loads(data)
+        except ValueError:
+            return None
+
+
+def login(base_url, username, password):
+    """
+    Autentica no backend
+    
+    Args:
+        base_url: URL base do backend
+        username: Usuário
+        password: Senha
+    
+    Returns:
+        str: Token JWT
+    """
+    client = LoadClient(base_url, Recorder())
+    status, data = client.request(
+        'auth_login', '/api/auth/login', method='POST',
+        body={'username': username, 'password': password}, record=False
+    )
+    client.close()
+    
+    if status != 200:
+        raise RuntimeError("Falha no login (%s): %s" % (status, data[:200].decode('utf-8', 'replace')))
+    return json.loads(data)['token']
+
+
+def discover(client):
+    """
+    Descobre conexões e páginas disponíveis para os comportamentos
+    
+    Args:
+        client: LoadClient autenticado
+    
+    Returns:
+        dict: Contexto compartilhado entre os usuários virtuais
+    """
+    result = client.get_json('discovery', '/api/connections?page=1&per_page=100', record=False)
+    if not result:
+        raise RuntimeError("Não foi possível listar conexões para montar a carga")
+    
+    connection_ids = [conn['connection_id'] for conn in result.get('data', [])]
+    pagination = result.get('pagination', {})
+    
+    return {
+        'connection_ids': connection_ids or [1],
+        'pages': max(1, min(pagination.get('total', 0) // 20, 500)),
+        'history_ids': []
+    }
+
+
+def _fill(template, rng, context):
+    """Preenche os campos de um caminho de passo com valores do contexto"""
+    values = {
+        'connection_id': rng.choice(context['connection_ids']),
+        'page': rng.randint(1, context['pages']),
+        'history_id': rng.choice(context['history_ids']) if context['history_ids'] else 0
+    }
+    return template.format(**values)
+
+
+def dashboard_behavior(client, rng, context, group):
+    """Usuário do dashboard: lista, pagina, busca e abre detalhes de conexões"""
+    client.request('connections_list', '/api/connections?page=%d&per_page=20' % rng.randint(1, context['pages']))
+    
+    if rng.random() < 0.3:
+        term = rng.choice(('rdp', 'ssh', 'vnc', 'conn-0'))
+        client.request('connections_search', '/api/connections?search=%s&page=1&per_page=20' % term)
+    
+    connection_id = rng.choice(context['connection_ids'])
+    client.request('connection_detail', '/api/connections/%d' % connection_id)
+    
+    if rng.random() < 0.5:
+        client.request('connection_history', '/api/connections/%d/history?page=1&per_page=20' % connection_id)
+
+
+def auditor_behavior(client, rng, context, group):
+    """Auditor: abre o histórico, escolhe uma gravação e navega no vídeo com Range"""
+    connection_id = rng.choice(context['connection_ids'])
+    history = client.get_json(
+        'connection_history', '/api/connections/%d/history?page=1&per_page=20' % connection_id
+    )
+    entries = (history or {}).get('data') or []
+    if not entries:
+        return
+    
+    history_id = rng.choice(entries)['history_id']
+    status, _ = client.request('recording_info', '/api/recordings/%s' % history_id)
+    if status != 200:
+        return
+    
+    client.request('recording_files', '/api/recordings/%s/files' % history_id)
+    
+    # Primeiro trecho seguido de saltos aleatórios (scrubbing)
+    offsets = [0] + [rng.randint(0, 64) * RANGE_CHUNK for _ in range(group.get('seeks', 5))]
+    for offset in offsets:
+        client.request(
+            'recording_stream_range', '/api/recordings/%s/stream' % history_id,
+            headers={'Range': 'bytes=%d-%d' % (offset, offset + RANGE_CHUNK - 1)}
+        )
+        if not client.running():
+            return
+        time.sleep(rng.uniform(0, group.get('seek_pause', 0.5)))
+
+
+def steps_behavior(client, rng, context, group):
+    """Comportamento roteirizado: executa a lista de passos do grupo"""
+    for index, step in enumerate(group.get('steps', [])):
+        client.request(
+            step.get('name', 'step_%d' % index),
+            _fill(step['path'], rng, context),
+            method=step.get('method', 'GET'),
+            headers=step.get('headers'),
+            body=step.get('json')
+        )
+
+
+BEHAVIORS = {
+    'dashboard': dashboard_behavior,
+    'auditor': auditor_behavior,
+    'steps': steps_behavior
+}
+
+
+def parse_mix(text):
+    """
+    Converte uma mistura textual em grupos
+    
+    Args:
+        text: Ex.: "50 auditor + 200 dashboard"
+    
+    Returns:
+        list: Grupos no formato do arquivo de mistura
+    """
+    groups = [
+        {'behavior': behavior, 'users': int(users)}
+        for users, behavior in MIX_PATTERN.findall(text)
+    ]
+    if not groups:
+        raise ValueError("Mistura inválida: %r" % text)
+    return groups
+
+
+def run_mix(base_url, token, groups, duration, ramp_up=0.0, seed=None, log=print):
+    """
+    Executa uma mistura de usuários virtuais
+    
+    Args:
+        base_url: URL base do backend
+        token: Token JWT
+        groups: Grupos de usuários virtuais
+        duration: Duração em segundos
+        ramp_up: Tempo para iniciar todos os usuários, em segundos
+        seed: Semente aleatória (para repetibilidade)
+        log: Função de progresso
+    
+    Returns:
+        dict: Relatório do Recorder
+    """
+    for group in groups:
+        if group['behavior'] not in BEHAVIORS:
+            raise ValueError("Comportamento desconhecido: %s" % group['behavior'])
+    
+    recorder = Recorder()
+    setup_client = LoadClient(base_url, recorder, token=token)
+    context = discover(setup_client)
+    setup_client.close()
+    
+    total_users = sum(group['users'] for group in groups)
+    stop = threading.Event()
+    seeds = random.Random(seed)
+    threads = []
+    
+    def virtual_user(group, rng, delay):
+        client = LoadClient(base_url, recorder, token=token, stop=stop)
+        behavior = BEHAVIORS[group['behavior']]
+        think_time = group.get('think_time', 1.0)
+        
+        if stop.wait(delay):
+            return
+        try:
+            while not stop.is_set():
+                behavior(client, rng, context, group)
+                stop.wait(rng.expovariate(1 / think_time) if think_time else 0)
+        finally:
+            client.close()
+    
+    log("Iniciando %d usuários virtuais por %ss" % (total_users, duration))
+    recorder.started = time.monotonic()
+    
+    index = 0
+    for group in groups:
+        for _ in range(group['users']):
+            delay = ramp_up * index / max(total_users, 1)
+            thread = threading.Thread(
+                target=virtual_user,
+                args=(group, random.Random(seeds.random()), delay),
+                daemon=True
+            )
+            thread.start()
+            threads.append(thread)
+            index += 1
+    
+    stop.wait(duration)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=30)
+    recorder.finished = time.monotonic()
+    
+    return recorder.report()
+
+
+def read_access_log(paths, methods=('GET', 'HEAD')):
+    """
+    Lê as requisições registradas no access log estruturado
+    
+    Args:
+        paths: Arquivos de log (uma linha JSON por registro)
+        methods: Métodos reproduzidos (os demais não têm corpo no log)
+    
+    Returns:
+        list: (instante em segundos, método, caminho, nome da rota) em ordem
+    """
+    entries = []
+    
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                
+                if record.get('message') != ACCESS_LOG_MESSAGE or record.get('method') not in methods:
+                    continue
+                
+                query = [
+                    (key, value) for key, value in parse_qsl(record.get('query') or '', keep_blank_values=True)
+                    if key not in REPLAY_DROPPED_PARAMS
+                ]
+                target = record['path'] + ('?' + urlencode(query) if query else '')
+                started = _log_timestamp(record.get('timestamp')) - record.get('duration_ms', 0) / 1000
+                
+                entries.append((started, record['method'], target, record.get('endpoint') or record['path']))
+    
+    entries.sort(key=lambda entry: entry[0])
+    return entries
+
+
+def _log_timestamp(value):
+    """Converte o timestamp ISO do log em segundos"""
+    if not value:
+        return 0.0
+    try:
+        return time.mktime(time.strptime(value[:19], '%Y-%m-%dT%H:%M:%S')) + float('0' + value[19:26])
+    except ValueError:
+        return 0.0
+
+
+def replay(base_url, token, entries, speed=1.0, workers=50, log=print):
+    """
+    Reproduz requisições de access log respeitando os intervalos originais
+    
+    Args:
+        base_url: URL base do backend
+        token: Token JWT
+        entries: Requisições retornadas por read_access_log
+        speed: Fator de aceleração (0 = o mais rápido possível)
+        workers: Requisições simultâneas no máximo
+        log: Função de progresso
+    
+    Returns:
+        dict: Relatório do Recorder
+    """
+    recorder = Recorder()
+    pending = queue.Queue(maxsize=workers * 4)
+    
+    def worker():
+        client = LoadClient(base_url, recorder, token=token)
+        try:
+            while True:
+                item = pending.get()
+                if item is None:
+                    return
+                method, target, route = item
+                client.request(route, target, method=method)
+        finally:
+            client.close()
+    
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    
+    log("Reproduzindo %d requisições" % len(entries))
+    recorder.started = time.monotonic()
+    first = entries[0][0] if entries else 0.0
+    
+    for started, method, target, route in entries:
+        if speed:
+            wait = (started - first) / speed - (time.monotonic() - recorder.started)
+            if wait > 0:
+                time.sleep(wait)
+        pending.put((method, target, route))
+    
+    for _ in threads:
+        pending.put(None)
+    for thread in threads:
+        thread.join()
+    recorder.finished = time.monotonic()
+    
+    return recorder.report()
+
+
+def print_report(report):
+    """Imprime o relatório em tabela"""
+    print("\n%-32s %8s %9s %9s %9s %9s %8s" % ('rota', 'n', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'erros'))
+    for name, stats in report['routes'].items():
+        print("%-32s %8d %9.1f %9.2f %9.2f %9.2f %7.2f%%" % (
+            name, stats['count'], stats['throughput_rps'], stats['p50_ms'],
+            stats['p95_ms'], stats['p99_ms'], stats['error_rate'] * 100
+        ))
+    
+    totals = report['totals']
+    print("\nTotal: %d requisições em %.1fs (%.1f req/s), %.2f%% de erros" % (
+        totals['requests'], totals['duration_s'], totals['throughput_rps'], totals['error_rate'] * 100
+    ))
+
+
+def main(argv=None):
+    """Ponto de entrada de linha de comando"""
+    parser = argparse.ArgumentParser(description='Gerador de carga do backend GuacPlayer')
+    parser.add_argument('--url', default='http://localhost:5000', help='URL base do backend')
+    parser.add_argument('--username', default='benchmark')
+    parser.add_argument('--password', default='benchmark')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--mix', default='50 auditor + 200 dashboard', help='Ex.: "50 auditor + 200 dashboard"')
+    source.add_argument('--mix-file', help='Arquivo JSON com a mistura')
+    source.add_argument('--replay', nargs='+', metavar='LOG', help='Access logs a reproduzir')
+    parser.add_argument('--duration', type=float, default=60)
+    parser.add_argument('--ramp-up', type=float, default=0)
+    parser.add_argument('--think-time', type=float, help='Pausa média entre iterações (todos os grupos)')
+    parser.add_argument('--speed', type=float, default=1.0, help='Aceleração da reprodução (0 = máxima)')
+    parser.add_argument('--workers', type=int, default=50, help='Concorrência da reprodução')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--output', help='Grava o relatório em JSON')
+    args = parser.parse_args(argv)
+    
+    token = login(args.url, args.username, args.password)
+    
+    if args.replay:
+        entries = read_access_log(args.replay)
+        report = replay(args.url, token, entries, speed=args.speed, workers=args.workers)
+        meta = run_metadata(mode='replay', files=args.replay, speed=args.speed, workers=args.workers)
+    else:
+        duration, ramp_up = args.duration, args.ramp_up
+        if args.mix_file:
+            with open(args.mix_file, 'r', encoding='utf-8') as f:
+                spec = json.load(f)
+            groups = spec['groups']
+            duration = spec.get('duration', duration)
+            ramp_up = spec.get('ramp_up', ramp_up)
+        else:
+            groups = parse_mix(args.mix)
+        
+        if args.think_time is not None:
+            for group in groups:
+                group['think_time'] = args.think_time
+        
+        report = run_mix(args.url, token, groups, duration, ramp_up=ramp_up, seed=args.seed)
+        meta = run_metadata(mode='mix', groups=groups, duration=duration, ramp_up=ramp_up)
+    
+    print_report(report)
+    
+    if args.output:
+        report['meta'] = meta
+        write_results(args.output, report)
+    
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+PostgreSQL local para benchmarks
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Usa um PostgreSQL informado por DSN ou inicia um cluster temporário
+com initdb/pg_ctl (binários do PostgreSQL no PATH ou em PG_BIN_DIR)
+"""
+
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+import psycopg2
+
+
+def _pg_binary(name):
+    """Localiza um binário do PostgreSQL"""
+    bin_dir = os.getenv('PG_BIN_DIR')
+    if bin_dir:
+        candidate = os.path.join(bin_dir, name)
+        if os.path.exists(candidate):
+            return candidate
+    
+    path = shutil.which(name)
+    if not path:
+        raise RuntimeError(
+            f"Binário '{name}' do PostgreSQL não encontrado; informe --dsn "
+            f"ou defina PG_BIN_DIR"
+        )
+    return path
+
+
+def _free_port():
+    """Obtém uma porta TCP livre em localhost"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(dsn, timeout=30):
+    """Aguarda o servidor aceitar conexões"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            psycopg2.connect(dsn).close()
+            return
+        except psycopg2.OperationalError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+
+
+@contextmanager
+def temporary_postgres(user='guacamole', database='guacamole', keep=False):
+    """
+    Inicia um cluster PostgreSQL temporário e o remove ao final
+    
+    Args:
+        user: Superusuário do cluster
+        database: Banco criado para os benchmarks
+        keep: Mantém o diretório de dados ao final (para inspeção)
+    
+    Yields:
+        str: DSN de conexão
+    """
+    data_dir = tempfile.mkdtemp(prefix='guacplayer-bench-pg-')
+    port = _free_port()
+    log_file = os.path.join(data_dir, 'postgres.log')
+    
+    subprocess.run(
+        [_pg_binary('initdb'), '-D', os.path.join(data_dir, 'data'), '-U', user,
+         '--auth=trust', '--encoding=UTF8', '--no-sync'],
+        check=True, stdout=subprocess.DEVNULL
+    )
+    subprocess.run(
+        [_pg_binary('pg_ctl'), '-D', os.path.join(data_dir, 'data'), '-l', log_file,
+         '-o', f"-p {port} -k {data_dir} -c listen_addresses=127.0.0.1 -c fsync=off "
+               f"-c synchronous_commit=off -c full_page_writes=off",
+         'start'],
+        check=True, stdout=subprocess.DEVNULL
+    )
+    
+    try:
+        admin_dsn = f"host=127.0.0.1 port={port} user={user} dbname=postgres"
+        _wait_ready(admin_dsn)
+        
+        conn = psycopg2.connect(admin_dsn)
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f'CREATE DATABASE "{database}"')
+        conn.close()
+        
+        yield f"host=127.0.0.1 port={port} user={user} dbname={database}"
+    finally:
+        subprocess.run(
+            [_pg_binary('pg_ctl'), '-D', os.path.join(data_dir, 'data'), '-m', 'fast', 'stop'],
+            check=False, stdout=subprocess.DEVNULL
+        )
+        if not keep:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+@contextmanager
+def benchmark_database(dsn=None):
+    """
+    Obtém o banco dos benchmarks: o DSN informado ou um cluster temporário
+    
+    Args:
+        dsn: DSN de um PostgreSQL existente (opcional)
+    
+    Yields:
+        str: DSN de conexão
+    """
+    if dsn:
+        yield dsn
+        return
+    
+    with temporary_postgres() as temp_dsn:
+        yield temp_dsn
@@ -0,0 +1,135 @@
+"""
+Estatísticas e relatórios dos benchmarks
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Percentis de latência, gravação de resultados em JSON e
+comparação com uma execução de referência (baseline)
+"""
+
+import json
+import math
+import platform
+import subprocess
+import time
+
+
+def percentile(sorted_values, pct):
+    """
+    Percentil pelo método nearest-rank
+    
+    Args:
+        sorted_values: Valores em ordem crescente
+        pct: Percentil desejado (0-100)
+    
+    Returns:
+        float: Valor do percentil (0.0 se não houver valores)
+    """
+    if not sorted_values:
+        return 0.0
+    
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies_ms):
+    """
+    Resume uma série de latências
+    
+    Args:
+        latencies_ms: Latências em milissegundos
+    
+    Returns:
+        dict: Contagem, média, p50, p95, p99 e máximo
+    """
+    values = sorted(latencies_ms)
+    count = len(values)
+    
+    return {
+        'count': count,
+        'mean_ms': round(sum(values) / count, 3) if count else 0.0,
+        'p50_ms': round(percentile(values, 50), 3),
+        'p95_ms': round(percentile(values, 95), 3),
+        'p99_ms': round(percentile(values, 99), 3),
+        'max_ms': round(values[-1], 3) if count else 0.0
+    }
+
+
+def run_metadata(**extra):
+    """
+    Metadados da execução (data, revisão git, Python)
+    
+    Args:
+        **extra: Campos adicionais (ex.: escala dos dados)
+    
+    Returns:
+        dict: Metadados
+    """
+    try:
+        revision = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    
+    meta = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'git_revision': revision,
+        'python': platform.python_version(),
+        'platform': platform.platform()
+    }
+    meta.update(extra)
+    return meta
+
+
+def write_results(path, results):
+    """Grava os resultados em JSON"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+def load_results(path):
+    """Carrega resultados gravados por write_results"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def find_regressions(results, baseline, max_ratio=1.25, min_delta_ms=1.0,
+                     metrics=('p50_ms', 'p95_ms')):
+    """
+    Compara resultados com a baseline
+    
+    Uma rota regride quando a métrica supera a baseline pelo fator max_ratio
+    e por pelo menos min_delta_ms (para ignorar ruído em rotas muito rápidas).
+    
+    Args:
+        results: Resultados atuais ({'routes': {nome: estatísticas}})
+        baseline: Resultados de referência no mesmo formato
+        max_ratio: Fator máximo tolerado
+        min_delta_ms: Diferença absoluta mínima para considerar regressão
+        metrics: Métricas comparadas
+    
+    Returns:
+        list: Regressões encontradas
+    """
+    regressions = []
+    baseline_routes = baseline.get('routes', {})
+    
+    for name, stats in results.get('routes', {}).items():
+        reference = baseline_routes.get(name)
+        if not reference:
+            continue
+        
+        for metric in metrics:
+            current = stats.get(metric, 0.0)
+            previous = reference.get(metric, 0.0)
+            if previous and current > previous * max_ratio and current - previous >= min_delta_ms:
+                regressions.append({
+                    'route': name,
+                    'metric': metric,
+                    'baseline': previous,
+                    'current': current,
+                    'ratio': round(current / previous, 2)
+                })
+    
+    return regressions
@@ -0,0 +1,128 @@
+-- Esquema sintético do banco Guacamole para benchmarks
+-- Autor: GuacPlayer Team
+-- Data: 2025
+-- Descrição: Subconjunto do esquema PostgreSQL do Guacamole com as tabelas e
+-- colunas consultadas pelo backend (guacamole_user mantém as colunas
+-- username/password_hash/password_salt em texto, como o backend as lê)
+
+DROP TABLE IF EXISTS guacamole_connection_history CASCADE;
+DROP TABLE IF EXISTS guacamole_connection_permission CASCADE;
+DROP TABLE IF EXISTS guacamole_system_permission CASCADE;
+DROP TABLE IF EXISTS guacamole_connection_parameter CASCADE;
+DROP TABLE IF EXISTS guacamole_connection CASCADE;
+DROP TABLE IF EXISTS guacamole_connection_group CASCADE;
+DROP TABLE IF EXISTS guacamole_user_group_member CASCADE;
+DROP TABLE IF EXISTS guacamole_user_group CASCADE;
+DROP TABLE IF EXISTS guacamole_user CASCADE;
+DROP TABLE IF EXISTS guacamole_entity CASCADE;
+DROP TYPE IF EXISTS guacamole_connection_group_type;
+DROP TYPE IF EXISTS guacamole_entity_type;
+DROP TYPE IF EXISTS guacamole_object_permission_type;
+DROP TYPE IF EXISTS guacamole_system_permission_type;
+
+CREATE TYPE guacamole_connection_group_type AS ENUM ('ORGANIZATIONAL', 'BALANCING');
+CREATE TYPE guacamole_entity_type AS ENUM ('USER', 'USER_GROUP');
+CREATE TYPE guacamole_object_permission_type AS ENUM ('READ', 'UPDATE', 'DELETE', 'ADMINISTER');
+CREATE TYPE guacamole_system_permission_type AS ENUM (
+    'CREATE_CONNECTION', 'CREATE_CONNECTION_GROUP', 'CREATE_SHARING_PROFILE',
+    'CREATE_USER', 'CREATE_USER_GROUP', 'ADMINISTER'
+);
+
+CREATE TABLE guacamole_connection_group (
+    connection_group_id      serial       NOT NULL PRIMARY KEY,
+    parent_id                integer      REFERENCES guacamole_connection_group (connection_group_id) ON DELETE CASCADE,
+    connection_group_name    varchar(128) NOT NULL,
+    type                     guacamole_connection_group_type NOT NULL DEFAULT 'ORGANIZATIONAL',
+    max_connections          integer,
+    max_connections_per_user integer,
+    enable_session_affinity  boolean      NOT NULL DEFAULT FALSE,
+    CONSTRAINT connection_group_name_parent UNIQUE (connection_group_name, parent_id)
+);
+CREATE INDEX guacamole_connection_group_parent_id ON guacamole_connection_group (parent_id);
+
+CREATE TABLE guacamole_connection (
+    connection_id            serial       NOT NULL PRIMARY KEY,
+    connection_name          varchar(128) NOT NULL,
+    parent_id                integer      REFERENCES guacamole_connection_group (connection_group_id) ON DELETE CASCADE,
+    protocol                 varchar(32)  NOT NULL,
+    proxy_port               integer,
+    proxy_hostname           varchar(512),
+    max_connections          integer,
+    max_connections_per_user integer,
+    CONSTRAINT connection_name_parent UNIQUE (connection_name, parent_id)
+);
+CREATE INDEX guacamole_connection_parent_id ON guacamole_connection (parent_id);
+
+CREATE TABLE guacamole_connection_parameter (
+    connection_id   integer       NOT NULL REFERENCES guacamole_connection (connection_id) ON DELETE CASCADE,
+    parameter_name  varchar(128)  NOT NULL,
+    parameter_value varchar(4096) NOT NULL,
+    PRIMARY KEY (connection_id, parameter_name)
+);
+CREATE INDEX guacamole_connection_parameter_connection_id ON guacamole_connection_parameter (connection_id);
+
+CREATE TABLE guacamole_entity (
+    entity_id serial       NOT NULL PRIMARY KEY,
+    name      varchar(128) NOT NULL,
+    type      guacamole_entity_type NOT NULL,
+    CONSTRAINT guacamole_entity_name_scope UNIQUE (type, name)
+);
+
+CREATE TABLE guacamole_user (
+    user_id       serial       NOT NULL PRIMARY KEY,
+    entity_id     integer      NOT NULL UNIQUE REFERENCES guacamole_entity (entity_id) ON DELETE CASCADE,
+    username      varchar(128) NOT NULL UNIQUE,
+    password_hash varchar(64)  NOT NULL,
+    password_salt varchar(64),
+    password_date timestamptz  NOT NULL DEFAULT now(),
+    disabled      boolean      NOT NULL DEFAULT FALSE
+);
+
+CREATE TABLE guacamole_user_group (
+    user_group_id serial  NOT NULL PRIMARY KEY,
+    entity_id     integer NOT NULL UNIQUE REFERENCES guacamole_entity (entity_id) ON DELETE CASCADE,
+    disabled      boolean NOT NULL DEFAULT FALSE
+);
+
+CREATE TABLE guacamole_user_group_member (
+    user_group_id    integer NOT NULL REFERENCES guacamole_user_group (user_group_id) ON DELETE CASCADE,
+    member_entity_id integer NOT NULL REFERENCES guacamole_entity (entity_id) ON DELETE CASCADE,
+    PRIMARY KEY (user_group_id, member_entity_id)
+);
+
+CREATE TABLE guacamole_connection_permission (
+    entity_id     integer NOT NULL REFERENCES guacamole_entity (entity_id) ON DELETE CASCADE,
+    connection_id integer NOT NULL REFERENCES guacamole_connection (connection_id) ON DELETE CASCADE,
+    permission    guacamole_object_permission_type NOT NULL,
+    PRIMARY KEY (entity_id, connection_id, permission)
+);
+CREATE INDEX guacamole_connection_permission_connection_id ON guacamole_connection_permission (connection_id);
+CREATE INDEX guacamole_connection_permission_entity_id ON guacamole_connection_permission (entity_id);
+
+CREATE TABLE guacamole_system_permission (
+    entity_id  integer NOT NULL REFERENCES guacamole_entity (entity_id) ON DELETE CASCADE,
+    permission guacamole_system_permission_type NOT NULL,
+    PRIMARY KEY (entity_id, permission)
+);
+
+CREATE TABLE guacamole_connection_history (
+    history_id           serial       NOT NULL PRIMARY KEY,
+    user_id              integer      DEFAULT NULL,
+    username             varchar(128) NOT NULL,
+    remote_host          varchar(256) DEFAULT NULL,
+    connection_id        integer      DEFAULT NULL,
+    connection_name      varchar(128) NOT NULL,
+    sharing_profile_id   integer      DEFAULT NULL,
+    sharing_profile_name varchar(128) DEFAULT NULL,
+    start_date           timestamptz  NOT NULL,
+    end_date             timestamptz  DEFAULT NULL
+);
+
+-- after-load: índices do histórico (esquema oficial do Guacamole), criados
+-- somente após a carga para não encarecer a inserção em massa
+CREATE INDEX guacamole_connection_history_user_id ON guacamole_connection_history (user_id);
+CREATE INDEX guacamole_connection_history_connection_id ON guacamole_connection_history (connection_id);
+CREATE INDEX guacamole_connection_history_start_date ON guacamole_connection_history (start_date);
+CREATE INDEX guacamole_connection_history_end_date ON guacamole_connection_history (end_date);
+CREATE INDEX guacamole_connection_history_connection_id_start_date
+    ON guacamole_connection_history (connection_id, start_date);
@@ -0,0 +1,323 @@
+"""
+Gerador de dados sintéticos do Guacamole
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Cria o esquema sintético e popula conexões, parâmetros, grupos,
+usuários, permissões e histórico em escala configurável (a geração roda no
+servidor com generate_series), além de uma árvore de gravações compatível
+
+Uso (a partir de backend/):
+    python -m benchmarks.synthetic_data --dsn "host=... dbname=guacamole" \\
+        --connections 10000 --history 10000000 --recordings-dir /tmp/recordings
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+import psycopg2
+from app.auth.utils import hash_password_guacamole
+
+SCHEMA_FILE = Path(__file__).with_name('schema.sql')
+AFTER_LOAD_MARKER = '-- after-load'
+
+# Usuário criado para os benchmarks (com permissão ADMINISTER)
+BENCH_USERNAME = 'benchmark'
+BENCH_PASSWORD = 'benchmark'
+BENCH_SALT = '00' * 32
+
+PARAMETER_NAMES = (
+    'hostname', 'port', 'username', 'domain', 'security', 'ignore-cert',
+    'recording-path', 'recording-name', 'create-recording-path', 'color-depth'
+)
+
+HISTORY_CHUNK = 1000000
+
+
+def load_schema(conn):
+    """
+    Cria o esquema sintético, sem os índices do histórico
+    
+    Args:
+        conn: Conexão psycopg2
+    
+    Returns:
+        str: Comandos a executar após a carga
+    """
+    schema = SCHEMA_FILE.read_text(encoding='utf-8')
+    before, _, after = schema.partition(AFTER_LOAD_MARKER)
+    
+    with conn.cursor() as cursor:
+        cursor.execute(before)
+    conn.commit()
+    
+    return AFTER_LOAD_MARKER + after
+
+
+def populate(conn, connections=10000, history=1000000, users=500, groups=200,
+             user_groups=20, active_sessions=50, days=365, log=print):
+    """
+    Popula as tabelas sintéticas
+    
+    Args:
+        conn: Conexão psycopg2
+        connections: Quantidade de conexões
+        history: Quantidade de linhas de histórico
+        users: Quantidade de usuários (além do usuário de benchmark)
+        groups: Quantidade de grupos de conexões
+        user_groups: Quantidade de grupos de usuários
+        active_sessions: Sessões mais recentes mantidas em aberto (end_date NULL)
+        days: Período coberto pelo histórico, em dias
+        log: Função de progresso
+    """
+    password_hash, password_salt = hash_password_guacamole(BENCH_PASSWORD, BENCH_SALT)
+    params = {
+        'connections': connections, 'history': history, 'users': users,
+        'groups': groups, 'user_groups': user_groups, 'days': days,
+        'active': active_sessions, 'hash': password_hash, 'salt': password_salt,
+        'bench_user': BENCH_USERNAME, 'parameter_names': list(PARAMETER_NAMES)
+    }
+    
+    with conn.cursor() as cursor:
+        log("Criando usuários e grupos de usuários")
+        cursor.execute("""
+            INSERT INTO guacamole_entity (name, type)
+            SELECT %(bench_user)s, 'USER'
+            UNION ALL
+            SELECT 'user' || i, 'USER' FROM generate_series(1, %(users)s) i
+            UNION ALL
+            SELECT 'group' || i, 'USER_GROUP' FROM generate_series(1, %(user_groups)s) i;
+            
+            INSERT INTO guacamole_user (entity_id, username, password_hash, password_salt)
+            SELECT entity_id, name, %(hash)s, %(salt)s
+            FROM guacamole_entity WHERE type = 'USER'
+            ORDER BY entity_id;
+            
+            INSERT INTO guacamole_user_group (entity_id)
+            SELECT entity_id FROM guacamole_entity WHERE type = 'USER_GROUP'
+            ORDER BY entity_id;
+            
+            INSERT INTO guacamole_user_group_member (user_group_id, member_entity_id)
+            SELECT 1 + (u.user_id %% %(user_groups)s), u.entity_id
+            FROM guacamole_user u
+            WHERE %(user_groups)s > 0 AND u.username <> %(bench_user)s;
+            
+            INSERT INTO guacamole_system_permission (entity_id, permission)
+            SELECT entity_id, 'ADMINISTER' FROM guacamole_user WHERE username = %(bench_user)s;
+        """, params)
+        
+        log("Criando %d grupos de conexões" % groups)
+        cursor.execute("""
+            INSERT INTO guacamole_connection_group (connection_group_name, parent_id)
+            SELECT 'group-' || lpad(i::text, 5, '0'),
+                   CASE WHEN i <= 10 THEN NULL ELSE 1 + (i * 7919) %% (i - 1) END
+            FROM generate_series(1, %(groups)s) i;
+        """, params)
+        
+        log("Criando %d conexões" % connections)
+        cursor.execute("""
+            INSERT INTO guacamole_connection
+                (connection_name, parent_id, protocol, proxy_hostname, proxy_port,
+                 max_connections, max_connections_per_user)
+            SELECT 'conn-' || lpad(i::text, 6, '0'),
+                   CASE WHEN %(groups)s = 0 OR i %% 5 = 0 THEN NULL
+                        ELSE 1 + (i * 7) %% GREATEST(%(groups)s, 1) END,
+                   (ARRAY['rdp', 'ssh', 'vnc', 'telnet'])[1 + i %% 4],
+                   CASE WHEN i %% 3 = 0 THEN 'guacd-' || (i %% 4) END,
+                   CASE WHEN i %% 3 = 0 THEN 4822 END,
+                   CASE WHEN i %% 2 = 0 THEN 10 END,
+                   CASE WHEN i %% 2 = 0 THEN 2 END
+            FROM generate_series(1, %(connections)s) i;
+            
+            INSERT INTO guacamole_connection_parameter (connection_id, parameter_name, parameter_value)
+            SELECT c.connection_id, p.name, p.name || '-value-' || c.connection_id
+            FROM guacamole_connection c
+            CROSS JOIN unnest(%(parameter_names)s::text[]) AS p(name);
+            
+            INSERT INTO guacamole_connection_permission (entity_id, connection_id, permission)
+            SELECT e.entity_id, c.connection_id, 'READ'
+            FROM guacamole_entity e
+            JOIN guacamole_connection c ON (c.connection_id + e.entity_id) %% 10 = 0;
+        """, params)
+        conn.commit()
+        
+        log("Criando %d linhas de histórico" % history)
+        for low in range(1, history + 1, HISTORY_CHUNK):
+            high = min(low + HISTORY_CHUNK - 1, history)
+            cursor.execute("""
+                INSERT INTO guacamole_connection_history
+                    (user_id, username, remote_host, connection_id, connection_name,
+                     start_date, end_date)
+                SELECT x.user_id,
+                       CASE WHEN x.user_id = 1 THEN %(bench_user)s ELSE 'user' || (x.user_id - 1) END,
+                       '10.' || (x.g %% 200) || '.' || ((x.g / 200) %% 256) || '.' || (x.g %% 251),
+                       x.connection_id, 'conn-' || lpad(x.connection_id::text, 6, '0'),
+                       x.start_date,
+                       CASE WHEN x.g > %(history)s - %(active)s THEN NULL
+                            ELSE x.start_date + interval '1 second' * (60 + (x.g * 37) %% 7200) END
+                FROM (
+                    SELECT g,
+                           1 + (g * 7919) %% %(connections)s AS connection_id,
+                           1 + (g * 104729) %% (%(users)s + 1) AS user_id,
+                           now() - interval '1 second' * (%(days)s * 86400.0 * (%(history)s - g) / %(history)s)
+                               AS start_date
+                    FROM generate_series(%(low)s::bigint, %(high)s::bigint) g
+                ) x;
+            """, dict(params, low=low, high=high))
+            conn.commit()
+            log("  %d/%d" % (high, history))
+
+
+def finish_load(conn, after_load_sql, log=print):
+    """
+    Cria os índices pós-carga e atualiza as estatísticas
+    
+    Args:
+        conn: Conexão psycopg2
+        after_load_sql: Comandos retornados por load_schema
+        log: Função de progresso
+    """
+    log("Criando índices do histórico e executando ANALYZE")
+    with conn.cursor() as cursor:
+        cursor.execute(after_load_sql)
+    conn.commit()
+    
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    conn.autocommit = False
+
+
+def recording_keys(conn, count):
+    """
+    Escolhe as sessões que terão gravação (distribuídas pelo histórico)
+    
+    Args:
+        conn: Conexão psycopg2
+        count: Quantidade de gravações
+    
+    Returns:
+        list: Identificadores das sessões
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT max(history_id) FROM guacamole_connection_history")
+        max_id = cursor.fetchone()[0] or 0
+    
+    if not max_id or count <= 0:
+        return []
+    
+    step = max(1, max_id // count)
+    return [str(history_id) for history_id in range(max_id, 0, -step)][:count]
+
+
+def build_recordings_tree(root, keys, video_size=8 * 1024 * 1024, metadata_every=2):
+    """
+    Cria a árvore de gravações: um diretório por sessão com vídeo e metadados
+    
+    Os vídeos são arquivos esparsos, de modo que a árvore ocupa pouco disco
+    mesmo com muitas gravações grandes.
+    
+    Args:
+        root: Diretório raiz (NFS_MOUNT_PATH)
+        keys: Nomes dos diretórios de gravação
+        video_size: Tamanho de cada vídeo em bytes
+        metadata_every: Grava metadata.json em 1 a cada N gravações
+    """
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    
+    for index, key in enumerate(keys):
+        recording_dir = root / key
+        recording_dir.mkdir(exist_ok=True)
+        
+        with open(recording_dir / 'recording.mp4', 'wb') as f:
+            f.truncate(video_size)
+        
+        (recording_dir / 'recording.guac').write_bytes(b'4.size,1.0,4.1024,3.768;')
+        
+        if metadata_every and index % metadata_every == 0:
+            (recording_dir / 'metadata.json').write_text(
+                json.dumps({'session': key, 'generator': 'guacplayer-benchmarks'}),
+                encoding='utf-8'
+            )
+
+
+def generate(dsn, recordings_dir=None, recordings=1000, video_size=8 * 1024 * 1024, log=print, **scale):
+    """
+    Gera banco e árvore de gravações completos
+    
+    Args:
+        dsn: DSN do PostgreSQL
+        recordings_dir: Diretório da árvore de gravações (opcional)
+        recordings: Quantidade de gravações
+        video_size: Tamanho de cada vídeo em bytes
+        log: Função de progresso
+        **scale: Parâmetros de escala repassados a populate()
+    
+    Returns:
+        list: Chaves das gravações criadas
+    """
+    started = time.monotonic()
+    conn = psycopg2.connect(dsn)
+    try:
+        after_load_sql = load_schema(conn)
+        populate(conn, log=log, **scale)
+        finish_load(conn, after_load_sql, log=log)
+        keys = recording_keys(conn, recordings) if recordings_dir else []
+    finally:
+        conn.close()
+    
+    if recordings_dir:
+        log("Criando %d gravações em %s" % (len(keys), recordings_dir))
+        build_recordings_tree(recordings_dir, keys, video_size=video_size)
+    
+    log("Dados sintéticos gerados em %.1fs" % (time.monotonic() - started))
+    return keys
+
+
+def add_scale_arguments(parser):
+    """Adiciona ao parser os argumentos de escala dos dados sintéticos"""
+    parser.add_argument('--connections', type=int, default=10000)
+    parser.add_argument('--history', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--groups', type=int, default=200)
+    parser.add_argument('--user-groups', type=int, default=20)
+    parser.add_argument('--active-sessions', type=int, default=50)
+    parser.add_argument('--recordings', type=int, default=1000)
+    parser.add_argument('--video-size', type=int, default=8 * 1024 * 1024)
+
+
+def scale_from_args(args):
+    """Extrai os parâmetros de escala de populate() dos argumentos"""
+    return {
+        'connections': args.connections,
+        'history': args.history,
+        'users': args.users,
+        'groups': args.groups,
+        'user_groups': args.user_groups,
+        'active_sessions': args.active_sessions
+    }
+
+
+def main(argv=None):
+    """Ponto de entrada de linha de comando"""
+    parser = argparse.ArgumentParser(description='Gera dados sintéticos do Guacamole')
+    parser.add_argument('--dsn', default=os.getenv('BENCH_DSN'), required=os.getenv('BENCH_DSN') is None)
+    parser.add_argument('--recordings-dir')
+    add_scale_arguments(parser)
+    args = parser.parse_args(argv)
+    
+    generate(
+        args.dsn,
+        recordings_dir=args.recordings_dir,
+        recordings=args.recordings,
+        video_size=args.video_size,
+        **scale_from_args(args)
+    )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
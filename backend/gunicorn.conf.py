@@ -0,0 +1,62 @@
+"""
+Configuração do gunicorn para o GuacPlayer Backend
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Workers gthread com preload_app, timeouts adequados a streams e
+downloads longos e reinicialização de recursos após o fork
+
+Uso:
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import glob
+import os
+
+# Este arquivo não importa o pacote app: o import de app.config já executa
+# app/__init__.py, que carrega app.utils.metrics e exige o diretório do
+# modo multiprocesso do Prometheus antes de qualquer hook do gunicorn.
+# Pelo mesmo motivo o diretório é criado e limpo aqui, antes do preload_app.
+_multiproc_dir = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+if _multiproc_dir:
+    os.makedirs(_multiproc_dir, exist_ok=True)
+    for _path in glob.glob(os.path.join(_multiproc_dir, '*.db')):
+        os.remove(_path)
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', min(2 * (os.cpu_count() or 1) + 1, 9)))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+
+# Com gthread o timeout é o heartbeat do worker, não o limite da requisição;
+# ainda assim precisa cobrir downloads de vários minutos em workers síncronos
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 600))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 120))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 75))
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 0))
+
+# Carrega a aplicação uma vez no master e compartilha a memória via fork.
+# Pools de conexão e a thread de logging são recriados em cada worker
+# (os.register_at_fork em app.database e app.utils.logger).
+preload_app = True
+
+# send_file usa wsgi.file_wrapper: o gunicorn envia vídeos com sendfile()
+sendfile = True
+
+# O access log da aplicação (app.access) já registra cada requisição
+accesslog = None
+errorlog = '-'
+loglevel = os.getenv('LOG_LEVEL', 'INFO').lower()
+
+
+def worker_exit(server, worker):
+    """Fecha as conexões do pool ao encerrar o worker"""
+    from app.database import close_pool
+    close_pool()
+
+
+def child_exit(server, worker):
+    """Remove as métricas de gauge do worker encerrado"""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -15,7 +15,7 @@ logger = setup_logger(__name__)
 
 # Obter ambiente
 env = os.getenv('FLASK_ENV', 'development')
-logger.info(f"Ambiente: {env}")
+logger.info("Ambiente: %s", env)
 
 # Criar aplicação
 app = create_app(config_by_name.get(env, config_by_name['default']))
@@ -26,8 +26,8 @@ if __name__ == '__main__':
     port = int(os.getenv('FLASK_PORT', 5000))
     debug = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
     
-    logger.info(f"Iniciando aplicação em {host}:{port}")
-    logger.info(f"Debug: {debug}")
+    logger.info("Iniciando aplicação em %s:%s", host, port)
+    logger.info("Debug: %s", debug)
     
     # Executar aplicação
     app.run(
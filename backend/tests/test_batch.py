@@ -0,0 +1,119 @@
+"""
+Testes da validação e execução de lotes
+"""
+
+import pytest
+from flask import Flask, jsonify
+from app.batch.services import BatchService
+from app.utils.json_provider import TimedJSONProvider
+
+
+@pytest.fixture
+def service():
+    return BatchService()
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.json = TimedJSONProvider(app)
+    
+    @app.route('/api/items/<int:item_id>')
+    def item(item_id):
+        if item_id == 0:
+            return jsonify({'error': 'Item não encontrado'}), 404
+        return jsonify({'success': True, 'data': {'id': item_id, 'next': item_id + 1}})
+    
+    @app.route('/api/metrics', endpoint='metrics')
+    def metrics():
+        return jsonify({'success': True})
+    
+    return app
+
+
+def run(app, service, items):
+    with app.test_request_context('/api/batch', method='POST'):
+        return {
+            request_id: (status, app.json.loads(body))
+            for request_id, status, body in service.run(app, service.parse(items), 1)
+        }
+
+
+def test_parse_collects_explicit_and_path_dependencies(service):
+    parsed = service.parse([
+        {'id': 'a', 'path': '/api/items/1'},
+        {'id': 'b', 'path': '/api/items/{a.data.next}', 'depends_on': ['a']},
+        {'id': 'c', 'path': '/api/items/{b.data.id}'}
+    ])
+    
+    assert [batch_request.depends_on for batch_request in parsed] == [set(), {'a'}, {'b'}]
+
+
+def test_parse_rejects_cycles(service):
+    with pytest.raises(ValueError, match='circular entre a, b$'):
+        service.parse([
+            {'id': 'a', 'path': '/api/items/{b.data.id}'},
+            {'id': 'b', 'path': '/api/items/1', 'depends_on': ['a']},
+            {'id': 'c', 'path': '/api/items/1'}
+        ])
+
+
+def test_parse_rejects_self_dependency(service):
+    with pytest.raises(ValueError, match='circular'):
+        service.parse([{'id': 'a', 'path': '/api/items/1', 'depends_on': ['a']}])
+
+
+def test_parse_rejects_unknown_dependencies(service):
+    with pytest.raises(ValueError, match="desconhecida em 'a': x, y$"):
+        service.parse([{'id': 'a', 'path': '/api/items/{y.id}', 'depends_on': ['x']}])
+
+
+@pytest.mark.parametrize('depends_on', ['a', [1], {'a': 1}])
+def test_parse_rejects_invalid_depends_on(service, depends_on):
+    with pytest.raises(ValueError, match='depends_on'):
+        service.parse([
+            {'id': 'a', 'path': '/api/items/1'},
+            {'id': 'b', 'path': '/api/items/2', 'depends_on': depends_on}
+        ])
+
+
+def test_run_resolves_references(app, service):
+    results = run(app, service, [
+        {'id': 'a', 'path': '/api/items/1'},
+        {'id': 'b', 'path': '/api/items/{a.data.next}'}
+    ])
+    
+    assert results['b'] == (200, {'success': True, 'data': {'id': 2, 'next': 3}})
+
+
+def test_failed_dependency_gives_424_for_dependents(app, service):
+    results = run(app, service, [
+        {'id': 'a', 'path': '/api/items/0'},
+        {'id': 'b', 'path': '/api/items/1', 'depends_on': ['a']},
+        {'id': 'c', 'path': '/api/items/1', 'depends_on': ['b']},
+        {'id': 'd', 'path': '/api/items/1'}
+    ])
+    
+    assert results['a'][0] == 404
+    assert results['b'] == (424, {'error': 'Dependência falhou: a'})
+    assert results['c'] == (424, {'error': 'Dependência falhou: b'})
+    assert results['d'][0] == 200
+
+
+def test_missing_reference_gives_424(app, service):
+    results = run(app, service, [
+        {'id': 'a', 'path': '/api/items/1'},
+        {'id': 'b', 'path': '/api/items/{a.data.missing}'}
+    ])
+    
+    assert results['b'][0] == 424
+
+
+def test_excluded_and_unknown_endpoints(app, service):
+    results = run(app, service, [
+        {'id': 'metrics', 'path': '/api/metrics'},
+        {'id': 'missing', 'path': '/api/unknown'}
+    ])
+    
+    assert results['metrics'] == (400, {'error': 'Rota não suportada em lote'})
+    assert results['missing'][0] == 404
@@ -0,0 +1,129 @@
+"""
+Testes do cursor da busca no histórico e da leitura de datas
+"""
+
+import base64
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.database import HISTORY_SEARCH_FILTERS, SQL_SEARCH_HISTORY, HistorySearchRow
+from app.history.services import HistoryService, decode_cursor, encode_cursor, parse_date
+
+
+def make_row(history_id, start_date):
+    return HistorySearchRow(
+        history_id=history_id, connection_id=1, connection_name='srv', user_id=1, username='ana',
+        remote_host='10.0.0.1', start_date=start_date, end_date=None, protocol='rdp'
+    )
+
+
+def raw_cursor(payload):
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+class FakeQueries:
+    """search_history em memória, com o mesmo keyset de SQL_SEARCH_HISTORY"""
+    
+    def __init__(self, rows):
+        self.rows = sorted(rows, key=lambda row: (row.start_date, row.history_id), reverse=True)
+    
+    def search_history(self, filters, after=None, limit=20):
+        rows = [row for row in self.rows if after is None or (row.start_date, row.history_id) < after]
+        return rows[:limit]
+
+
+@pytest.mark.parametrize('start_date', [
+    datetime(2025, 3, 1, 12, 30, 15, 123456),
+    datetime(2025, 3, 1, 12, 30, tzinfo=timezone.utc),
+    datetime(2025, 3, 1, 9, 0, tzinfo=timezone(timedelta(hours=-3)))
+])
+def test_cursor_round_trip(start_date):
+    cursor = encode_cursor(make_row(42, start_date))
+    
+    assert '=' not in cursor
+    assert decode_cursor(cursor) == (start_date, 42)
+
+
+@pytest.mark.parametrize('cursor', [
+    'not base64!',
+    'x',
+    raw_cursor('not json'),
+    raw_cursor('{"a": 1}'),
+    raw_cursor('null'),
+    raw_cursor('["2025-03-01T12:00:00"]'),
+    raw_cursor('["2025-03-01T12:00:00", 1, 2]'),
+    raw_cursor('[1, 2]'),
+    raw_cursor('["yesterday", 1]'),
+    raw_cursor('["2025-03-01T12:00:00", "abc"]'),
+    raw_cursor('["2025-03-01T12:00:00", [1]]'),
+    raw_cursor('["2025-03-01T12:00:00", 1e400]'),
+    raw_cursor('["2025-03-01T12:00:00", -1]'),
+    raw_cursor('["2025-03-01T12:00:00", 9223372036854775808]'),
+    base64.urlsafe_b64encode(b'\xff\xfe').decode('ascii')
+])
+def test_invalid_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError, match='Cursor inválido'):
+        decode_cursor(cursor)
+
+
+def test_tampered_cursor_is_rejected():
+    cursor = encode_cursor(make_row(42, datetime(2025, 3, 1, 12, 0)))
+    
+    with pytest.raises(ValueError):
+        decode_cursor(cursor[:-3] + '!!!')
+
+
+def test_invalid_cursor_is_a_400_response():
+    from flask import Flask
+    from app.utils.decorators import handle_errors
+    
+    app = Flask(__name__)
+    
+    @handle_errors
+    def view():
+        HistoryService.__new__(HistoryService).search({}, cursor=raw_cursor('["2025-03-01", 1e400]'))
+    
+    with app.test_request_context():
+        response, status = view()
+    assert status == 400
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('2025-01-31', datetime(2025, 1, 31)),
+    ('2025-01-31T12:00:00', datetime(2025, 1, 31, 12)),
+    ('2025-01-31T12:00:00Z', datetime(2025, 1, 31, 12, tzinfo=timezone.utc)),
+    ('2025-01-31T12:00:00-03:00', datetime(2025, 1, 31, 12, tzinfo=timezone(timedelta(hours=-3)))),
+    ('', None),
+    (None, None)
+])
+def test_parse_date(value, expected):
+    assert parse_date(value, 'from') == expected
+
+
+@pytest.mark.parametrize('value', ['31/01/2025', '2025-13-01', '2025-01-31T25:00', 'ontem'])
+def test_parse_date_rejects_invalid_values(value):
+    with pytest.raises(ValueError, match='^to deve ser uma data ISO 8601$'):
+        parse_date(value, 'to')
+
+
+def test_search_order_breaks_start_date_ties_by_history_id():
+    assert 'ORDER BY h.start_date DESC, h.history_id DESC' in SQL_SEARCH_HISTORY
+    assert HISTORY_SEARCH_FILTERS['after'] == '(h.start_date, h.history_id) < (%s, %s)'
+
+
+def test_pages_are_stable_when_start_dates_are_equal():
+    same = datetime(2025, 3, 1, 12, 0)
+    rows = [make_row(history_id, same) for history_id in range(1, 8)]
+    rows += [make_row(10, same + timedelta(seconds=1)), make_row(11, same - timedelta(seconds=1))]
+    service = HistoryService.__new__(HistoryService)
+    service.db = FakeQueries(rows)
+    
+    seen = []
+    cursor = None
+    while True:
+        result = service.search({}, cursor, per_page=3, fields=['history_id'])
+        seen.extend(item['history_id'] for item in result['data'])
+        cursor = result['pagination']['next_cursor']
+        if cursor is None:
+            break
+    
+    assert seen == [10, 7, 6, 5, 4, 3, 2, 1, 11]
@@ -0,0 +1,187 @@
+"""
+Testes do circuit breaker e da proteção NFS
+"""
+
+import threading
+import time
+import pytest
+from app.config import Config
+from app.utils import nfs_guard
+from app.utils.nfs_guard import CircuitBreaker, NFSGuard, NFSUnavailableError
+
+
+class FakeProbe:
+    """Sondagem que falha até ser liberada"""
+    
+    def __init__(self):
+        self.healthy = threading.Event()
+        self.calls = 0
+    
+    def __call__(self):
+        self.calls += 1
+        if not self.healthy.is_set():
+            raise OSError("ponto de montagem indisponível")
+
+
+def make_breaker(probe=None, **overrides):
+    options = dict(
+        failure_threshold=3, slow_seconds=1.0, window=4, slow_ratio=0.5,
+        reset_seconds=30, probe_interval=0.01
+    )
+    options.update(overrides)
+    return CircuitBreaker('test', probe or FakeProbe(), **options)
+
+
+def wait_for(condition, timeout=2.0):
+    expires = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > expires:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def test_consecutive_failures_open_the_circuit():
+    breaker = make_breaker(window=100)
+    
+    breaker.record(0.1, error=OSError("falha"))
+    breaker.record(0.1, error=OSError("falha"))
+    assert breaker.state == 'closed'
+    
+    breaker.record(0.1, error=OSError("falha"))
+    assert breaker.state == 'open'
+    with pytest.raises(NFSUnavailableError) as info:
+        breaker.allow()
+    assert info.value.retry_after == 30
+
+
+def test_success_resets_consecutive_failures():
+    breaker = make_breaker(window=100)
+    
+    for _ in range(5):
+        breaker.record(0.1, error=OSError("falha"))
+        breaker.record(0.1)
+    
+    assert breaker.state == 'closed'
+    breaker.allow()
+
+
+def test_slow_ratio_opens_only_with_full_window():
+    breaker = make_breaker(failure_threshold=100)
+    
+    breaker.record(5.0)
+    breaker.record(5.0)
+    assert breaker.state == 'closed'
+    
+    breaker.record(0.1)
+    breaker.record(0.1)
+    assert breaker.state == 'open'
+    assert breaker.to_dict()['retry_after'] == 30
+
+
+def test_fast_calls_keep_the_circuit_closed():
+    breaker = make_breaker(failure_threshold=100)
+    
+    breaker.record(5.0)
+    for _ in range(10):
+        breaker.record(0.1)
+    
+    assert breaker.state == 'closed'
+
+
+def test_probe_closes_the_circuit_after_recovery():
+    probe = FakeProbe()
+    breaker = make_breaker(probe, failure_threshold=1)
+    
+    breaker.record(0.1, error=OSError("falha"))
+    assert breaker.state == 'open'
+    assert wait_for(lambda: probe.calls >= 2)
+    assert breaker.state == 'open'
+    
+    probe.healthy.set()
+    assert wait_for(lambda: breaker.state == 'closed')
+    breaker.allow()
+    assert breaker.to_dict() == {'state': 'closed'}
+
+
+def test_slow_probe_keeps_the_circuit_open():
+    release = threading.Event()
+    breaker = make_breaker(lambda: release.wait(0.05), failure_threshold=1, slow_seconds=0.01)
+    
+    breaker.record(0.1, error=OSError("falha"))
+    time.sleep(0.2)
+    assert breaker.state == 'open'
+    
+    release.set()
+    assert wait_for(lambda: breaker.state == 'closed')
+
+
+@pytest.fixture
+def guard(monkeypatch, tmp_path):
+    monkeypatch.setattr(Config, 'NFS_WORKERS', 1)
+    monkeypatch.setattr(Config, 'NFS_MAX_PENDING', 0)
+    monkeypatch.setattr(Config, 'NFS_CALL_TIMEOUT', 0.05)
+    monkeypatch.setattr(Config, 'NFS_BREAKER_FAILURE_THRESHOLD', 100)
+    monkeypatch.setattr(Config, 'NFS_BREAKER_WINDOW', 100)
+    monkeypatch.setattr(Config, 'NFS_PROBE_INTERVAL', 0.01)
+    guard = NFSGuard(tmp_path)
+    monkeypatch.setattr(nfs_guard, '_guard', guard)
+    return guard
+
+
+def test_timed_out_call_keeps_its_slot_until_it_finishes(guard):
+    release = threading.Event()
+    
+    with pytest.raises(NFSUnavailableError) as info:
+        guard.call(release.wait, 5)
+    assert info.value.retry_after
+    
+    # A thread presa ainda ocupa a única vaga do pool
+    with pytest.raises(NFSUnavailableError, match='saturado'):
+        guard.call(lambda: 'ok')
+    
+    release.set()
+    assert wait_for(lambda: guard._slots.acquire(blocking=False))
+    guard._slots.release()
+    assert guard.call(lambda: 'ok') == 'ok'
+
+
+def test_open_circuit_rejects_without_using_the_pool(guard):
+    guard.call(lambda: None)
+    guard.breaker.failure_threshold = 1
+    guard.breaker.probe_interval = 10
+    guard.breaker.record(0.0, error=OSError("falha"))
+    calls = []
+    
+    with pytest.raises(NFSUnavailableError, match='circuito aberto') as info:
+        guard.call(calls.append, 1)
+    
+    assert calls == []
+    assert info.value.retry_after >= 1
+
+
+def test_nested_guarded_calls_run_on_the_pool_thread(guard):
+    @nfs_guard.nfs_guarded
+    def inner():
+        return threading.current_thread().name
+    
+    @nfs_guard.nfs_guarded
+    def outer():
+        # Com um único worker, esperar pelo pool aqui travaria
+        return threading.current_thread().name, inner(), guard.map(lambda item: item * 2, [1, 2])
+    
+    outer_thread, inner_thread, doubled = outer()
+    
+    assert outer_thread.startswith('nfs')
+    assert inner_thread == outer_thread
+    assert doubled == [2, 4]
+
+
+def test_map_shares_one_deadline(guard, monkeypatch):
+    monkeypatch.setattr(Config, 'NFS_WORKERS', 2)
+    monkeypatch.setattr(Config, 'NFS_MAX_PENDING', 2)
+    guard._pid = None
+    
+    assert guard.map(lambda item: item + 1, [1, 2, 3]) == [2, 3, 4]
+    with pytest.raises(NFSUnavailableError):
+        guard.map(time.sleep, [0.04, 0.04, 0.04, 0.04])
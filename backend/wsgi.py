@@ -0,0 +1,12 @@
+"""
+Ponto de entrada WSGI de produção do GuacPlayer Backend
+Autor: GuacPlayer Team
+Data: 2025
+Descrição: Expõe a aplicação para o gunicorn (gunicorn -c gunicorn.conf.py wsgi:app)
+"""
+
+import os
+from app import create_app
+from app.config import config_by_name
+
+app = create_app(config_by_name.get(os.getenv('FLASK_ENV', 'production'), config_by_name['production']))